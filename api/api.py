@@ -1,31 +1,72 @@
 # #########################################################################################
 ##                                  INITIALISATIONS                                     ##
 ##########################################################################################
+import logging
 import os
-import statistics
-from collections import OrderedDict, deque
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from configparser import RawConfigParser
+from hashlib import sha1
 from json import dumps
-from operator import attrgetter
+from urllib.parse import urlencode
 
-from flask import Flask, request, render_template, Response
+from flask import Flask, request, render_template, Response, g, send_file
 from flask.ext.cache import Cache
 
+from infrastructure.documents import DocumentBuilder
 from infrastructure.errors.errors import RepositoryError
+from infrastructure.json_encoder import encode_json, iter_encode_json
+from infrastructure.compression import CompressedResponse, MIN_COMPRESSED_SIZE, IDENTITY, available_encodings, \
+    choose_encoding, encoded_etag
+from infrastructure.response_store import ResponseStore
 from infrastructure.sql_repos.area_repository import AreaRepository
+from infrastructure.sql_repos.connection_pool import ReadOnlyConnectionPool
 from infrastructure.sql_repos.indicator_repository import IndicatorRepository
 from infrastructure.sql_repos.observation_repository import ObservationRepository
+from infrastructure.sql_repos.summary_repository import SummaryRepository
 
-cache = Cache(config={'CACHE_TYPE': 'simple'})
-app = Flask(__name__)
-cache.init_app(app)
-
-TIMEOUT = 30  # timeout to clean cache in seconds
+TIMEOUT = 0  # cached responses never expire, entries of older database build versions are dropped
+MAX_AGE = 30  # seconds clients may reuse a response before revalidating it with its ETag
+JSON_MIMETYPE = "application/json; charset=utf-8"
+PRERENDER_CHUNK_SIZE = 64  # responses rendered by a pre-render process per task
 
 sqlite_config = RawConfigParser()
 sqlite_config.read(os.path.join(os.path.dirname(__file__), "api_sqlite_config.ini"))
 sqlite_config.set("CONNECTION", "SQLITE_DB",
                   os.path.join(os.path.dirname(__file__), sqlite_config.get("CONNECTION", "SQLITE_DB")))
+connection_pool = ReadOnlyConnectionPool(sqlite_config)
+
+
+def cache_config(config):
+    """
+    Returns the Flask-Cache configuration for the CACHE section of the API configuration
+    """
+    if config.get("CACHE", "TYPE", fallback="simple") != "sqlite":
+        return {'CACHE_TYPE': 'simple'}
+    return {
+        'CACHE_TYPE': 'infrastructure.response_cache.sqlite_cache',
+        'CACHE_ARGS': [os.path.join(os.path.dirname(__file__), config.get("CACHE", "DATABASE"))],
+        'CACHE_OPTIONS': {'max_size': config.getint("CACHE", "MAX_SIZE_MB", fallback=1024) * 1024 * 1024},
+    }
+
+
+cache_settings = cache_config(sqlite_config)
+cache = Cache(config=cache_settings)
+app = Flask(__name__)
+cache.init_app(app)
+# A shared cache can't be cleared when the build version changes, other processes may already be filling it with the
+# new version. Entries of older versions are never asked for again, so they are evicted as the least recently used
+shared_cache = cache_settings['CACHE_TYPE'] != 'simple'
+# Warm up the cache in the background when the server starts and every time the database build version changes
+warm_up_enabled = sqlite_config.getboolean("CACHE", "WARM_UP", fallback=False)
+warm_up_workers = sqlite_config.getint("CACHE", "WARM_UP_WORKERS", fallback=2)
+# Store of the responses rendered ahead of time (see prerender_responses), None to compute every response
+store_directory = os.path.join(os.path.dirname(__file__),
+                               sqlite_config.get("STORE", "DIRECTORY", fallback="../odb2015_responses"))
+response_store = ResponseStore(store_directory) if sqlite_config.getboolean("STORE", "SERVE", fallback=True) else None
+
+log = logging.getLogger(__name__)
 
 
 ##########################################################################################
@@ -33,11 +74,18 @@ sqlite_config.set("CONNECTION", "SQLITE_DB",
 ##########################################################################################
 
 def json_response(data, request, status=200):
-    json = dumps(data, ensure_ascii=False).encode('utf-8')
+    return json_text_response(dumps(data, ensure_ascii=False), request, status)
+
+
+def json_text_response(text, request, status=200):
+    json = text.encode('utf-8')
     callback = request.args.get('callback', False)
     if callback:
         return Response(str(callback) + '(' + str(json) + ');', mimetype="application/javascript; charset=utf-8")
-    return Response(json, mimetype="application/json; charset=utf-8", status=status)
+    if len(json) >= MIN_COMPRESSED_SIZE:
+        # Compressed here, before it's cached, and sent in the encoding each client accepts by add_cache_headers
+        return CompressedResponse(json, mimetype=JSON_MIMETYPE, status=status)
+    return Response(json, mimetype=JSON_MIMETYPE, status=status)
 
 
 def json_response_ok(request, data):
@@ -51,13 +99,26 @@ def json_response_error(request, data):
 
 
 def json_encoder(request, data):
-    # Check first in order to convert to dict
-    if isinstance(data, list):
-        data = [data_element.to_dict() for data_element in data]
-    else:
-        data = data.to_dict()
+    # Entities are encoded straight from the objects, splicing in the text of the areas and indicators they share
+    return json_text_response(encode_json(success(data)), request)
 
-    return json_response_ok(request, data)
+
+def json_stream_response(request, data):
+    # The document is sent as it is encoded, consuming the observation iterators it holds
+    chunks = iter_encode_json(success(data))
+    callback = request.args.get('callback', False)
+    if callback:
+        return Response(jsonp_stream(str(callback), chunks), mimetype="application/javascript; charset=utf-8")
+    return Response((chunk.encode('utf-8') for chunk in chunks), mimetype=JSON_MIMETYPE)
+
+
+def jsonp_stream(callback, chunks):
+    # Chunks are escaped as json_response escapes the whole document with str(bytes): the document always has a '"',
+    # so it's quoted with "'", which is forced on every chunk by appending a '"' that is cut off with the quote
+    yield callback + "(b'"
+    for chunk in chunks:
+        yield str(chunk.encode('utf-8') + b'"')[2:-2]
+    yield "');"
 
 
 def area_json_encoder(request, data):
@@ -92,9 +153,315 @@ def error(data):
 ##########################################################################################
 
 def make_cache_key(*args, **kwargs):
-    path = request.path
-    args = str(hash(frozenset(request.args.items())))
-    return (path + args).encode('utf-8')
+    # The same in every process and restart: the database build version, the path and the sorted query string
+    return (g.version + request_key()).encode('utf-8')
+
+
+def request_key():
+    return request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+
+cached_version = {'version': None}
+
+
+@app.before_request
+def check_version():
+    """
+    Reads the build version of the database and answers with 304 when the client already has the response for it,
+    or with the stored response when it was rendered ahead of time for it. The responses of an older version are
+    dropped from the cache.
+    """
+    if request.endpoint == 'static':
+        return None
+    # The whole request reads the build it was versioned with, even if the database is replaced meanwhile
+    connection_pool.pin()
+    g.version = connection_pool.get_version()
+    if cached_version['version'] != g.version:
+        if not shared_cache:
+            cache.clear()
+        cached_version['version'] = g.version
+        if warm_up_enabled:
+            warm_up_in_background()
+    g.etag = "%s-%s" % (g.version, sha1(request_key().encode('utf-8')).hexdigest()[:16])
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    stored = response_store.find(g.version, request_key()) if response_store is not None else None
+    # The client may hold the response compressed as it accepts it now, or uncompressed if it was too small to be
+    # compressed (or it's a JSONP or streamed response, which are never compressed)
+    encoding = choose_encoding(request.accept_encodings, stored.encodings if stored else available_encodings())
+    for etag in (encoded_etag(g.etag, encoding), g.etag):
+        if request.if_none_match.contains(etag):
+            g.etag = etag
+            return Response(status=304)
+    return stored_response(stored) if stored else None
+
+
+def stored_response(stored):
+    """
+    Sends the file of a stored response in the encoding the client accepts. The file is handed to the server as it
+    is, which sends it with sendfile when it supports wsgi.file_wrapper (or leaves it to the front server with
+    USE_X_SENDFILE)
+
+    Returns:
+        Response: the stored response, None if its file has been pruned meanwhile
+    """
+    encoding = choose_encoding(request.accept_encodings, stored.encodings)
+    try:
+        response = send_file(response_store.path(stored.digest, encoding), mimetype=JSON_MIMETYPE, add_etags=False,
+                             cache_timeout=MAX_AGE)
+    except OSError:
+        return None
+    if encoding != IDENTITY:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.teardown_request
+def release_request_resources(exception):
+    connection_pool.unpin()
+    # Requests that failed before caching their response must not keep other processes waiting for it
+    if shared_cache:
+        cache.cache.release_fills()
+
+
+@app.after_request
+def add_cache_headers(response):
+    """
+    Sends the compressed responses in the encoding the client accepts and tags the successful responses with the ETag
+    of the request and encoding, which is strong since every response is a function of the build version of the
+    database, the path and the query string
+    """
+    if isinstance(response, CompressedResponse):
+        response = response.encode(request.accept_encodings)
+    if response.status_code in (200, 304) and 'etag' in g:
+        # A 304 carries the ETag the client matched, see check_version
+        response.set_etag(g.etag if response.status_code == 304 else
+                          encoded_etag(g.etag, response.content_encoding or IDENTITY))
+        response.headers['Cache-Control'] = 'public, max-age=%d' % (MAX_AGE,)
+    return response
+
+
+def is_streaming():
+    # Streamed responses are built while they are sent, so they skip the cache
+    return request.args.get('stream') == 'true'
+
+
+##########################################################################################
+##                                  CACHE WARM-UP                                       ##
+##########################################################################################
+
+warm_up_lock = threading.Lock()
+
+
+def warm_up_urls():
+    """
+    Returns the URLs of the heaviest responses: the index documents of every year and the observations of every country
+    """
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
+    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
+                                             connection_pool=connection_pool)
+    urls = []
+    for year in observation_repo.get_year_list():
+        urls += ["/indexObservations/%s" % (year.value,), "/indexEvolution/%s" % (year.value,),
+                 "/indexStats/%s" % (year.value,)]
+    urls += ["/countryObservations/%s" % (country.iso3,) for country in area_repo.find_countries(order="iso3")]
+    return urls
+
+
+def warm_up_cache(workers=2):
+    """
+    Computes the heaviest responses (see warm_up_urls) into the cache, requesting them as a client would so they are
+    cached under the current build version. The progress is logged as they are done
+
+    Args:
+        workers (int, optional): responses computed at the same time
+
+    Returns:
+        list of (str, int): URL and status of the responses, in the order they were done
+    """
+    urls = warm_up_urls()
+    log.info("Warming up the cache with %d responses, %d at a time" % (len(urls), workers))
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = dict((executor.submit(_warm_up_url, url), url) for url in urls)
+        for future in as_completed(futures):
+            status, seconds = future.result()
+            results.append((futures[future], status))
+            log.info("Warmed up %d/%d %s: %d in %.2fs" % (len(results), len(urls), futures[future], status, seconds))
+    log.info("Cache warmed up in %.2fs" % (time.time() - start,))
+    return results
+
+
+def _warm_up_url(url):
+    start = time.time()
+    status = app.test_client().get(url).status_code
+    return status, time.time() - start
+
+
+def warm_up_in_background():
+    """
+    Warms up the cache in a background thread, unless one is already doing it
+
+    Returns:
+        threading.Thread: the thread warming up the cache, None if another one was already doing it
+    """
+    if not warm_up_lock.acquire(blocking=False):
+        return None
+    thread = threading.Thread(target=_warm_up_until_current, name="cache-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _warm_up_until_current():
+    try:
+        # The build version may change while warming up, then the responses of the new one are computed too
+        version = None
+        while version != connection_pool.get_version():
+            version = connection_pool.get_version()
+            warm_up_cache(warm_up_workers)
+    except Exception:
+        log.exception("Cache warm-up failed")
+    finally:
+        warm_up_lock.release()
+
+
+##########################################################################################
+##                                PRE-RENDERED RESPONSES                                ##
+##########################################################################################
+
+def prerender_urls():
+    """
+    Returns the URLs of every response that can be rendered ahead of time: the lists, every area and indicator, and
+    the observations, statistics and visualisations of every indicator, area and year combination. Other query
+    strings than info=false on the areas are left to be computed
+    """
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
+    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
+                                             connection_pool=connection_pool)
+    areas = [area.iso3 for area in area_repo.find_areas(order="iso3")]
+    indicators = [indicator.indicator for indicator in indicator_repo.find_indicators()]
+    years = [str(year.value) for year in observation_repo.get_year_list()]
+    countries = [country.iso3 for country in area_repo.find_countries(order="iso3")]
+
+    area_urls = ["/areas", "/areas/countries", "/areas/regions"] + ["/areas/%s" % (area,) for area in areas]
+    urls = area_urls + [url + "?info=false" for url in area_urls]
+    urls += ["/indicators", "/indicators_flattened", "/indicators_meta", "/indicators/index",
+             "/indicators/subindices", "/indicators/primary", "/indicators/secondary"]
+    for indicator in indicators:
+        urls += ["/indicators/%s" % (indicator,), "/indicators/%s/indicators" % (indicator,),
+                 "/indicators/%s/primary" % (indicator,), "/indicators/%s/secondary" % (indicator,)]
+    urls += ["/areasInfo", "/yearsWithIndicatorData", "/years", "/years/array"]
+    for year in years:
+        urls += ["/indexObservations/%s" % (year,), "/indexEvolution/%s" % (year,), "/indexStats/%s" % (year,)]
+    urls += ["/countryObservations/%s" % (country,) for country in countries]
+    for endpoint in ("/observations", "/statistics", "/visualisations", "/visualisationsGroupedByArea"):
+        urls.append(endpoint)
+        for indicator in indicators:
+            urls.append("%s/%s" % (endpoint, indicator))
+            for area in areas + ["ALL"]:
+                urls.append("%s/%s/%s" % (endpoint, indicator, area))
+                urls += ["%s/%s/%s/%s" % (endpoint, indicator, area, year) for year in years]
+    return urls
+
+
+def prerender_responses(workers=None, prune=False):
+    """
+    Renders every response of prerender_urls for the current build version into the response store and publishes
+    them, so the server sends them as files instead of computing them. The responses are requested as a client would
+    by a pool of processes, each one with the cache disabled, and only the successful ones are stored
+
+    Args:
+        workers (int, optional): number of processes of the pool, the number of CPUs by default
+        prune (bool, optional): drop the responses of other build versions and the bodies only they used
+
+    Returns:
+        int: number of responses published, None if the build version changed while rendering them
+    """
+    store = ResponseStore(store_directory)
+    version = connection_pool.get_version()
+    urls = prerender_urls()
+    log.info("Rendering %d responses of build version %s into %s" % (len(urls), version, store.directory))
+    start = time.time()
+    entries = []
+    failed = 0
+    rendered_versions = set()
+    # The bodies put by the pool processes are kept from a concurrent prune until they are published
+    with store.writing():
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_prerender,
+                                 initargs=(store.directory,)) as executor:
+            for count, (url, rendered_version, stored) in enumerate(
+                    executor.map(_prerender_url, urls, chunksize=PRERENDER_CHUNK_SIZE), 1):
+                rendered_versions.add(rendered_version)
+                if stored is None:
+                    failed += 1
+                else:
+                    # Stored under the request key the server looks them up with, see request_key
+                    entries.append((url if '?' in url else url + '?', stored))
+                if count % 1000 == 0 or count == len(urls):
+                    log.info("Rendered %d/%d responses in %.2fs" % (count, len(urls), time.time() - start))
+        if rendered_versions != {version}:
+            log.warning("The build version changed while rendering, nothing is published")
+            return None
+        published = store.publish(version, entries)
+    log.info("Published %d responses of build version %s, %d were not successful" % (published, version, failed))
+    if prune:
+        log.info("Deleted %d bodies of other build versions" % (store.prune([version]),))
+    return published
+
+
+# Store the pre-render processes write the bodies into, set by _init_prerender
+_prerender_store = None
+
+
+def _init_prerender(directory):
+    """
+    Sets up a pre-render process: its responses are computed, never read from the cache nor the store, through
+    connections of its own (sqlite connections must not be used across a fork, like the one prerender_responses opened
+    before the process was forked)
+    """
+    global _prerender_store, response_store, shared_cache, warm_up_enabled
+    connection_pool.reset()
+    _prerender_store = ResponseStore(directory)
+    response_store = None
+    shared_cache = False
+    warm_up_enabled = False
+    cache.init_app(app, config={'CACHE_TYPE': 'null', 'CACHE_NO_NULL_WARNING': True})
+
+
+def _prerender_url(url):
+    """
+    Renders a response, it's run by the pool processes
+
+    Returns:
+        (str, str, StoredResponse): the URL, the build version it was rendered from (None if the database was replaced
+            while rendering it) and its stored body, None if it was not successful
+    """
+    version = connection_pool.get_version()
+    response = app.test_client().get(url)
+    # The database is only replaced by newer builds, so the version didn't change during the request if it's the
+    # same after it
+    if connection_pool.get_version() != version:
+        version = None
+    if response.status_code != 200 or response.mimetype != 'application/json':
+        return url, version, None
+    return url, version, _prerender_store.put(response.get_data())
+
+
+##########################################################################################
+##                                 DOCUMENT BUILDER                                     ##
+##########################################################################################
+
+def document_builder():
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
+    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
+                                             connection_pool=connection_pool)
+    summary_repo = SummaryRepository(recreate_db=False, connection_pool=connection_pool)
+    return DocumentBuilder(area_repo, indicator_repo, observation_repo, summary_repo)
 
 
 ##########################################################################################
@@ -117,7 +484,7 @@ def list_areas():
     """List all areas (countries and region)"""
     order = request.args.get('orderBy')
 
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
     areas = area_repo.find_areas(order)
 
     return area_json_encoder(request, areas)
@@ -127,7 +494,7 @@ def list_areas():
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_countries():
     order = request.args.get('orderBy')
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
     countries = area_repo.find_countries(order)
     return area_json_encoder(request, countries)
 
@@ -136,7 +503,7 @@ def list_countries():
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_regions():
     order = request.args.get('orderBy')
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
     regions = area_repo.find_regions(order)
     return area_json_encoder(request, regions)
 
@@ -144,7 +511,7 @@ def list_regions():
 @app.route("/areas/<area_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def show_area(area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
     area = area_repo.find_countries_by_code_or_income(area_code)
     return area_json_encoder(request, area)
 
@@ -156,116 +523,90 @@ def show_area(area_code):
 @app.route("/indicators")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicators():
-    indicators = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators()
+    indicators = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators()
     return json_encoder(request, indicators)
 
 
 @app.route("/indicators_flattened")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicators_flattened():
-    indicators = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators()
-    index_indicator = next(i for i in indicators if i.index is None)
-    q = deque([index_indicator])
-    final_indicators = []
-    while q:
-        i = q.popleft()
-        print(i.indicator, len(q))
-        final_indicators.append(i)
-        q.extendleft(i.children)
-        i.children = []
-
-    # TODO: Uncomment to include orphan indicators (e.g. dataset_assesment)
-    # final_indicators.extend([i for i in indicators if i not in final_indicators])
-    return json_encoder(request, final_indicators)
+    return json_response_ok(request, document_builder().indicators_flattened())
 
 
 @app.route("/indicators_meta")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicators_meta():
-    indicators = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators()
-    index_indicator = next(i for i in indicators if i.index is None)
-    q = deque([index_indicator])
-    final_indicators = []
-    while q:
-        i = q.popleft()
-        print(i.indicator, len(q))
-        final_indicators.append(i)
-        q.extendleft(i.children)
-        i.children = []
-
-    # TODO: Uncomment to include orphan indicators (e.g. dataset_assesment)
-    final_indicators = [i for i in indicators if i not in final_indicators]
-    return json_encoder(request, final_indicators)
+    return json_response_ok(request, document_builder().indicators_meta())
 
 
 @app.route("/indicators/index")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def show_index():
-    _index = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_index()
+    _index = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_index()
     return json_encoder(request, _index)
 
 
 @app.route("/indicators/subindices")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_subindices():
-    subindices = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_sub_indexes()
+    subindices = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_sub_indexes()
     return json_encoder(request, subindices)
 
 
 @app.route("/indicators/primary")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_primary():
-    primary = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_primary()
+    primary = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_primary()
     return json_encoder(request, primary)
 
 
 @app.route("/indicators/secondary")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_secondary():
-    secondary = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_secondary()
+    secondary = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_secondary()
     return json_encoder(request, secondary)
 
 
 @app.route("/indicators/<indicator_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def show_indicator(indicator_code):
-    indicator = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicator_by_code(indicator_code)
+    indicator = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicator_by_code(indicator_code)
     return json_encoder(request, indicator)
 
 
 @app.route("/indicators/<indicator_code>/indicators")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicator_indicators(indicator_code):
-    indicator = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicator_by_code(indicator_code)
+    indicator = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicator_by_code(indicator_code)
 
     if indicator is None:
         return json_encoder(request, indicator)
 
-    indicators = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_indicators(indicator)
+    indicators = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_indicators(indicator)
     return json_encoder(request, indicators)
 
 
 @app.route("/indicators/<indicator_code>/primary")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicator_primary(indicator_code):
-    indicator = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicator_by_code(indicator_code)
+    indicator = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicator_by_code(indicator_code)
 
     if indicator is None:
         return json_encoder(request, indicator)
 
-    primary = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_primary(indicator)
+    primary = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_primary(indicator)
     return json_encoder(request, primary)
 
 
 @app.route("/indicators/<indicator_code>/secondary")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_indicator_secondary(indicator_code):
-    indicator = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicator_by_code(indicator_code)
+    indicator = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicator_by_code(indicator_code)
 
     if indicator is None:
         return json_encoder(request, indicator)
 
-    secondary = IndicatorRepository(recreate_db=False, config=sqlite_config).find_indicators_secondary(indicator)
+    secondary = IndicatorRepository(recreate_db=False, connection_pool=connection_pool).find_indicators_secondary(indicator)
     return json_encoder(request, secondary)
 
 
@@ -275,7 +616,7 @@ def list_indicator_secondary(indicator_code):
 @app.route("/areasInfo")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def areas_info():
-    areas_info = AreaRepository(recreate_db=False, config=sqlite_config).get_areas_info()
+    areas_info = AreaRepository(recreate_db=False, connection_pool=connection_pool).get_areas_info()
     return json_encoder(request, areas_info)
 
 
@@ -283,45 +624,53 @@ def areas_info():
 ##                                    OBSERVATIONS                                      ##
 ##########################################################################################
 @app.route("/observations")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations())
     observations = observation_repo.find_observations()
     return json_encoder(request, observations)
 
 
 @app.route("/observations/<indicator_code>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator(indicator_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations(indicator_code))
     observations = observation_repo.find_observations(indicator_code)
     return json_encoder(request, observations)
 
 
 @app.route("/observations/<indicator_code>/<area_code>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator_and_country(indicator_code, area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations(indicator_code, area_code))
     observations = observation_repo.find_observations(indicator_code, area_code)
     return json_encoder(request, observations)
 
 
 @app.route("/observations/<indicator_code>/<area_code>/<year>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator_and_country_and_year(indicator_code, area_code, year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations(indicator_code, area_code, year))
     observations = observation_repo.find_observations(indicator_code, area_code, year)
     return json_encoder(request, observations)
 
@@ -331,133 +680,28 @@ def list_observations_by_indicator_and_country_and_year(indicator_code, area_cod
 @app.route("/yearsWithIndicatorData")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def years_with_indicator_data():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
-    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
-
-    query_result = observation_repo._get_years_with_indicator()
-    data = {}
-    for (year, indicator) in query_result:
-        if year not in data:
-            data[year] = []
-        data[year].append(indicator)
-
-    return json_response_ok(request, data)
+    return json_response_ok(request, document_builder().years_with_indicator_data())
 
 
 @app.route("/indexObservations/<year>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def indexObservations_by_year(year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
-    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
-    index_indicator = indicator_repo.find_indicators_index()[0]
-    observations = observation_repo.find_tree_observations(index_indicator.indicator, 'ALL', year, 'INDICATOR')
-    areas = area_repo.find_countries(order="iso3")
-
-    data = {'year': year, 'areas': OrderedDict(), 'stats': OrderedDict()}
-    for area in sorted(areas, key=attrgetter('iso3')):
-        for obs in sorted([obs for obs in observations if obs.area.iso3 == area.iso3],
-                          key=lambda o: o.indicator.indicator):
-            if area.iso3 not in data['areas']:
-                data['areas'][area.iso3] = OrderedDict()
-            data['areas'][area.iso3][obs.indicator.indicator] = {
-                'value': obs.value,
-                'rank': obs.rank,
-                'rank_change': obs.rank_change
-            }
-
-    for indicator_code in sorted(set([o.indicator.indicator for o in observations])):
-        per_indicator_obs = [o.value for o in observations if
-                             o.indicator.indicator == indicator_code and o.value is not None]
-        if indicator_code not in data['stats']:
-            data['stats'][indicator_code] = OrderedDict()
-        data['stats'][indicator_code][':::'] = OrderedDict()
-        data['stats'][indicator_code][':::']['mean'] = statistics.mean(per_indicator_obs)
-        data['stats'][indicator_code][':::']['median'] = statistics.median(per_indicator_obs)
-        for region in area_repo.find_regions():
-            per_region_obs = [o.value for o in observations if
-                              o.indicator.indicator == indicator_code and o.value is not None and o.area.iso3 in [c.iso3
-                                                                                                                  for c
-                                                                                                                  in
-                                                                                                                  region.countries]]
-            data['stats'][indicator_code][region.iso3] = OrderedDict()
-            data['stats'][indicator_code][region.iso3]['mean'] = statistics.mean(per_region_obs)
-            data['stats'][indicator_code][region.iso3]['median'] = statistics.median(per_region_obs)
-
-    return json_response_ok(request, data)
+    return json_response_ok(request, document_builder().index_observations(year))
 
 
 @app.route("/indexEvolution/<year>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def indexEvolution_by_year(year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
-    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
-    index_indicator = indicator_repo.find_indicators_index()[0]
-    observations = observation_repo.find_tree_observations(index_indicator.indicator, 'ALL', None, 'COMPONENT')
-    areas = area_repo.find_countries(order="iso3")
-
-    data = {'year': year, 'areas': OrderedDict(), 'stats': OrderedDict()}
-    for area in sorted(areas, key=attrgetter('iso3')):
-        for obs in sorted([obs for obs in observations if obs.area.iso3 == area.iso3],
-                          key=lambda o: o.indicator.indicator):
-            if area.iso3 not in data['areas']:
-                data['areas'][area.iso3] = OrderedDict()
-            if obs.indicator.indicator not in data['areas'][area.iso3]:
-                data['areas'][area.iso3][obs.indicator.indicator] = OrderedDict()
-
-            if obs.year == int(year):
-                data['areas'][area.iso3][obs.indicator.indicator]['value'] = obs.value
-                if obs.indicator.type == 'INDEX':
-                    data['areas'][area.iso3][obs.indicator.indicator]['rank'] = obs.rank
-                    data['areas'][area.iso3][obs.indicator.indicator]['rank_change'] = obs.rank_change
-
-            if obs.indicator.type == 'INDEX':
-                if 'score_evolution' not in data['areas'][area.iso3][obs.indicator.indicator]:
-                    data['areas'][area.iso3][obs.indicator.indicator]['score_evolution'] = []
-                    # data['areas'][area.iso3][obs.indicator.indicator]['value_evolution'] = []
-                data['areas'][area.iso3][obs.indicator.indicator]['score_evolution'].append(
-                    {'year': obs.year, 'value': obs.value})
-                # data['areas'][area.iso3][obs.indicator.indicator]['value_evolution'].append(
-                #     {'year': obs.year, 'value': obs.value})
-
-    # Clean areas without data that year
-    for area in list(data['areas'].keys()):
-        if 'value' not in data['areas'][area]['ODB']:
-            del data['areas'][area]
-
-    for indicator_code in sorted(set([o.indicator.indicator for o in observations])):
-        per_indicator_obs = [o.value for o in observations if
-                             o.indicator.indicator == indicator_code and o.value is not None]
-        if indicator_code not in data['stats']:
-            data['stats'][indicator_code] = OrderedDict()
-        data['stats'][indicator_code][':::'] = OrderedDict()
-        data['stats'][indicator_code][':::']['mean'] = statistics.mean(per_indicator_obs)
-        data['stats'][indicator_code][':::']['median'] = statistics.median(per_indicator_obs)
-        for region in area_repo.find_regions():
-            per_region_obs = [o.value for o in observations if
-                              o.indicator.indicator == indicator_code and o.value is not None and o.area.iso3 in [c.iso3
-                                                                                                                  for c
-                                                                                                                  in
-                                                                                                                  region.countries]]
-            data['stats'][indicator_code][region.iso3] = OrderedDict()
-            data['stats'][indicator_code][region.iso3]['mean'] = statistics.mean(per_region_obs)
-            data['stats'][indicator_code][region.iso3]['median'] = statistics.median(per_region_obs)
-
-    return json_response_ok(request, data)
+    return json_response_ok(request, document_builder().index_evolution(year))
 
 
 # @app.route("/indexStats/<year>")
 # @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 # def indexStats_by_year(year):
-#     area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-#     indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+#     area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+#     indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
 #     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-#                                              config=sqlite_config)
+#                                              connection_pool=connection_pool)
 #     index_indicator = indicator_repo.find_indicators_index()[0]
 #     observations = observation_repo.find_tree_observations(index_indicator.indicator, 'ALL', year, 'INDICATOR')
 #     areas = area_repo.find_countries(order="iso3")
@@ -486,88 +730,13 @@ def indexEvolution_by_year(year):
 @app.route("/indexStats/<year>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def indexStats_by_year(year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
-    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
-    index_indicator = indicator_repo.find_indicators_index()[0]
-    observations = observation_repo.find_tree_observations(index_indicator.indicator, 'ALL', year, 'INDICATOR')
-    areas = area_repo.find_countries(order="iso3")
-
-    data = {'year': year, 'stats': OrderedDict()}
-
-    for region in area_repo.find_regions():
-        per_region_obs = [o for o in observations if o.value is not None
-                          and o.area.iso3 in [c.iso3 for c in region.countries]]
-        for indicator_code in sorted(set([o.indicator.indicator for o in observations])):
-            per_indicator_obs = [o.value for o in per_region_obs if
-                                 o.indicator.indicator == indicator_code and o.value is not None]
-            if region.iso3 not in data['stats']:
-                data['stats'][region.iso3] = OrderedDict()
-            data['stats'][region.iso3][indicator_code] = OrderedDict()
-            data['stats'][region.iso3][indicator_code]['mean'] = statistics.mean(per_indicator_obs)
-            data['stats'][region.iso3][indicator_code]['median'] = statistics.median(per_indicator_obs)
-
-    data['stats'][':::'] = OrderedDict()
-    for indicator_code in sorted(set([o.indicator.indicator for o in observations])):
-        per_indicator_obs = [o.value for o in observations if
-                             o.indicator.indicator == indicator_code and o.value is not None]
-        data['stats'][':::'][indicator_code] = OrderedDict()
-        data['stats'][':::'][indicator_code]['mean'] = statistics.mean(per_indicator_obs)
-        data['stats'][':::'][indicator_code]['median'] = statistics.median(per_indicator_obs)
-
-    return json_response_ok(request, data)
+    return json_response_ok(request, document_builder().index_stats(year))
 
 
 @app.route("/countryObservations/<area_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def countryObservations_by_area(area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
-    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
-
-    index_indicator = indicator_repo.find_indicators_index()[0]
-
-    data = {'area': area_code, 'years': OrderedDict()}
-
-    for year in sorted([str(y.value) for y in observation_repo.get_year_list()]):
-        observations = observation_repo.find_tree_observations(index_indicator.indicator, area_code, year, 'INDICATOR',
-                                                               False)
-        if not observations: continue;
-        data['years'][year] = {'observations': OrderedDict(), 'stats': OrderedDict(), 'datasets': OrderedDict()}
-        for obs in sorted([obs for obs in observations if obs.dataset_indicator is None],
-                          key=lambda o: o.indicator.indicator):
-            data['years'][year]['observations'][obs.indicator.indicator] = {
-                'value': obs.value,
-                'rank': obs.rank,
-                'rank_change': obs.rank_change
-            }
-
-        indicators_with_dataset = sorted(
-            set([obs.indicator.indicator for obs in observations if obs.dataset_indicator is not None]))
-        for indicator in indicators_with_dataset:
-            dataset_observations = sorted([obs for obs in observations if obs.indicator.indicator == indicator],
-                                          key=lambda o: o.indicator.indicator)
-            data['years'][year]['datasets'][indicator] = OrderedDict()
-            for obs in dataset_observations:
-                if obs.dataset_indicator is None:
-                    data['years'][year]['datasets'][obs.indicator.indicator]['VALUE'] = obs.value
-                else:
-                    data['years'][year]['datasets'][obs.indicator.indicator][
-                        obs.dataset_indicator.indicator] = obs.value
-
-        for indicator_code in sorted(set([o.indicator.indicator for o in observations])):
-            per_indicator_obs = [o.value for o in observations if
-                                 o.indicator.indicator == indicator_code and o.value is not None and o.dataset_indicator is None]
-            data['years'][year]['stats'][indicator_code] = OrderedDict()
-            data['years'][year]['stats'][indicator_code]['mean'] = statistics.mean(
-                per_indicator_obs) if per_indicator_obs else None
-            data['years'][year]['stats'][indicator_code]['median'] = statistics.median(
-                per_indicator_obs) if per_indicator_obs else None
-
-            # assert (data['years'][year]['observations'])
-    return json_response_ok(request, data)
+    return json_response_ok(request, document_builder().country_observations(area_code))
 
 
 ##########################################################################################
@@ -576,10 +745,10 @@ def countryObservations_by_area(area_code):
 @app.route("/statistics")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_statistics():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     statistics = observation_repo.find_observations_statistics()
     return json_encoder(request, statistics)
 
@@ -587,10 +756,10 @@ def list_observations_statistics():
 @app.route("/statistics/<indicator_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_statistics(indicator_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     statistics = observation_repo.find_observations_statistics(indicator_code)
     return json_encoder(request, statistics)
 
@@ -598,10 +767,10 @@ def list_observations_by_indicator_statistics(indicator_code):
 @app.route("/statistics/<indicator_code>/<area_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_and_country_statistics(indicator_code, area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     statistics = observation_repo.find_observations_statistics(indicator_code, area_code)
     return json_encoder(request, statistics)
 
@@ -609,10 +778,10 @@ def list_observations_by_indicator_and_country_statistics(indicator_code, area_c
 @app.route("/statistics/<indicator_code>/<area_code>/<year>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_and_country_and_year_statistics(indicator_code, area_code, year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     statistics = observation_repo.find_observations_statistics(indicator_code, area_code, year)
     return json_encoder(request, statistics)
 
@@ -621,45 +790,53 @@ def list_observations_by_indicator_and_country_and_year_statistics(indicator_cod
 ##                                   VISUALISATION                                      ##
 ##########################################################################################
 @app.route("/visualisations")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_visualisations():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations_visualisation())
     visualisation = observation_repo.find_observations_visualisation()
     return json_encoder(request, visualisation)
 
 
 @app.route("/visualisations/<indicator_code>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator_visualisations(indicator_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations_visualisation(indicator_code))
     visualisation = observation_repo.find_observations_visualisation(indicator_code)
     return json_encoder(request, visualisation)
 
 
 @app.route("/visualisations/<indicator_code>/<area_code>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator_and_country_visualisations(indicator_code, area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations_visualisation(indicator_code, area_code))
     visualisation = observation_repo.find_observations_visualisation(indicator_code, area_code)
     return json_encoder(request, visualisation)
 
 
 @app.route("/visualisations/<indicator_code>/<area_code>/<year>")
-@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
+@cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key, unless=is_streaming)
 def list_observations_by_indicator_and_country_and_year_visualisations(indicator_code, area_code, year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
+    if is_streaming():
+        return json_stream_response(request, observation_repo.iter_observations_visualisation(indicator_code, area_code, year))
     visualisation = observation_repo.find_observations_visualisation(indicator_code, area_code, year)
     return json_encoder(request, visualisation)
 
@@ -671,10 +848,10 @@ def list_observations_by_indicator_and_country_and_year_visualisations(indicator
 @app.route("/visualisationsGroupedByArea")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_visualisations_grouped_by_area():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     visualisation = observation_repo.find_observations_grouped_by_area_visualisation()
     return json_encoder(request, visualisation)
 
@@ -682,10 +859,10 @@ def list_observations_visualisations_grouped_by_area():
 @app.route("/visualisationsGroupedByArea/<indicator_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_visualisations_grouped_by_area(indicator_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     visualisation = observation_repo.find_observations_grouped_by_area_visualisation(indicator_code)
     return json_encoder(request, visualisation)
 
@@ -693,10 +870,10 @@ def list_observations_by_indicator_visualisations_grouped_by_area(indicator_code
 @app.route("/visualisationsGroupedByArea/<indicator_code>/<area_code>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_and_country_visualisations_grouped_by_area(indicator_code, area_code):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     visualisation = observation_repo.find_observations_grouped_by_area_visualisation(indicator_code, area_code)
     return json_encoder(request, visualisation)
 
@@ -704,10 +881,10 @@ def list_observations_by_indicator_and_country_visualisations_grouped_by_area(in
 @app.route("/visualisationsGroupedByArea/<indicator_code>/<area_code>/<year>")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_by_indicator_and_country_and_year_visualisations_grouped_by_area(indicator_code, area_code, year):
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     visualisation = observation_repo.find_observations_grouped_by_area_visualisation(indicator_code, area_code, year)
     return json_encoder(request, visualisation)
 
@@ -719,10 +896,10 @@ def list_observations_by_indicator_and_country_and_year_visualisations_grouped_b
 @app.route("/years")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_years():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     years = observation_repo.get_year_list()
     return json_encoder(request, years)
 
@@ -730,10 +907,10 @@ def list_observations_years():
 @app.route("/years/array")
 @cache.cached(timeout=TIMEOUT, key_prefix=make_cache_key)
 def list_observations_years_array():
-    area_repo = AreaRepository(recreate_db=False, config=sqlite_config)
-    indicator_repo = IndicatorRepository(recreate_db=False, config=sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
     observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
-                                             config=sqlite_config)
+                                             connection_pool=connection_pool)
     years = observation_repo.get_year_list()
     years_array = [year.value for year in years]
     return json_response_ok(request, years_array)
@@ -750,4 +927,6 @@ def handle_repository_error(error):
 
 if __name__ == "__main__":
     app.debug = True
+    if warm_up_enabled:
+        warm_up_in_background()
     app.run(host='0.0.0.0')
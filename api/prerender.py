@@ -0,0 +1,15 @@
+import argparse
+import logging
+
+import api
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders the API responses into the response store")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes rendering responses in parallel (default: number of CPUs)")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete the responses of other database build versions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    if api.prerender_responses(args.workers, args.prune) is None:
+        logging.warning("Nothing was published, run it again")
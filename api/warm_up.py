@@ -0,0 +1,17 @@
+import argparse
+import logging
+
+import api
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes the heaviest API responses into the cache")
+    parser.add_argument("--workers", type=int, default=api.warm_up_workers,
+                        help="responses computed at the same time (default: WARM_UP_WORKERS of the configuration)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    # This process warms up the cache in the foreground, its own requests must not start it in the background
+    api.warm_up_enabled = False
+    results = api.warm_up_cache(args.workers)
+    failed = [url for url, status in results if status != 200]
+    if failed:
+        logging.warning("Failed responses: %s" % (", ".join(failed),))
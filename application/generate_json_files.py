@@ -1,9 +1,22 @@
+import argparse
+import configparser
 import json
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from operator import itemgetter
 
-from application.odbFetcher.enrichment.rest_client import get_json
+from infrastructure.documents import DocumentBuilder
+from infrastructure.sql_repos.area_repository import AreaRepository
+from infrastructure.sql_repos.connection_pool import ReadOnlyConnectionPool
+from infrastructure.sql_repos.indicator_repository import IndicatorRepository
+from infrastructure.sql_repos.observation_repository import ObservationRepository
+from infrastructure.sql_repos.summary_repository import SummaryRepository
+
+JSON_DIR = os.path.join(os.path.dirname(__file__), "json")
+
+# Document builder of each exporter process, set by _init_document_builder
+_document_builder = None
 
 
 def configure_log():
@@ -17,119 +30,154 @@ def configure_log():
     logging.getLogger('').addHandler(console)
 
 
-def generateOdbJson(log):
+def get_database():
+    sqlite_config = configparser.ConfigParser()
+    sqlite_config.read(os.path.join(os.path.dirname(__file__), 'sqlite_config.ini'))
+    return os.path.join(os.path.dirname(__file__), sqlite_config.get("CONNECTION", "SQLITE_DB"))
+
+
+def create_document_builder(database):
+    """
+    Creates a document builder reading the database through a read-only connection pool
+
+    Args:
+        database (str): path to the database file
+
+    Returns:
+        DocumentBuilder: document builder for the database
+    """
+    sqlite_config = configparser.RawConfigParser()
+    sqlite_config.add_section("CONNECTION")
+    sqlite_config.set("CONNECTION", "SQLITE_DB", database)
+    connection_pool = ReadOnlyConnectionPool(sqlite_config)
+    area_repo = AreaRepository(recreate_db=False, connection_pool=connection_pool)
+    indicator_repo = IndicatorRepository(recreate_db=False, connection_pool=connection_pool)
+    observation_repo = ObservationRepository(recreate_db=False, area_repo=area_repo, indicator_repo=indicator_repo,
+                                             connection_pool=connection_pool)
+    summary_repo = SummaryRepository(recreate_db=False, connection_pool=connection_pool)
+    return DocumentBuilder(area_repo, indicator_repo, observation_repo, summary_repo)
+
+
+def _init_document_builder(database):
+    global _document_builder
+    _document_builder = create_document_builder(database)
+
+
+def _export_document(file_name, document, *args):
+    """
+    Builds a document with the document builder of the process and writes it, it's run by the pool workers
+
+    Args:
+        file_name (str): name of the file to write under JSON_DIR
+        document (str): name of the DocumentBuilder method that builds the document
+        *args: arguments of the method
+
+    Returns:
+        str: the name of the written file
+    """
+    write_json(file_name, getattr(_document_builder, document)(*args))
+    return file_name
+
+
+def write_json(file_name, data):
+    filename = os.path.join(JSON_DIR, file_name)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w") as json_file:
+        json.dump(data, json_file, ensure_ascii=False)
+
+
+def _wait_for(log, futures):
+    for future in as_completed(futures):
+        log.info('\tWritten %s' % (future.result(),))
+
+
+def generateOdbJson(log, executor, years):
     log.info('Generating ODB data per year documents')
-    uri = "http://localhost:5000/years"
-    response = get_json(uri, {"format": "json"})
-    years = [y['value'] for y in response['data']]
-    for year in years:
-        log.info('\tRetrieving ODB data for %s' % (year,))
-        uri = "http://localhost:5000/indexObservations/%s" % (year,)
-        filename = os.path.join(os.path.dirname(__file__), "json", "odb_%s.json" % (year,))
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        response = get_json(uri, {"format": "json"})
-        json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
-
-def generateOdbEvolutionJson(log):
+    return [executor.submit(_export_document, "odb_%s.json" % (year,), 'index_observations', str(year))
+            for year in years]
+
+
+def generateOdbEvolutionJson(log, executor, years):
     log.info('Generating ODB evolution data per year documents')
-    uri = "http://localhost:5000/years"
-    response = get_json(uri, {"format": "json"})
-    years = [y['value'] for y in response['data']]
-    for year in years:
-        log.info('\tRetrieving ODB evolution data for %s' % (year,))
-        uri = "http://localhost:5000/indexEvolution/%s" % (year,)
-        filename = os.path.join(os.path.dirname(__file__), "json", "odb_evolution_%s.json" % (year,))
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        response = get_json(uri, {"format": "json"})
-        json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
+    return [executor.submit(_export_document, "odb_evolution_%s.json" % (year,), 'index_evolution', str(year))
+            for year in years]
+
+
+def generateOdbPerCountryJson(log, executor, countries):
+    log.info('Generating ODB data per country documents')
+    return [executor.submit(_export_document, "odb_%s.json" % (country,), 'country_observations', country)
+            for country in countries]
 
 
-def generateCountriesJson(log):
+def generateCountriesJson(log, document_builder):
     log.info('Generating countries document')
-    uri = "http://localhost:5000/areas/regions"
-    countries_filename = os.path.join(os.path.dirname(__file__), "json", "countries.json")
-    regions_filename = os.path.join(os.path.dirname(__file__), "json", "regions.json")
-    os.makedirs(os.path.dirname(countries_filename), exist_ok=True)
-    response = get_json(uri, {"format": "json"})
     regions = []
     countries = []
-    for region in sorted(response['data'], key=itemgetter('short_name')):
+    for region in sorted(document_builder.regions(), key=itemgetter('short_name')):
         regions.append({k: v for (k, v) in region.items() if k in ['iso3', 'name', 'short_name']})
         countries.extend(region['countries'])
     countries = sorted(countries, key=itemgetter('short_name'))
-    json.dump(countries, open(countries_filename, "w"), ensure_ascii=False)
-    json.dump(regions, open(regions_filename, "w"), ensure_ascii=False)
+    write_json("countries.json", countries)
+    write_json("regions.json", regions)
 
 
-def generateIndicatorsJson(log):
+def generateIndicatorsJson(log, document_builder):
     log.info('Generating indicators document')
-    uri = "http://localhost:5000/indicators_flattened"
-    filename = os.path.join(os.path.dirname(__file__), "json", "indicators.json")
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    response = get_json(uri, {"format": "json"})
-    json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
+    write_json("indicators.json", document_builder.indicators_flattened())
 
 
-def generateMetaIndicatorsJson(log):
+def generateMetaIndicatorsJson(log, document_builder):
     log.info('Generating meta indicators document')
-    uri = "http://localhost:5000/indicators_meta"
-    filename = os.path.join(os.path.dirname(__file__), "json", "indicators_meta.json")
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    response = get_json(uri, {"format": "json"})
-    json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
+    write_json("indicators_meta.json", document_builder.indicators_meta())
 
-def generateOdbPerCountryJson(log):
-    log.info('Generating ODB data per country documents')
-    uri = "http://localhost:5000/areas/countries"
-    response = get_json(uri, {"format": "json"})
-    countries = [c['iso3'] for c in response['data']]
-    for country in countries:
-        log.info('\tRetrieving ODB data for ' + country)
-        uri = "http://localhost:5000/countryObservations/%s" % (country,)
-        filename = os.path.join(os.path.dirname(__file__), "json", "odb_%s.json" % (country,))
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        response = get_json(uri, {"format": "json"})
-        json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
-
-def generateYearsWithIndicatorDataJson(log):
+
+def generateYearsWithIndicatorDataJson(log, document_builder):
     log.info('Generating years with indicator data document')
-    uri = "http://localhost:5000/yearsWithIndicatorData"
-    filename = os.path.join(os.path.dirname(__file__), "json", "years_with_data.json")
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    response = get_json(uri, {"format": "json"})
-    json.dump(response['data'], open(filename, "w"), ensure_ascii=False)
+    write_json("years_with_data.json", document_builder.years_with_indicator_data())
 
 
-def generateStatsJson(log):
+def generateStatsJson(log, document_builder, years):
     log.info('Generating stats document')
-    filename = os.path.join(os.path.dirname(__file__), "json", "stats.json")
-
-    uri = "http://localhost:5000/years"
-    response = get_json(uri, {"format": "json"})
-    years = [y['value'] for y in response["data"]]
-
     data = {}
     for year in years:
-        uri = "http://localhost:5000/indexStats/%s" % (year,)
-        response = get_json(uri, {"format": "json"})
-        data[year] = response['data']['stats']
+        data[year] = document_builder.index_stats(str(year))['stats']
+    write_json("stats.json", data)
+
 
-    json.dump(data, open(filename, "w"), ensure_ascii=False)
+def run(workers=None):
+    """
+    Writes the JSON documents of the API under the json folder, building them straight from the database instead of
+    requesting them to a running API. The documents per year and per country are built in parallel by a pool of
+    processes
 
-def run():
+    Args:
+        workers (int, optional): number of processes of the pool, the number of CPUs by default
+    """
     configure_log()
     log = logging.getLogger("odbFetcher")
-    generateIndicatorsJson(log)
-    generateMetaIndicatorsJson(log)
-    generateCountriesJson(log)
-    generateOdbJson(log)
-    generateOdbEvolutionJson(log)
-    generateOdbPerCountryJson(log)
-    generateYearsWithIndicatorDataJson(log)
-    generateStatsJson(log)
+    database = get_database()
+    document_builder = create_document_builder(database)
+    years = [y['value'] for y in document_builder.years()]
+    countries = [c['iso3'] for c in document_builder.countries()]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_document_builder,
+                             initargs=(database,)) as executor:
+        futures = generateOdbJson(log, executor, years)
+        futures += generateOdbEvolutionJson(log, executor, years)
+        futures += generateOdbPerCountryJson(log, executor, countries)
+
+        generateIndicatorsJson(log, document_builder)
+        generateMetaIndicatorsJson(log, document_builder)
+        generateCountriesJson(log, document_builder)
+        generateYearsWithIndicatorDataJson(log, document_builder)
+        generateStatsJson(log, document_builder, years)
+        _wait_for(log, futures)
     log.info('Done')
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Writes the JSON documents of the ODB API under the json folder")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes building documents in parallel (default: number of CPUs)")
+    run(parser.parse_args().workers)
     print("Done! :)")
@@ -73,3 +73,4 @@ class Enricher(object):
         for iso3, search in self._retrieved_search_data.items():
             self._area_repo.update_search_data(iso3, search, commit=False)
         self._area_repo.commit_transaction()
+        self._area_repo.reset_cache()
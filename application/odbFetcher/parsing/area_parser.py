@@ -1,3 +1,4 @@
+import hashlib
 import os
 import re
 from urllib.parse import urljoin
@@ -7,7 +8,10 @@ from application.odbFetcher.parsing.excel_model.excel_area_info import ExcelArea
 from application.odbFetcher.parsing.parser import Parser
 from application.odbFetcher.parsing.utils import excel_region_to_dom, excel_country_to_dom, str_to_none, is_not_empty, \
     get_column_number, excel_area_info_to_dom
-from json import load
+from json import load, dumps
+
+# Indicator code of the area infos parsed from the area info sheets
+CLUSTER_INDICATOR_CODE = "CLUSTER"
 
 
 class AreaParser(Parser):
@@ -30,6 +34,31 @@ class AreaParser(Parser):
         self._retrieve_area_infos()
         self._store_area_infos()
 
+    def input_hashes(self):
+        """
+        Returns:
+            dict: content hash of the sheet the areas are parsed from, by sheet name, and of the fake iso codes
+        """
+        hashes = self._hash_sheets([self._initialize_area_sheet()])
+        hashes["fake_iso_codes.json"] = hashlib.sha1(
+            dumps(self._fake_iso_codes, sort_keys=True).encode('utf-8')).hexdigest()
+        return hashes
+
+    def area_info_hashes(self):
+        """
+        Returns:
+            dict: content hash of every sheet the area infos are parsed from, by sheet name
+        """
+        return self._hash_sheets(self._initialize_area_info_sheets())
+
+    def update_area_infos(self):
+        """
+        Parses the area infos again, replacing the ones stored
+        """
+        self._log.info("Updating area infos")
+        self._retrieve_area_infos()
+        self._store_area_infos(replace=True)
+
     def _initialize_area_sheet(self):
         self._log.info("\tGetting area sheet...")
         area_file_name = self._config.get("AREA_ACCESS", "FILE_NAME")
@@ -77,7 +106,7 @@ class AreaParser(Parser):
                 iso3 = area_info_sheet.cell(row_number, iso3_column).value
                 year = area_info_sheet.cell(row_number, year_column).value
                 # FIXME: How to format properly? and do we need to add long name?
-                indicator_code = "CLUSTER"  # area_info_sheet.cell(area_info_name_row, cluster_column).value
+                indicator_code = CLUSTER_INDICATOR_CODE  # area_info_sheet.cell(area_info_name_row, cluster_column).value
                 # FIXME: Need to sanitize?
                 value = str_to_none(area_info_sheet.cell(row_number, cluster_column).value)
 
@@ -86,19 +115,24 @@ class AreaParser(Parser):
                 area_info = ExcelAreaInfo(iso3, indicator_code, value, year)
                 self._excel_area_infos[iso3].append(area_info)
 
-    def _store_area_infos(self):
+    def _store_area_infos(self, replace=False):
         self._log.info("\tStoring area infos...")
         self._area_repo.begin_transaction()
+        if replace:
+            self._area_repo.delete_area_infos(CLUSTER_INDICATOR_CODE, commit=False)
 
         provider_url = self._config.get("ENRICHMENT", "WF_PROVIDER_URL")
         provider_name = self._config.get("ENRICHMENT", "WF_PROVIDER_NAME")
+        area_infos = []
         for iso3, area_info_list in self._excel_area_infos.items():
             for excel_area_info in area_info_list:
                 area_info = excel_area_info_to_dom(excel_area_info)
                 area_info.provider_url = provider_url
                 area_info.provider_name = provider_name
-                self._area_repo.upsert_area_info(iso3, area_info, commit=False)
+                area_infos.append((iso3, area_info))
+        self._area_repo.upsert_area_infos(area_infos, commit=False)
         self._area_repo.commit_transaction()
+        self._reset_repository_caches()
 
     def _retrieve_areas(self):
         area_sheet = self._initialize_area_sheet()
@@ -173,18 +207,23 @@ class AreaParser(Parser):
         self._store_regions()
         self._store_countries()
         self._area_repo.commit_transaction()
+        self._reset_repository_caches()
 
     def _store_regions(self):
+        regions = []
         for excel_region in self._excel_regions:
             region = excel_region_to_dom(excel_region)
             region.uri = urljoin(self._config.get("OTHERS", "HOST"), "areas/%s" % (region.iso3,))
-            self._area_repo.insert_region(region, commit=False)
+            regions.append(region)
+        self._area_repo.insert_regions(regions, commit=False)
 
     def _store_countries(self):
+        countries = []
         for excel_country in self._excel_countries:
             country = excel_country_to_dom(excel_country)
             country.uri = urljoin(self._config.get("OTHERS", "HOST"), "areas/%s" % (country.iso3,))
-            self._area_repo.insert_country(country, commit=False)
+            countries.append(country)
+        self._area_repo.insert_countries(countries, commit=False)
 
 
 if __name__ == "__main__":
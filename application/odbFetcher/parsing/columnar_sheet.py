@@ -0,0 +1,88 @@
+import hashlib
+
+
+class ColumnarSheet(object):
+    """
+    Read-only columnar view over a xlrd sheet. Every column is extracted at most once with col_values and kept as a
+    plain list indexed by row number, so the parsers can walk whole columns without building a xlrd Cell object for
+    each value they read.
+
+    It can be pickled (to hand it to another process): all the columns are extracted then and the copy no longer
+    depends on the xlrd sheet.
+    """
+
+    def __init__(self, sheet):
+        self._sheet = sheet
+        self._name = sheet.name
+        self._nrows = sheet.nrows
+        self._ncols = sheet.ncols
+        self._columns = {}
+        self._content_hash = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def nrows(self):
+        return self._nrows
+
+    @property
+    def ncols(self):
+        return self._ncols
+
+    def column(self, column_number):
+        """
+        Retrieves all the values of a column, header rows included, so that the list can be indexed by row number.
+
+        Args:
+            column_number (int): xlrd column number
+
+        Returns:
+            list: the values of the column, one per row of the sheet
+        """
+        column = self._columns.get(column_number)
+        if column is None:
+            column = self._sheet.col_values(column_number)
+            self._columns[column_number] = column
+        return column
+
+    def cell_value(self, row_number, column_number):
+        return self.column(column_number)[row_number]
+
+    def row_values(self, row_number, start_column=0):
+        """
+        Retrieves the values of a row (typically the header one) from start_column to the end of the sheet.
+
+        Args:
+            row_number (int): xlrd row number
+            start_column (int): first column to retrieve
+
+        Returns:
+            list: the values of the row
+        """
+        return [self.column(column_number)[row_number] for column_number in range(start_column, self._ncols)]
+
+    def content_hash(self):
+        """
+        Hashes the values of every column of the sheet, so that two versions of a sheet can be told apart without
+        keeping a copy of the older one.
+
+        Returns:
+            str: SHA-1 hex digest of the values of the sheet
+        """
+        if self._content_hash is None:
+            digest = hashlib.sha1()
+            for column_number in range(self._ncols):
+                digest.update(repr(self.column(column_number)).encode('utf-8'))
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_columns'] = dict((column_number, self.column(column_number)) for column_number in range(self._ncols))
+        state['_sheet'] = None
+        return state
+
+    def __str__(self):
+        return "ColumnarSheet(%s, %d rows, %d columns)" % (self._name, self._nrows, self._ncols)
@@ -22,6 +22,13 @@ class IndicatorParser(Parser):
         self._retrieve_indicators(structure_sheet, indicator_sheet)
         self._store_indicators()
 
+    def input_hashes(self):
+        """
+        Returns:
+            dict: content hash of every sheet the indicators are parsed from, by sheet name
+        """
+        return self._hash_sheets([self._initialize_structure_sheet(), self._initialize_indicator_sheet()])
+
     def _initialize_indicator_sheet(self):
         self._log.info("\tGetting indicators sheet...")
         structure_file_name = self._config.get("STRUCTURE_ACCESS", "FILE_NAME")
@@ -169,8 +176,11 @@ class IndicatorParser(Parser):
         """
         self._log.info("\tStoring indicators...")
         self._indicator_repo.begin_transaction()
+        indicators = []
         for excel_indicator in self._excel_indicators:
             indicator = excel_indicator_to_dom(excel_indicator)
             indicator.uri = urljoin(self._config.get("OTHERS", "HOST"), indicator.indicator)
-            self._indicator_repo.insert_indicator(indicator, commit=False)
+            indicators.append(indicator)
+        self._indicator_repo.insert_indicators(indicators, commit=False)
         self._indicator_repo.commit_transaction()
+        self._reset_repository_caches()
@@ -1,10 +1,13 @@
 import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from operator import attrgetter
 from urllib.parse import urljoin
 
 from sortedcontainers import SortedListWithKey
 from xlrd import colname, cellname
 
+from application.odbFetcher.parsing.columnar_sheet import ColumnarSheet
 from application.odbFetcher.parsing.excel_model.excel_observation import ExcelObservation
 from application.odbFetcher.parsing.parser import Parser, ParserError
 from application.odbFetcher.parsing.utils import excel_observation_to_dom, na_to_none, get_column_number
@@ -13,187 +16,452 @@ from infrastructure.sql_repos.area_repository import AreaRepository
 from infrastructure.sql_repos.indicator_repository import IndicatorRepository
 from odb.domain.model.indicator.indicator import create_indicator
 
+# Kinds of observations sheets, named after their configuration sections
+RAW_OBSERVATIONS = 'RAW_OBSERVATIONS'
+STRUCTURE_OBSERVATIONS = 'STRUCTURE_OBSERVATIONS'
+DATASET_OBSERVATIONS = 'DATASET_OBSERVATIONS'
+
+# ObservationParser method that parses a sheet of each kind
+SHEET_PARSING_METHODS = {
+    RAW_OBSERVATIONS: '_retrieve_raw_sheet_observations',
+    STRUCTURE_OBSERVATIONS: '_retrieve_structure_sheet_observations',
+    DATASET_OBSERVATIONS: '_retrieve_dataset_sheet_observations'
+}
+
 
 class ObservationParser(Parser):
     """
     Retrieves the observations from the data Excel file and stores them into the database.
+
+    Every year sheet is parsed on its own into batches of observations, which are merged in sheet order. With more
+    than one worker the sheets are parsed by a pool of processes, each one with its own repositories, that return the
+    batches as plain ExcelObservation lists; the areas and indicators are found again and the observations stored by
+    this process, so the database is written serially and ends up the same as with a sequential parse.
     """
 
-    def __init__(self, log, config, area_repo=None, indicator_repo=None, observation_repo=None):
+    def __init__(self, log, config, area_repo=None, indicator_repo=None, observation_repo=None, workers=None,
+                 sqlite_config=None):
+        """
+        Constructor for ObservationParser
+
+        Args:
+            log (Logger): log
+            config (ConfigParser): parser configuration
+            area_repo (AreaRepository): area repository
+            indicator_repo (IndicatorRepository): indicator repository
+            observation_repo (ObservationRepository): observation repository
+            workers (int, optional): number of processes parsing the sheets, they are parsed by this process if None
+                or 1
+            sqlite_config (ConfigParser, optional): sqlite configuration of the workers' repositories, required when
+                there is more than one worker
+        """
         super(ObservationParser, self).__init__(log, config, area_repo, indicator_repo, observation_repo)
+        if workers is not None and workers > 1 and sqlite_config is None:
+            raise ParserError("A sqlite configuration is needed to parse with %d workers" % (workers,))
+        self._workers = workers
+        self._sqlite_config = sqlite_config
+        self._executor = None
+        self._sheet_futures = {}
+        # (name, content hash, number of observations) of the sheets parsed and names of the sheets whose observations
+        # are replaced, by kind
+        self._parsed_sheets = dict((kind, []) for kind in SHEET_PARSING_METHODS)
+        self._replaced_sheet_names = dict((kind, []) for kind in SHEET_PARSING_METHODS)
+        # Years of the observations inserted or deleted
+        self._changed_years = set()
         self._excel_raw_observations = []
         self._excel_dataset_observations = []
         self._excel_structure_observations = []
+        # (year, iso3, indicator code) of every observation in _excel_structure_observations, to detect duplicates
+        self._structure_observation_keys = set()
+        self._indicator_code_error_cache = {}
 
     def run(self):
         self._log.info("Running observation parser")
-        self._retrieve_raw_observations()
-        self._store_raw_observations()
-        self._retrieve_structure_observations()
-        self._store_structure_observations()
-        self._retrieve_dataset_assesments()
-        self._store_dataset_observations()
+        self._parse_sheets(self._get_observation_sheets())
+        # The indexes are left until all the observations are loaded on a bulk load, the rank changes need them
+        self._observation_repo.create_indexes()
         self._update_rank_change()
 
-    def _update_rank_change(self):
+    def update(self):
+        """
+        Incremental version of run: parses again only the sheets whose content changed since they were stored,
+        replacing their observations, and deletes the observations of the sheets that are gone. The rank changes are
+        updated for the years whose observations changed and the years after them.
+
+        Duplicate SUBINDEX observations are only checked among the sheets parsed again, a duplicate of an observation
+        of an unchanged sheet makes the insertion fail
+
+        Returns:
+            set of int: years whose observations or rank changes were updated
+        """
+        self._log.info("Updating observations")
+        sheets = self._get_observation_sheets()
+        changed_sheets = OrderedDict()
+        for kind, kind_sheets in sheets.items():
+            stored_hashes = self._observation_repo.find_sheet_hashes(kind)
+            changed_sheets[kind] = [sheet for sheet in kind_sheets
+                                    if stored_hashes.get(sheet.name) != sheet.content_hash()]
+            self._replaced_sheet_names[kind] = [sheet.name for sheet in changed_sheets[kind]] + sorted(
+                set(stored_hashes) - set(sheet.name for sheet in kind_sheets))
+            self._log.info("\t%s: %d sheets changed, %d removed, %d unchanged" % (
+                kind, len(changed_sheets[kind]), len(self._replaced_sheet_names[kind]) - len(changed_sheets[kind]),
+                len(kind_sheets) - len(changed_sheets[kind])))
+
+        self._parse_sheets(changed_sheets)
+        years = self._changed_years | set(year + 1 for year in self._changed_years)
+        if years:
+            self._update_rank_change(years)
+        return years
+
+    def _get_observation_sheets(self):
+        """
+        Returns:
+            OrderedDict: list of ColumnarSheet of every kind of observations sheets, in the order they are parsed
+        """
+        return OrderedDict([(RAW_OBSERVATIONS, self._get_raw_obs_sheets()),
+                            (STRUCTURE_OBSERVATIONS, self._get_structure_obs_sheets()),
+                            (DATASET_OBSERVATIONS, self._get_dataset_obs_sheets())])
+
+    def _parse_sheets(self, sheets):
+        """
+        Parses and stores the observations of the given sheets
+
+        Args:
+            sheets (OrderedDict): list of ColumnarSheet of every kind of observations sheets
+        """
+        self._start_workers(sheets)
+        try:
+            self._retrieve_raw_observations(sheets[RAW_OBSERVATIONS])
+            self._store_raw_observations()
+            self._retrieve_structure_observations(sheets[STRUCTURE_OBSERVATIONS])
+            self._store_structure_observations()
+            self._retrieve_dataset_assesments(sheets[DATASET_OBSERVATIONS])
+            self._store_dataset_observations()
+        finally:
+            self._stop_workers()
+
+    def _update_rank_change(self, years=None):
         self._log.info("\tUpdating rank changes")
-        self._observation_repo.update_rank_change()
+        self._observation_repo.update_rank_change(years)
+
+    def _start_workers(self, sheets):
+        """
+        Starts the worker processes, if any, and hands them all the sheets at once so they keep parsing while this
+        process stores the observations of the sheets already parsed
+
+        Args:
+            sheets (OrderedDict): list of ColumnarSheet of every kind of observations sheets
+        """
+        if self._workers is None or self._workers <= 1 or not any(sheets.values()):
+            return
+        self._log.info("\tParsing sheets with %d workers" % (self._workers,))
+        self._executor = ProcessPoolExecutor(max_workers=self._workers, initializer=_init_sheet_worker,
+                                             initargs=(self._log, self._config, self._sqlite_config))
+        for kind, kind_sheets in sheets.items():
+            method_name = SHEET_PARSING_METHODS[kind]
+            for sheet in kind_sheets:
+                self._sheet_futures[(kind, sheet.name)] = self._executor.submit(_retrieve_sheet_batches, method_name,
+                                                                                sheet)
+
+    def _stop_workers(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._sheet_futures = {}
+
+    def _retrieve_sheets(self, kind, sheets):
+        """
+        Parses the sheets of a kind with its _retrieve_*_sheet_observations method, in this process or in the workers
+
+        Args:
+            kind (str): kind of the sheets
+            sheets (list of ColumnarSheet): the sheets
+
+        Returns:
+            generator: tuple of the sheet and its batches, as returned by the method, for each sheet in order
+        """
+        for sheet in sheets:
+            if self._executor is None:
+                yield sheet, getattr(self, SHEET_PARSING_METHODS[kind])(sheet)
+            else:
+                yield sheet, self._expand_batches(self._sheet_futures[(kind, sheet.name)].result())
+
+    def _add_parsed_sheet(self, kind, sheet, observation_count):
+        """
+        Keeps track of a parsed sheet, to be stored along with its observations
+
+        Args:
+            kind (str): kind of the sheet
+            sheet (ColumnarSheet): the sheet
+            observation_count (int): number of observations parsed from the sheet
+        """
+        self._parsed_sheets[kind].append((sheet.name, sheet.content_hash(), observation_count))
+
+    @staticmethod
+    def _compact_batches(batches):
+        """
+        Leaves only the ExcelObservation of every observation tuple of the batches, so they are cheap to send from a
+        worker process. The areas and indicators are found again from their codes by _expand_batches
+
+        Args:
+            batches (list): tuples of the form (subindex column, list of observation tuples)
+
+        Returns:
+            list: tuples of the form (subindex column, list of ExcelObservation)
+        """
+        return [(subindex_column, [observation_tuple[0] for observation_tuple in observation_tuples])
+                for subindex_column, observation_tuples in batches]
+
+    def _expand_batches(self, compact_batches):
+        """
+        Inverse of _compact_batches, finds the area, indicator and dataset indicator of every ExcelObservation as the
+        sheet parsing methods do, indicators not found are orphan ones as in the raw observations
+
+        Args:
+            compact_batches (list): tuples of the form (subindex column, list of ExcelObservation)
+
+        Returns:
+            list: tuples of the form (subindex column, list of observation tuples)
+        """
+        areas = {}
+        indicators = {}
+
+        def find_indicator(indicator_code):
+            if indicator_code not in indicators:
+                try:
+                    indicators[indicator_code] = self._indicator_repo.find_indicator_by_code(indicator_code)
+                except IndicatorRepositoryError:
+                    indicators[indicator_code] = create_indicator(indicator=indicator_code)  # Orphan indicator
+            return indicators[indicator_code]
+
+        batches = []
+        for subindex_column, excel_observations in compact_batches:
+            observation_tuples = []
+            for excel_observation in excel_observations:
+                if excel_observation.iso3 not in areas:
+                    areas[excel_observation.iso3] = self._area_repo.find_by_iso3(excel_observation.iso3)
+                observation_tuple = (excel_observation, areas[excel_observation.iso3],
+                                     find_indicator(excel_observation.indicator_code))
+                if excel_observation.dataset_indicator_code is not None:
+                    observation_tuple += (find_indicator(excel_observation.dataset_indicator_code),)
+                observation_tuples.append(observation_tuple)
+            batches.append((subindex_column, observation_tuples))
+        return batches
 
     def _get_raw_obs_sheets(self):
         self._log.info("\tGetting raw observations sheets...")
         data_file_name = self._config.get("RAW_OBSERVATIONS", "FILE_NAME")
         raw_obs_pattern = self._config.get("RAW_OBSERVATIONS", "SHEET_NAME_PATTERN")
         raw_obs_sheets = self._get_sheets_by_pattern(data_file_name, raw_obs_pattern)
-        return raw_obs_sheets
+        return [ColumnarSheet(sheet) for sheet in raw_obs_sheets]
 
     def _get_dataset_obs_sheets(self):
         self._log.info("\tGetting dataset observations sheets...")
         data_file_name = self._config.get("DATASET_OBSERVATIONS", "FILE_NAME")
         dataset_obs_pattern = self._config.get("DATASET_OBSERVATIONS", "SHEET_NAME_PATTERN")
         dataset_obs_sheets = self._get_sheets_by_pattern(data_file_name, dataset_obs_pattern)
-        return dataset_obs_sheets
+        return [ColumnarSheet(sheet) for sheet in dataset_obs_sheets]
 
     def _get_structure_obs_sheets(self):
         self._log.info("\tGetting structure observation sheets...")
         data_file_name = self._config.get("STRUCTURE_OBSERVATIONS", "FILE_NAME")
         structure_obs_pattern = self._config.get("STRUCTURE_OBSERVATIONS", "SHEET_NAME_PATTERN")
         structure_obs_sheets = self._get_sheets_by_pattern(data_file_name, structure_obs_pattern)
-        return structure_obs_sheets
+        return [ColumnarSheet(sheet) for sheet in structure_obs_sheets]
 
-    def _retrieve_dataset_assesments(self):
+    def _retrieve_dataset_assesments(self, dataset_obs_sheets):
         self._log.info("\tRetrieving dataset assesments")
-        dataset_obs_sheets = self._get_dataset_obs_sheets()
-        indicator_code_error_cache = {}
-
-        for dataset_obs_sheet in dataset_obs_sheets:  # Per year
-            sheet_year = re.match(self._config.get("DATASET_OBSERVATIONS", "SHEET_NAME_PATTERN"),
-                                  dataset_obs_sheet.name).group("year")
-            year_column = get_column_number(
-                self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_YEAR_COLUMN", sheet_year))
-            iso3_column = get_column_number(
-                self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_ISO3_COLUMN", sheet_year))
-            indicator_column = get_column_number(
-                self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_INDICATOR_COLUMN", sheet_year))
-            observation_name_row = self._config_getint("DATASET_OBSERVATIONS", "OBSERVATION_NAME_ROW", sheet_year)
-            observation_start_row = self._config_getint("DATASET_OBSERVATIONS", "OBSERVATION_START_ROW", sheet_year)
-            observation_start_column = get_column_number(
-                self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_START_COLUMN", sheet_year))
-
-            for column_number in range(observation_start_column, dataset_obs_sheet.ncols):  # Per dataset indicator
-                dataset_indicator_code = dataset_obs_sheet.cell(observation_name_row, column_number).value
+        for dataset_obs_sheet, batches in self._retrieve_sheets(DATASET_OBSERVATIONS, dataset_obs_sheets):
+            observation_count = len(self._excel_dataset_observations)
+            for _, observation_tuples in batches:
+                self._excel_dataset_observations.extend(observation_tuples)
+            self._add_parsed_sheet(DATASET_OBSERVATIONS, dataset_obs_sheet,
+                                   len(self._excel_dataset_observations) - observation_count)
+
+    def _retrieve_dataset_sheet_observations(self, dataset_obs_sheet):
+        """
+        Parses the dataset assesments of a year sheet
 
+        Args:
+            dataset_obs_sheet (ColumnarSheet): dataset observations sheet
+
+        Returns:
+            list: tuples of the form (None, list of (ExcelObservation, Area, Indicator, dataset Indicator)), one per
+                dataset indicator column
+        """
+        batches = []
+        sheet_year = re.match(self._config.get("DATASET_OBSERVATIONS", "SHEET_NAME_PATTERN"),
+                              dataset_obs_sheet.name).group("year")
+        year_column = get_column_number(
+            self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_YEAR_COLUMN", sheet_year))
+        iso3_column = get_column_number(
+            self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_ISO3_COLUMN", sheet_year))
+        indicator_column = get_column_number(
+            self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_INDICATOR_COLUMN", sheet_year))
+        observation_name_row = self._config_getint("DATASET_OBSERVATIONS", "OBSERVATION_NAME_ROW", sheet_year)
+        observation_start_row = self._config_getint("DATASET_OBSERVATIONS", "OBSERVATION_START_ROW", sheet_year)
+        observation_start_column = get_column_number(
+            self._config_get("DATASET_OBSERVATIONS", "OBSERVATION_START_COLUMN", sheet_year))
+
+        years = dataset_obs_sheet.column(year_column)
+        iso3s = dataset_obs_sheet.column(iso3_column)
+        indicator_codes = dataset_obs_sheet.column(indicator_column)
+
+        for column_number in range(observation_start_column, dataset_obs_sheet.ncols):  # Per dataset indicator
+            values = dataset_obs_sheet.column(column_number)
+            dataset_indicator_code = values[observation_name_row]
+
+            try:
+                dataset_indicator = self._indicator_repo.find_indicator_by_code(dataset_indicator_code)
+            except IndicatorRepositoryError:
+                if dataset_indicator_code not in self._indicator_code_error_cache:
+                    self._log.warn(
+                        "No indicator with code %s found while parsing %s[%s] (additional errors regarding this indicator will be omitted)" % (
+                            dataset_indicator_code, dataset_obs_sheet.name, colname(column_number)))
+                    self._indicator_code_error_cache[dataset_indicator_code] = True
+                continue
+
+            observation_tuples = []
+            for row_number in range(observation_start_row, dataset_obs_sheet.nrows):  # Per country and variable
+                year = int(years[row_number])
+                iso3 = iso3s[row_number]
                 try:
-                    dataset_indicator = self._indicator_repo.find_indicator_by_code(dataset_indicator_code)
+                    indicator_code = indicator_codes[row_number]
+                    indicator = self._indicator_repo.find_indicator_by_code(indicator_code)
+                    area = self._area_repo.find_by_iso3(iso3)
+                    value_retrieved = values[row_number]
+                    value = na_to_none(value_retrieved)
+                    excel_dataset_observation = ExcelObservation(iso3=iso3, indicator_code=indicator_code,
+                                                                 value=value,
+                                                                 year=year,
+                                                                 dataset_indicator_code=dataset_indicator_code)
+                    observation_tuples.append((excel_dataset_observation, area, indicator, dataset_indicator))
                 except IndicatorRepositoryError:
-                    if dataset_indicator_code not in indicator_code_error_cache:
+                    if indicator_code not in self._indicator_code_error_cache:
                         self._log.warn(
                             "No indicator with code %s found while parsing %s[%s] (additional errors regarding this indicator will be omitted)" % (
-                                dataset_indicator_code, dataset_obs_sheet.name, colname(column_number)))
-                        indicator_code_error_cache[dataset_indicator_code] = True
-                    continue
+                                indicator_code, dataset_obs_sheet.name, cellname(indicator_column, row_number)))
+                        self._indicator_code_error_cache[indicator_code] = True
+                except AreaRepositoryError:
+                    self._log.error("No area found with code %s while parsing %s" % (
+                        iso3, dataset_obs_sheet.name))
+            batches.append((None, observation_tuples))
+        return batches
 
-                for row_number in range(observation_start_row, dataset_obs_sheet.nrows):  # Per country and variable
-                    year = int(dataset_obs_sheet.cell(row_number, year_column).value)
-                    iso3 = dataset_obs_sheet.cell(row_number, iso3_column).value
-                    try:
-                        indicator_code = dataset_obs_sheet.cell(row_number, indicator_column).value
-                        indicator = self._indicator_repo.find_indicator_by_code(indicator_code)
-                        area = self._area_repo.find_by_iso3(iso3)
-                        value_retrieved = dataset_obs_sheet.cell(row_number, column_number).value
-                        value = na_to_none(value_retrieved)
-                        excel_dataset_observation = ExcelObservation(iso3=iso3, indicator_code=indicator_code,
-                                                                     value=value,
-                                                                     year=year,
-                                                                     dataset_indicator_code=dataset_indicator_code)
-                        self._excel_dataset_observations.append(
-                            (excel_dataset_observation, area, indicator, dataset_indicator))
-                    except IndicatorRepositoryError:
-                        if indicator_code not in indicator_code_error_cache:
-                            self._log.warn(
-                                "No indicator with code %s found while parsing %s[%s] (additional errors regarding this indicator will be omitted)" % (
-                                    indicator_code, dataset_obs_sheet.name, cellname(indicator_column, row_number)))
-                            indicator_code_error_cache[indicator_code] = True
-                    except AreaRepositoryError:
-                        self._log.error("No area found with code %s while parsing %s" % (
-                            iso3, dataset_obs_sheet.name))
-
-    def _retrieve_raw_observations(self):
+    def _retrieve_raw_observations(self, raw_obs_sheets):
         self._log.info("\tRetrieving raw observations...")
-        raw_obs_sheets = self._get_raw_obs_sheets()
-
-        for raw_obs_sheet in raw_obs_sheets:  # Per year
-            sheet_year = re.match(self._config.get("RAW_OBSERVATIONS", "SHEET_NAME_PATTERN"),
-                                  raw_obs_sheet.name).group("year")
-            empty_row_error_cache = {}
-            year_column = get_column_number(self._config_get("RAW_OBSERVATIONS", "OBSERVATION_YEAR_COLUMN", sheet_year))
-            iso3_column = get_column_number(self._config_get("RAW_OBSERVATIONS", "OBSERVATION_ISO3_COLUMN", sheet_year))
-            observation_name_row = self._config_getint("RAW_OBSERVATIONS", "OBSERVATION_NAME_ROW", sheet_year)
-            observation_start_row = self._config_getint("RAW_OBSERVATIONS", "OBSERVATION_START_ROW", sheet_year)
-            observation_start_column = get_column_number(
-                self._config_get("RAW_OBSERVATIONS", "OBSERVATION_START_COLUMN", sheet_year))
-            check_column = get_column_number(
-                self._config_get("RAW_OBSERVATIONS", "OBSERVATION_CHECK_COLUMN", sheet_year))
-
-            for column_number in range(observation_start_column, raw_obs_sheet.ncols):  # Per indicator
-                # Maintain sorted list with elements sorted by value
-                # Elements are tuples of the form (ExcelObservation, Area, Indicator)
-                # We're using tuples just to avoid some additional round trips to the db in order to get area and indicator
-                per_indicator_observations = SortedListWithKey(
-                    key=lambda x: x[0].value if x[0].value is not None and na_to_none(x[0].value) is not None else 0)
-                # HACK: Curate data by stripping year
-                indicator_code_retrieved = raw_obs_sheet.cell(observation_name_row, column_number).value
-                if len(indicator_code_retrieved.split()) > 1:
-                    self._log.debug('Indicator %s in had to be stripped of year while parsing %s',
-                                    indicator_code_retrieved, raw_obs_sheet.name)
-                try:
-                    indicator_code = indicator_code_retrieved.split()[0]
-                except IndexError:
-                    self._log.warn(
-                        'Wrong Indicator name %s while parsing %s[%s], skipping column' % (
-                            indicator_code_retrieved, raw_obs_sheet.name, colname(column_number)))
-                    continue
+        for raw_obs_sheet, batches in self._retrieve_sheets(RAW_OBSERVATIONS, raw_obs_sheets):
+            observation_count = len(self._excel_raw_observations)
+            for _, observation_tuples in batches:
+                self._excel_raw_observations.extend(observation_tuples)
+            self._add_parsed_sheet(RAW_OBSERVATIONS, raw_obs_sheet,
+                                   len(self._excel_raw_observations) - observation_count)
+
+    def _retrieve_raw_sheet_observations(self, raw_obs_sheet):
+        """
+        Parses the raw observations of a year sheet, ranked per indicator
+
+        Args:
+            raw_obs_sheet (ColumnarSheet): raw observations sheet
 
+        Returns:
+            list: tuples of the form (None, list of (ExcelObservation, Area, Indicator)), one per indicator column
+        """
+        batches = []
+        sheet_year = re.match(self._config.get("RAW_OBSERVATIONS", "SHEET_NAME_PATTERN"),
+                              raw_obs_sheet.name).group("year")
+        empty_row_error_cache = {}
+        year_column = get_column_number(self._config_get("RAW_OBSERVATIONS", "OBSERVATION_YEAR_COLUMN", sheet_year))
+        iso3_column = get_column_number(self._config_get("RAW_OBSERVATIONS", "OBSERVATION_ISO3_COLUMN", sheet_year))
+        observation_name_row = self._config_getint("RAW_OBSERVATIONS", "OBSERVATION_NAME_ROW", sheet_year)
+        observation_start_row = self._config_getint("RAW_OBSERVATIONS", "OBSERVATION_START_ROW", sheet_year)
+        observation_start_column = get_column_number(
+            self._config_get("RAW_OBSERVATIONS", "OBSERVATION_START_COLUMN", sheet_year))
+        check_column = get_column_number(
+            self._config_get("RAW_OBSERVATIONS", "OBSERVATION_CHECK_COLUMN", sheet_year))
+        years = raw_obs_sheet.column(year_column)
+        iso3s = raw_obs_sheet.column(iso3_column)
+        checks = raw_obs_sheet.column(check_column)
+
+        for column_number in range(observation_start_column, raw_obs_sheet.ncols):  # Per indicator
+            # Maintain sorted list with elements sorted by value
+            # Elements are tuples of the form (ExcelObservation, Area, Indicator)
+            # We're using tuples just to avoid some additional round trips to the db in order to get area and indicator
+            per_indicator_observations = SortedListWithKey(
+                key=lambda x: x[0].value if x[0].value is not None and na_to_none(x[0].value) is not None else 0)
+            values = raw_obs_sheet.column(column_number)
+            # HACK: Curate data by stripping year
+            indicator_code_retrieved = values[observation_name_row]
+            if len(indicator_code_retrieved.split()) > 1:
+                self._log.debug('Indicator %s in had to be stripped of year while parsing %s',
+                                indicator_code_retrieved, raw_obs_sheet.name)
+            try:
+                indicator_code = indicator_code_retrieved.split()[0]
+            except IndexError:
+                self._log.warn(
+                    'Wrong Indicator name %s while parsing %s[%s], skipping column' % (
+                        indicator_code_retrieved, raw_obs_sheet.name, colname(column_number)))
+                continue
+
+            try:
+                indicator = self._indicator_repo.find_indicator_by_code(indicator_code)
+            except IndicatorRepositoryError:
+                self._log.warn(
+                    "No indicator with code %s found while parsing %s" % (indicator_code, raw_obs_sheet.name))
+                indicator = create_indicator(indicator=indicator_code)  # Orphan indicator
+
+            for row_number in range(observation_start_row, raw_obs_sheet.nrows):  # Per country
+                if not checks[row_number] or row_number in empty_row_error_cache:
+                    if row_number not in empty_row_error_cache:
+                        self._log.debug(
+                            "Skipping row while parsing %s[%s] (did not detect value on check column, additional errors regarding this row will be omitted)" % (
+                                raw_obs_sheet.name, row_number))
+                    empty_row_error_cache[row_number] = True
+                    continue
                 try:
-                    indicator = self._indicator_repo.find_indicator_by_code(indicator_code)
-                except IndicatorRepositoryError:
-                    self._log.warn(
-                        "No indicator with code %s found while parsing %s" % (indicator_code, raw_obs_sheet.name))
-                    indicator = create_indicator(indicator=indicator_code)  # Orphan indicator
-
-                for row_number in range(observation_start_row, raw_obs_sheet.nrows):  # Per country
-                    if not raw_obs_sheet.cell(row_number, check_column).value or row_number in empty_row_error_cache:
-                        if row_number not in empty_row_error_cache:
-                            self._log.debug(
-                                "Skipping row while parsing %s[%s] (did not detect value on check column, additional errors regarding this row will be omitted)" % (
-                                    raw_obs_sheet.name, row_number))
-                        empty_row_error_cache[row_number] = True
-                        continue
-                    try:
-                        year = int(raw_obs_sheet.cell(row_number, year_column).value)
-                        iso3 = raw_obs_sheet.cell(row_number, iso3_column).value
-                        area = self._area_repo.find_by_iso3(iso3)
-                        value_retrieved = raw_obs_sheet.cell(row_number, column_number).value
-                        value = na_to_none(value_retrieved)
-                        excel_observation = ExcelObservation(iso3=iso3, indicator_code=indicator_code, value=value,
-                                                             year=year)
-                        per_indicator_observations.add((excel_observation, area, indicator))
-                    except AreaRepositoryError:
-                        self._log.error("No area found with code %s for indicator %s while parsing %s" % (
-                            iso3, indicator_code, raw_obs_sheet.name))
-                    except:
-                        self._log.error("Unexpected error parsing %s[%s]" % (raw_obs_sheet.name, row_number))
-
-                self._update_observation_ranking(per_indicator_observations, observation_getter=lambda x: x[0])
-                self._excel_raw_observations.extend(per_indicator_observations)
-
-    def _retrieve_structure_observations(self):
+                    year = int(years[row_number])
+                    iso3 = iso3s[row_number]
+                    area = self._area_repo.find_by_iso3(iso3)
+                    value_retrieved = values[row_number]
+                    value = na_to_none(value_retrieved)
+                    excel_observation = ExcelObservation(iso3=iso3, indicator_code=indicator_code, value=value,
+                                                         year=year)
+                    per_indicator_observations.add((excel_observation, area, indicator))
+                except AreaRepositoryError:
+                    self._log.error("No area found with code %s for indicator %s while parsing %s" % (
+                        iso3, indicator_code, raw_obs_sheet.name))
+                except:
+                    self._log.error("Unexpected error parsing %s[%s]" % (raw_obs_sheet.name, row_number))
+
+            self._update_observation_ranking(per_indicator_observations, observation_getter=lambda x: x[0])
+            batches.append((None, list(per_indicator_observations)))
+        return batches
+
+    def _retrieve_structure_observations(self, structure_obs_sheets):
         self._log.info("\tRetrieving structure observation...")
+        for structure_obs_sheet, batches in self._retrieve_sheets(STRUCTURE_OBSERVATIONS, structure_obs_sheets):
+            observation_count = len(self._excel_structure_observations)
+            self._add_structure_batches(structure_obs_sheet.name, batches)
+            self._add_parsed_sheet(STRUCTURE_OBSERVATIONS, structure_obs_sheet,
+                                   len(self._excel_structure_observations) - observation_count)
 
-        structure_obs_sheets = self._get_structure_obs_sheets()
-        for structure_obs_sheet in structure_obs_sheets:  # Per year
-            # INDEX explicit because the columns are not ordered (simplify this if the column order gets fixed)
-            self._retrieve_index_observations(structure_obs_sheet)
-            self._retrieve_subindex_and_component_observations(structure_obs_sheet)
+    def _retrieve_structure_sheet_observations(self, structure_obs_sheet):
+        """
+        Parses the index, subindex and component observations of a year sheet. Duplicate SUBINDEX observations are
+        not checked here but when the batches are added, since they may be duplicates of other sheets' ones
+
+        Args:
+            structure_obs_sheet (ColumnarSheet): structure observations sheet
+
+        Returns:
+            list: tuples of the form (subindex column, list of (ExcelObservation, Area, Indicator)), one per INDEX,
+                SUBINDEX or COMPONENT column. The subindex column is the column number of SUBINDEX batches, None for
+                the rest
+        """
+        # INDEX explicit because the columns are not ordered (simplify this if the column order gets fixed)
+        batches = [(None, self._retrieve_index_observations(structure_obs_sheet))]
+        batches.extend(self._retrieve_subindex_and_component_observations(structure_obs_sheet))
+        return batches
 
     def _parse_index_scaled_column_name(self, column_name, year):
         return re.match(self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_INDEX_SCALED_COLUMN_PATTERN", year),
@@ -217,7 +485,7 @@ class ObservationParser(Parser):
             self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_SUBINDEX_START_COLUMN", year))
 
         for column_number in range(observation_start_column, sheet.ncols):
-            column = sheet.cell(observation_name_row, column_number).value
+            column = sheet.cell_value(observation_name_row, column_number)
             parsed_column = self._parse_subindex_column_rank(column, year)
             if parsed_column:
                 # It's a rank, check matching with the indicator
@@ -237,6 +505,7 @@ class ObservationParser(Parser):
             self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_CHECK_COLUMN", sheet_year))
         observation_start_row = self._config_getint("STRUCTURE_OBSERVATIONS", "OBSERVATION_START_ROW", sheet_year)
         empty_row_error_cache = {}
+        observation_tuples = []
 
         try:
             subindex_rank_column = self._find_rank_column(structure_obs_sheet, subindex_name, sheet_year)
@@ -244,8 +513,13 @@ class ObservationParser(Parser):
                 self._log.warn("No rank column found for SUBINDEX '%s' while parsing %s" % (
                     subindex_name, structure_obs_sheet.name))
             indicator = self._indicator_repo.find_indicator_by_code(subindex_name, 'SUBINDEX')
+            years = structure_obs_sheet.column(year_column)
+            iso3s = structure_obs_sheet.column(iso3_column)
+            checks = structure_obs_sheet.column(check_column)
+            values = structure_obs_sheet.column(subindex_scaled_column)
+            ranks = structure_obs_sheet.column(subindex_rank_column) if subindex_rank_column else None
             for row_number in range(observation_start_row, structure_obs_sheet.nrows):  # Per country
-                if not structure_obs_sheet.cell(row_number, check_column).value or row_number in empty_row_error_cache:
+                if not checks[row_number] or row_number in empty_row_error_cache:
                     if row_number not in empty_row_error_cache:
                         self._log.debug(
                             "Skipping row while parsing %s[%s] (did not detect value on check column, additional errors regarding this row will be omitted)" % (
@@ -253,24 +527,14 @@ class ObservationParser(Parser):
                     empty_row_error_cache[row_number] = True
                     continue
                 try:
-                    year = int(structure_obs_sheet.cell(row_number, year_column).value)
-                    iso3 = structure_obs_sheet.cell(row_number, iso3_column).value
+                    year = int(years[row_number])
+                    iso3 = iso3s[row_number]
                     area = self._area_repo.find_by_iso3(iso3)
-                    value = structure_obs_sheet.cell(row_number, subindex_scaled_column).value
-                    rank = structure_obs_sheet.cell(row_number,
-                                                    subindex_rank_column).value if subindex_rank_column else None
+                    value = values[row_number]
+                    rank = ranks[row_number] if ranks else None
                     excel_observation = ExcelObservation(iso3=iso3, indicator_code=indicator.indicator, year=year,
                                                          rank=rank, value=value)
-                    if [t for t in self._excel_structure_observations if
-                        t[0].year == year and t[1].iso3 == iso3 and t[2].indicator == indicator.indicator]:
-                        self._log.warn("Ignoring duplicate observations for SUBINDEX %s while parsing %s [%s]" % (
-                            indicator.indicator, structure_obs_sheet.name,
-                            colname(subindex_scaled_column)))
-                        # Will not continue parsing, we could check this also at the beginning if we extract the
-                        # year from the sheet name
-                        return
-                    else:
-                        self._excel_structure_observations.append((excel_observation, area, indicator))
+                    observation_tuples.append((excel_observation, area, indicator))
                 except AreaRepositoryError:
                     self._log.error("No area with code %s for indicator %s while parsing %s" % (
                         iso3, indicator.indicator, structure_obs_sheet.name))
@@ -280,6 +544,7 @@ class ObservationParser(Parser):
             self._log.error(
                 "No SUBINDEX '%s' indicator found while parsing %s [%s]" % (
                     subindex_name, structure_obs_sheet.name, colname(subindex_scaled_column)))
+        return observation_tuples
 
     def _get_aliased_component(self, component_name, year):
         mangled_indicator = re.sub(' +', r'_', component_name).upper()
@@ -314,11 +579,16 @@ class ObservationParser(Parser):
         # Set up sorted list to simplify ranking (components are not ranked in the spreadsheet)
         sorted_observations = SortedListWithKey(
             key=lambda x: x[0].value if x[0].value is not None and na_to_none(x[0].value) is not None else 0)
+        sorted_observation_keys = set()
 
         try:
             indicator = self._indicator_repo.find_component_by_short_name(short_name, subindex_name)
+            years = structure_obs_sheet.column(year_column)
+            iso3s = structure_obs_sheet.column(iso3_column)
+            checks = structure_obs_sheet.column(check_column)
+            values = structure_obs_sheet.column(component_scaled_column)
             for row_number in range(observation_start_row, structure_obs_sheet.nrows):  # Per country
-                if not structure_obs_sheet.cell(row_number, check_column).value or row_number in empty_row_error_cache:
+                if not checks[row_number] or row_number in empty_row_error_cache:
                     if row_number not in empty_row_error_cache:
                         self._log.debug(
                             "Skipping row while parsing %s[%s] (did not detect value on check column, additional errors regarding this row will be omitted)" % (
@@ -326,22 +596,23 @@ class ObservationParser(Parser):
                     empty_row_error_cache[row_number] = True
                     continue
                 try:
-                    year = int(structure_obs_sheet.cell(row_number, year_column).value)
-                    iso3 = structure_obs_sheet.cell(row_number, iso3_column).value
+                    year = int(years[row_number])
+                    iso3 = iso3s[row_number]
                     area = self._area_repo.find_by_iso3(iso3)
-                    value = structure_obs_sheet.cell(row_number, component_scaled_column).value
+                    value = values[row_number]
                     excel_observation = ExcelObservation(iso3=iso3, indicator_code=indicator.indicator, year=year,
                                                          value=value)
-                    if [t for t in sorted_observations if
-                        t[0].year == year and t[1].iso3 == iso3 and t[2].indicator == indicator.indicator]:
+                    if (year, iso3, indicator.indicator) in sorted_observation_keys:
                         self._log.warn("Ignoring duplicate observations for COMPONENT %s while parsing %s [%s]" % (
                             indicator.indicator, structure_obs_sheet.name,
                             colname(component_scaled_column)))
                         # Will not continue parsing, we could check this also at the beginning if we extract the
                         # year from the sheet name
-                        return
+                        return []
                     else:
-                        sorted_observations.add((excel_observation, area, indicator))
+                        observation_tuple = (excel_observation, area, indicator)
+                        sorted_observations.add(observation_tuple)
+                        sorted_observation_keys.add(self._structure_observation_key(observation_tuple))
                 except AreaRepositoryError:
                     self._log.error("No area with code %s for indicator %s while parsing %s" % (
                         iso3, indicator.indicator, structure_obs_sheet.name))
@@ -354,7 +625,7 @@ class ObservationParser(Parser):
 
         # Rank them based on their scaled score
         self._update_observation_ranking(sorted_observations, observation_getter=lambda x: x[0])
-        self._excel_structure_observations.extend(sorted_observations)
+        return list(sorted_observations)
 
     def _retrieve_subindex_and_component_observations(self, structure_obs_sheet):
         self._log.info("\t\tRetrieving subindex and component observations...")
@@ -363,24 +634,27 @@ class ObservationParser(Parser):
         observation_name_row = self._config_getint("STRUCTURE_OBSERVATIONS", "OBSERVATION_NAME_ROW", sheet_year)
         observation_start_column = get_column_number(
             self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_SUBINDEX_START_COLUMN", sheet_year))
+        batches = []
 
         for column_number in range(observation_start_column, structure_obs_sheet.ncols):  # Per indicator
-            column_name = structure_obs_sheet.cell(observation_name_row, column_number).value
+            column_name = structure_obs_sheet.cell_value(observation_name_row, column_number)
             parsed_column = self._parse_subindex_scaled_column_name(column_name, sheet_year)
             if parsed_column:
                 # Retrieve a subindex
-                self._retrieve_subindex_observations(structure_obs_sheet, parsed_column.group('subindex'),
-                                                     column_number, sheet_year)
+                batches.append((column_number, self._retrieve_subindex_observations(
+                    structure_obs_sheet, parsed_column.group('subindex'), column_number, sheet_year)))
             else:
                 parsed_column = self._parse_component_scaled_column_name(column_name, sheet_year)
                 if parsed_column:
                     # Retrieve a component
-                    self._retrieve_component_observations(structure_obs_sheet, parsed_column.group('subindex'),
-                                                          parsed_column.group('component'), column_number, sheet_year)
+                    batches.append((None, self._retrieve_component_observations(
+                        structure_obs_sheet, parsed_column.group('subindex'), parsed_column.group('component'),
+                        column_number, sheet_year)))
                 else:
                     self._log.debug(
                         'Ignoring column %s while parsing %s (did not detect subindex or component scaled data)' % (
                             column_name, structure_obs_sheet.name))
+        return batches
 
     def _retrieve_index_observations(self, structure_obs_sheet):
         self._log.info("\t\tRetrieving index observations...")
@@ -402,17 +676,24 @@ class ObservationParser(Parser):
             self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_INDEX_RANK_COLUMN", sheet_year))
         index_rank_change_column = get_column_number(
             self._config_get("STRUCTURE_OBSERVATIONS", "OBSERVATION_INDEX_RANK_CHANGE_COLUMN", sheet_year))
+        observation_tuples = []
 
         try:
-            column_name = structure_obs_sheet.cell(observation_name_row, index_scaled_column).value
+            column_name = structure_obs_sheet.cell_value(observation_name_row, index_scaled_column)
             parsed_column = self._parse_index_scaled_column_name(column_name, sheet_year)
             # Sanity check useful if there could be more than one INDEX, otherwise this check could be relaxed
             if not parsed_column:
                 raise IndicatorRepositoryError("Column name '%s' does not match INDEX pattern while parsing %s" % (
                     column_name, structure_obs_sheet.name))
             indicator = self._indicator_repo.find_indicator_by_code(parsed_column.group('index'))
+            years = structure_obs_sheet.column(year_column)
+            iso3s = structure_obs_sheet.column(iso3_column)
+            checks = structure_obs_sheet.column(check_column)
+            values = structure_obs_sheet.column(index_scaled_column)
+            ranks = structure_obs_sheet.column(index_rank_column)
+            rank_changes = structure_obs_sheet.column(index_rank_change_column) if index_rank_change_column else None
             for row_number in range(observation_start_row, structure_obs_sheet.nrows):  # Per country
-                if not structure_obs_sheet.cell(row_number, check_column).value or row_number in empty_row_error_cache:
+                if not checks[row_number] or row_number in empty_row_error_cache:
                     if row_number not in empty_row_error_cache:
                         self._log.debug(
                             "Skipping row while parsing %s[%s] (did not detect value on check column, additional errors regarding this row will be omitted)" % (
@@ -420,17 +701,16 @@ class ObservationParser(Parser):
                     empty_row_error_cache[row_number] = True
                     continue
                 try:
-                    year = int(structure_obs_sheet.cell(row_number, year_column).value)
-                    iso3 = structure_obs_sheet.cell(row_number, iso3_column).value
+                    year = int(years[row_number])
+                    iso3 = iso3s[row_number]
                     area = self._area_repo.find_by_iso3(iso3)
-                    value = structure_obs_sheet.cell(row_number, index_scaled_column).value
-                    rank = structure_obs_sheet.cell(row_number, index_rank_column).value
+                    value = values[row_number]
+                    rank = ranks[row_number]
                     # Allow for empty values here
-                    rank_change = na_to_none(structure_obs_sheet.cell(row_number,
-                                                                      index_rank_change_column).value) if index_rank_change_column else None
+                    rank_change = na_to_none(rank_changes[row_number]) if rank_changes else None
                     excel_observation = ExcelObservation(iso3=iso3, indicator_code=indicator.indicator, year=year,
                                                          rank=rank, value=value, rank_change=rank_change)
-                    self._excel_structure_observations.append((excel_observation, area, indicator))
+                    observation_tuples.append((excel_observation, area, indicator))
                 except AreaRepositoryError:
                     self._log.error("No area with code %s for indicator %s while parsing %s" % (
                         iso3, indicator.indicator, structure_obs_sheet.name))
@@ -441,22 +721,93 @@ class ObservationParser(Parser):
                 structure_obs_sheet.name, colname(index_scaled_column)))
         except ParserError as pe:
             self._log.error(pe)
+        return observation_tuples
+
+    def _add_structure_batches(self, sheet_name, batches):
+        """
+        Appends the batches of a structure sheet to the structure observations. The observations of SUBINDEX batches
+        are checked against the ones already added: the rest of the batch is ignored from the first duplicate on
+
+        Args:
+            sheet_name (str): name of the sheet of the batches
+            batches (list): tuples of the form (subindex column, list of (ExcelObservation, Area, Indicator)) as
+                returned by _retrieve_structure_sheet_observations
+        """
+        for subindex_column, observation_tuples in batches:
+            if subindex_column is None:
+                self._add_structure_observations(observation_tuples)
+                continue
+            for observation_tuple in observation_tuples:
+                if self._structure_observation_key(observation_tuple) in self._structure_observation_keys:
+                    self._log.warn("Ignoring duplicate observations for SUBINDEX %s while parsing %s [%s]" % (
+                        observation_tuple[2].indicator, sheet_name, colname(subindex_column)))
+                    # Will not continue parsing, we could check this also at the beginning if we extract the
+                    # year from the sheet name
+                    break
+                self._add_structure_observations([observation_tuple])
+
+    def _add_structure_observations(self, observation_tuple_list):
+        """
+        Appends observations to the structure observations, keeping their keys up to date
+
+        Args:
+            observation_tuple_list (list): tuples of the form (ExcelObservation, Area, Indicator)
+        """
+        for observation_tuple in observation_tuple_list:
+            self._excel_structure_observations.append(observation_tuple)
+            self._structure_observation_keys.add(self._structure_observation_key(observation_tuple))
+
+    @staticmethod
+    def _structure_observation_key(observation_tuple):
+        """
+        Returns the key used to detect duplicate structure observations
+
+        Args:
+            observation_tuple (tuple): tuple of the form (ExcelObservation, Area, Indicator)
+
+        Returns:
+            tuple: year, area iso3 and indicator code of the observation
+        """
+        excel_observation, area, indicator = observation_tuple
+        return excel_observation.year, area.iso3, indicator.indicator
 
     def _store_structure_observations(self):
         self._log.info("\tStoring structure observations...")
-        self._store_excel_observation_array(self._excel_structure_observations)
+        self._store_excel_observation_array(self._excel_structure_observations, STRUCTURE_OBSERVATIONS)
 
-    def _store_excel_observation_array(self, observation_tuple_list):
+    def _store_excel_observation_array(self, observation_tuple_list, kind):
+        """
+        Stores the observations parsed from the sheets of a kind, in a single transaction along with the sheets they
+        come from and the deletion of the replaced sheets and their observations
+
+        Args:
+            observation_tuple_list (list): tuples of the form (ExcelObservation, Area, Indicator[, dataset Indicator])
+            kind (str): kind of the sheets
+        """
         self._observation_repo.begin_transaction()
+        for sheet_name in self._replaced_sheet_names[kind]:
+            self._changed_years.update(self._observation_repo.delete_sheet(kind, sheet_name, commit=False))
+        first_observation = self._observation_repo.find_last_observation_id() + 1
+        self._observation_repo.insert_observations(self._excel_observations_to_dom(observation_tuple_list),
+                                                   commit=False)
+        for sheet_name, content_hash, observation_count in self._parsed_sheets[kind]:
+            self._observation_repo.insert_sheet(kind, sheet_name, content_hash, first_observation,
+                                                first_observation + observation_count - 1, commit=False)
+            first_observation += observation_count
+        self._observation_repo.commit_transaction()
+        self._changed_years.update(observation_tuple[0].year for observation_tuple in observation_tuple_list)
+        self._reset_repository_caches()
+
+    def _excel_observations_to_dom(self, observation_tuple_list):
+        host = self._config.get("OTHERS", "HOST")
         for excel_observation_tuple in observation_tuple_list:
             area = excel_observation_tuple[1]
             indicator = excel_observation_tuple[2]
             dataset_indicator = excel_observation_tuple[3] if len(excel_observation_tuple) == 4 else None
             observation = excel_observation_to_dom(excel_observation_tuple[0], area, indicator, dataset_indicator)
-            observation.uri = urljoin(self._config.get("OTHERS", "HOST"), "observations/%s/%s/%s" % (
+            observation.uri = urljoin(host, "observations/%s/%s/%s" % (
                 indicator.indicator, area.iso3, observation.year.value))
-            self._observation_repo.insert_observation(observation, commit=False)
-        self._observation_repo.commit_transaction()
+            yield observation
 
     @staticmethod
     def _update_observation_ranking(sorted_observations, order='asc', observation_getter=lambda x: x,
@@ -491,11 +842,35 @@ class ObservationParser(Parser):
 
     def _store_raw_observations(self):
         self._log.info("\tStoring raw observations...")
-        self._store_excel_observation_array(self._excel_raw_observations)
+        self._store_excel_observation_array(self._excel_raw_observations, RAW_OBSERVATIONS)
 
     def _store_dataset_observations(self):
         self._log.info("\tStoring dataset observations...")
-        self._store_excel_observation_array(self._excel_dataset_observations)
+        self._store_excel_observation_array(self._excel_dataset_observations, DATASET_OBSERVATIONS)
+
+
+# Parser of each worker process, set by _init_sheet_worker
+_worker_parser = None
+
+
+def _init_sheet_worker(log, config, sqlite_config):
+    global _worker_parser
+    _worker_parser = ObservationParser(log, config, AreaRepository(False, sqlite_config),
+                                       IndicatorRepository(False, sqlite_config))
+
+
+def _retrieve_sheet_batches(method_name, sheet):
+    """
+    Parses a sheet with the parser of the worker process, it's run by the pool workers
+
+    Args:
+        method_name (str): name of the ObservationParser method that parses the sheet
+        sheet (ColumnarSheet): the sheet
+
+    Returns:
+        list: the batches of the sheet compacted by ObservationParser._compact_batches
+    """
+    return ObservationParser._compact_batches(getattr(_worker_parser, method_name)(sheet))
 
 
 if __name__ == "__main__":
@@ -1,16 +1,65 @@
+import os
 import re
 
 import xlrd
 
+from .columnar_sheet import ColumnarSheet
 from .utils import is_number
 
 
+class WorkbookCache(object):
+    """
+    Keeps the workbooks opened during a parse run so that every sheet lookup on the same file reuses the already
+    decoded workbook. Entries are keyed by path and modification time, so a file replaced on disk is read again.
+    """
+
+    def __init__(self):
+        self._workbooks = {}
+        self._opens = 0
+        self._avoided_opens = 0
+
+    def open_workbook(self, file_name):
+        """
+        Retrieves the xlrd book object for the given file, opening it only if it was not opened before or it has
+        been modified since.
+        :param file_name:
+        :return xlrd book object:
+        """
+        path = os.path.abspath(file_name)
+        key = (path, os.path.getmtime(path))
+        book = self._workbooks.get(key)
+        if book is None:
+            # Forget older versions of the same file
+            for stale_key in [k for k in self._workbooks if k[0] == path]:
+                del self._workbooks[stale_key]
+            book = xlrd.open_workbook(path)
+            self._workbooks[key] = book
+            self._opens += 1
+        else:
+            self._avoided_opens += 1
+        return book
+
+    def clear(self):
+        self._workbooks.clear()
+
+    @property
+    def opens(self):
+        return self._opens
+
+    @property
+    def avoided_opens(self):
+        return self._avoided_opens
+
+
 class Parser(object):
     """
     This superclass models the various parsers that will retrieve and store the data
     and implements their common functions.
     """
 
+    # Shared by every parser, so the workbook is decoded once per parse run and not once per sheet lookup
+    _workbook_cache = WorkbookCache()
+
     def __init__(self, log, config, area_repo=None, indicator_repo=None, observation_repo=None):
         self._log = log
         self._config = config
@@ -30,27 +79,53 @@ class Parser(object):
     def observation_repo(self):
         return self._observation_repo
 
-    @staticmethod
-    def _get_sheet(file_name, sheet_name_or_index):
+    @property
+    def workbook_cache(self):
+        return self._workbook_cache
+
+    def _reset_repository_caches(self):
+        """
+        Drops the entities cached by the repositories, must be called after writing to the database so that later
+        finds (in this or any other parser) don't return stale data
+        """
+        for repo in (self._area_repo, self._indicator_repo, self._observation_repo):
+            if repo is not None:
+                repo.reset_cache()
+
+    @classmethod
+    def _get_sheet(cls, file_name, sheet_name_or_index):
         """
         Retrieves a xlrd sheet object given its file name and its index within it.
         :param file_name:
         :param sheet_name_or_index:
         :return xlrd sheet object:
         """
-        book = xlrd.open_workbook(file_name)
+        book = cls._workbook_cache.open_workbook(file_name)
         sheet = book.sheet_by_index(sheet_name_or_index) if is_number(sheet_name_or_index) else book.sheet_by_name(
             sheet_name_or_index)
         return sheet
 
-    @staticmethod
-    def _get_sheets_by_pattern(file_name, regex_pattern):
+    @classmethod
+    def _get_sheets_by_pattern(cls, file_name, regex_pattern):
         pattern = re.compile(regex_pattern)
-        book = xlrd.open_workbook(file_name)
+        book = cls._workbook_cache.open_workbook(file_name)
         matching_sheet_names = [sheet_name for sheet_name in book.sheet_names() if pattern.match(sheet_name)]
         matching_sheets = [book.sheet_by_name(sheet_name) for sheet_name in matching_sheet_names]
         return matching_sheets
 
+    @staticmethod
+    def _hash_sheets(sheets):
+        """
+        Hashes the content of xlrd sheets
+
+        Args:
+            sheets (list): xlrd sheet objects
+
+        Returns:
+            dict: content hash of every sheet by name
+        """
+        return dict((sheet.name, ColumnarSheet(sheet).content_hash()) for sheet in sheets)
+
     @staticmethod
     def _decorate_config_key(key, year):
         return "%s_%s" % (key, year)
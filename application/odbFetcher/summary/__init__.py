@@ -0,0 +1,4 @@
+"""
+This package contains the modules responsible for building the materialized summaries of the parsed observations that
+the API serves as they are
+"""
@@ -0,0 +1,69 @@
+from statistics import StatisticsError
+
+from odb.domain.model.observation.index_summary import build_area_scores, build_indicator_stats
+
+
+class Summarizer(object):
+    """
+    This class is responsible for the last stage of the parsing: it builds the summaries of the index tree
+    observations served by the indexObservations, indexEvolution and indexStats API endpoints and stores them, so that
+    the endpoints just read them instead of computing them on every request. It builds a summary of the INDICATOR
+    level observations for every year and another one of the COMPONENT level observations of all the years
+    """
+
+    def __init__(self, log, area_repo, indicator_repo, observation_repo, summary_repo):
+        self._log = log
+        self._area_repo = area_repo
+        self._indicator_repo = indicator_repo
+        self._observation_repo = observation_repo
+        self._summary_repo = summary_repo
+
+    def run(self, years=None):
+        """
+        Builds and stores the summaries
+
+        Args:
+            years (set of int, optional): years whose observations changed since the summaries were built, only their
+                summaries (and the one of all the years) are built again, or deleted if there are no observations of
+                the year any longer. All the summaries are built if None
+        """
+        self._log.info("Summarizing index observations")
+        index_indicator = self._indicator_repo.find_indicators_index()[0]
+        countries = self._area_repo.find_countries(order="iso3")
+        regions = self._area_repo.find_regions()
+
+        observation_years = [year.value for year in self._observation_repo.get_year_list() if year.value is not None]
+        for year in observation_years:
+            if years is None or year in years:
+                self._summarize(index_indicator.indicator, 'INDICATOR', year, countries, regions)
+        for year in sorted(set(years or []) - set(observation_years)):
+            self._summary_repo.delete_summary(index_indicator.indicator, 'INDICATOR', year, commit=False)
+        self._summarize(index_indicator.indicator, 'COMPONENT', None, countries, regions)
+        self._summary_repo.commit_transaction()
+
+    def _summarize(self, indicator_code, level, year, countries, regions):
+        """
+        Builds and stores the summary of the observations of a tree level and year. Summaries whose statistics can't
+        be computed (a region without values for an indicator) are not stored, so the API keeps computing them live
+        and answering as it always has.
+
+        Args:
+            indicator_code (str): code of the index indicator
+            level (str): tree level of the observations
+            year (int): year of the observations, None for all the years
+            countries (list of Country): countries with score rows
+            regions (list of Region): regions with statistics
+        """
+        observations = self._observation_repo.find_tree_observations(indicator_code, 'ALL',
+                                                                     str(year) if year is not None else None, level)
+        try:
+            area_scores = build_area_scores(observations, countries)
+            indicator_stats = build_indicator_stats(observations, regions)
+        except StatisticsError as e:
+            self._log.warning("\tSkipping %s summary of %s: %s" % (level, year if year is not None else "all years", e))
+            # The summary built by a previous parse, if any, is stale
+            self._summary_repo.delete_summary(indicator_code, level, year, commit=False)
+            return
+        self._summary_repo.insert_summary(indicator_code, level, year, area_scores, indicator_stats, commit=False)
+        self._log.info("\t%s summary of %s: %d area scores, %d indicator stats" % (
+            level, year if year is not None else "all years", len(area_scores), len(indicator_stats)))
@@ -1,14 +1,29 @@
+import argparse
 import configparser
+import hashlib
 import logging
 import os
+import time
+from contextlib import contextmanager
 
 from application.odbFetcher.enrichment.enricher import Enricher
 from application.odbFetcher.parsing.area_parser import AreaParser
 from application.odbFetcher.parsing.indicator_parser import IndicatorParser
 from application.odbFetcher.parsing.observation_parser import ObservationParser
+from application.odbFetcher.summary.summarizer import Summarizer
 from infrastructure.sql_repos.area_repository import AreaRepository
 from infrastructure.sql_repos.indicator_repository import IndicatorRepository
 from infrastructure.sql_repos.observation_repository import ObservationRepository
+from infrastructure.sql_repos.summary_repository import SummaryRepository
+from infrastructure.sql_repos.utils import copy_database, publish_database, remove_database
+
+# Kind of the parsed sheets that are the input of the indicators and areas (with the parser configuration), any change
+# in them requires a full parse
+INPUTS = 'INPUTS'
+# Kind of the parsed area info sheets, the area infos are parsed again when they change
+AREA_INFO = 'AREA_INFO'
+# Suffix of the file the database is built into before replacing the one in use
+BUILD_SUFFIX = '.build'
 
 
 def configure_log():
@@ -22,16 +37,29 @@ def configure_log():
     logging.getLogger('').addHandler(console)
 
 
-def run():
+def run(workers=None, incremental=False, bulk_load=False):
+    """
+    Parses the data Excel files into the database, summarizes and enriches it. The database is built into a new file
+    (a copy of the current one when incremental) that replaces the one in use once it's complete, so the API keeps
+    serving the previous data meanwhile
+
+    Args:
+        workers (int, optional): number of processes parsing the observation sheets in parallel, they are parsed
+            sequentially by default
+        incremental (bool): parse again only the observation sheets that changed since the database was built. The
+            whole database is built again anyway if the indicators, areas or parser configuration changed
+        bulk_load (bool): write the database without journal nor syncing to disk and create the indexes once the data
+            is loaded. It's safe because the database is built into a file that is thrown away if the parse fails
+    """
     configure_log()
     log = logging.getLogger("odbFetcher")
     sqlite_config = configparser.ConfigParser()
     sqlite_config.read(os.path.join(os.path.dirname(__file__), 'sqlite_config.ini'))
-    sqlite_config.set("CONNECTION", "SQLITE_DB",
-                      os.path.join(os.path.dirname(__file__), sqlite_config.get("CONNECTION", "SQLITE_DB")))
-    indicator_repo = IndicatorRepository(True, sqlite_config)
-    area_repo = AreaRepository(True, sqlite_config)
-    observation_repo = ObservationRepository(True, area_repo, indicator_repo, sqlite_config)
+    database = os.path.join(os.path.dirname(__file__), sqlite_config.get("CONNECTION", "SQLITE_DB"))
+    build_database = database + BUILD_SUFFIX
+    sqlite_config.set("CONNECTION", "SQLITE_DB", build_database)
+    sqlite_config.set("CONNECTION", "BULK_LOAD", str(bulk_load))
+    timings = []
 
     config = configparser.ConfigParser()
     config.read(os.path.join(os.path.dirname(__file__), "parser_config.ini"))
@@ -47,16 +75,135 @@ def run():
                os.path.join(os.path.dirname(__file__), config.get("STRUCTURE_OBSERVATIONS", "FILE_NAME")))
     config.set("AREA_INFO", "FILE_NAME",
                os.path.join(os.path.dirname(__file__), config.get("AREA_INFO", "FILE_NAME")))
-    parse(log, config, area_repo, indicator_repo, observation_repo)
-    # Uncomment if need enriched data
-    enrich(log, config, area_repo)
+
+    with timed(timings, "copy" if incremental else "clean"):
+        if incremental and os.path.exists(database):
+            copy_database(database, build_database)
+        else:
+            remove_database(build_database)
+            incremental = False
+    try:
+        with timed(timings, "hash"):
+            hashes = input_hashes(log, config)
+            if incremental and \
+                    ObservationRepository(False, None, None, sqlite_config).find_sheet_hashes(INPUTS) != hashes:
+                log.info("Indicators, areas or parser configuration changed since the last parse, parsing everything")
+                incremental = False
+
+        indicator_repo = IndicatorRepository(not incremental, sqlite_config)
+        area_repo = AreaRepository(not incremental, sqlite_config)
+        observation_repo = ObservationRepository(not incremental, area_repo, indicator_repo, sqlite_config)
+        summary_repo = SummaryRepository(not incremental, sqlite_config)
+        if incremental:
+            with timed(timings, "update"):
+                years = update(log, config, area_repo, indicator_repo, observation_repo, workers, sqlite_config)
+            if years:
+                with timed(timings, "summarize"):
+                    summarize(log, area_repo, indicator_repo, observation_repo, summary_repo, years)
+        else:
+            with timed(timings, "parse"):
+                parse(log, config, area_repo, indicator_repo, observation_repo, workers, sqlite_config)
+                store_hashes(observation_repo, INPUTS, hashes)
+                store_hashes(observation_repo, AREA_INFO, AreaParser(log, config).area_info_hashes())
+            with timed(timings, "summarize"):
+                summarize(log, area_repo, indicator_repo, observation_repo, summary_repo)
+        # Uncomment if need enriched data
+        with timed(timings, "enrich"):
+            enrich(log, config, area_repo)
+    except BaseException:
+        remove_database(build_database)
+        raise
+    log.info("Replacing %s" % (database,))
+    with timed(timings, "publish"):
+        version = publish_database(build_database, database)
+    log.info("Build version %s" % (version,))
+    log.info("Stage timings%s: %s, total %.2fs" % (" (bulk load)" if bulk_load else "",
+                                                   ", ".join("%s %.2fs" % timing for timing in timings),
+                                                   sum(seconds for _, seconds in timings)))
     log.info('Done')
 
 
-def parse(log, config, area_repo, indicator_repo, observation_repo):
+@contextmanager
+def timed(timings, stage):
+    """
+    Appends the seconds taken by the body of the with statement to timings, even if it raises
+
+    Args:
+        timings (list): list of (stage, seconds) tuples
+        stage (str): name of the stage
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((stage, time.perf_counter() - start))
+
+
+def parse(log, config, area_repo, indicator_repo, observation_repo, workers=None, sqlite_config=None):
     IndicatorParser(log, config, area_repo, indicator_repo, observation_repo).run()
+    indicator_repo.create_indexes()
     AreaParser(log, config, area_repo, indicator_repo, observation_repo).run()
-    ObservationParser(log, config, area_repo, indicator_repo, observation_repo).run()
+    area_repo.create_indexes()
+    observation_parser = ObservationParser(log, config, area_repo, indicator_repo, observation_repo, workers,
+                                           sqlite_config)
+    observation_parser.run()
+    workbook_cache = observation_parser.workbook_cache
+    log.info("Workbooks opened: %d, reopens avoided: %d" % (workbook_cache.opens, workbook_cache.avoided_opens))
+    log.info("Entity cache: %s" % (area_repo.cache_stats,))
+
+
+def update(log, config, area_repo, indicator_repo, observation_repo, workers=None, sqlite_config=None):
+    area_parser = AreaParser(log, config, area_repo, indicator_repo, observation_repo)
+    area_info_hashes = area_parser.area_info_hashes()
+    if observation_repo.find_sheet_hashes(AREA_INFO) != area_info_hashes:
+        area_parser.update_area_infos()
+        store_hashes(observation_repo, AREA_INFO, area_info_hashes)
+    observation_parser = ObservationParser(log, config, area_repo, indicator_repo, observation_repo, workers,
+                                           sqlite_config)
+    years = observation_parser.update()
+    log.info("Years updated: %s" % (", ".join(str(year) for year in sorted(years)) or "none",))
+    return years
+
+
+def store_hashes(observation_repo, kind, hashes):
+    """
+    Stores the hashes of the sheets of a kind, replacing the ones stored before
+
+    Args:
+        observation_repo (ObservationRepository): repository of the parsed sheets
+        kind (str): kind of the sheets
+        hashes (dict): hash of every sheet by name
+    """
+    observation_repo.begin_transaction()
+    for name in observation_repo.find_sheet_hashes(kind):
+        observation_repo.delete_sheet(kind, name, commit=False)
+    for name, content_hash in hashes.items():
+        observation_repo.insert_sheet(kind, name, content_hash, commit=False)
+    observation_repo.commit_transaction()
+
+
+def input_hashes(log, config):
+    """
+    Hashes the inputs of the indicators and areas and the parser configuration (but the names of the files, whose
+    content is what is hashed)
+
+    Args:
+        log (Logger): log
+        config (ConfigParser): parser configuration
+
+    Returns:
+        dict: hash of every input by name
+    """
+    hashes = IndicatorParser(log, config).input_hashes()
+    hashes.update(AreaParser(log, config).input_hashes())
+    config_items = [(section, sorted((key, value) for key, value in config.items(section, raw=True)
+                                     if key.upper() != "FILE_NAME")) for section in sorted(config.sections())]
+    hashes["parser_config.ini"] = hashlib.sha1(repr(config_items).encode('utf-8')).hexdigest()
+    return hashes
+
+
+def summarize(log, area_repo, indicator_repo, observation_repo, summary_repo, years=None):
+    Summarizer(log, area_repo, indicator_repo, observation_repo, summary_repo).run(years)
 
 
 def enrich(log, config, area_repo):
@@ -64,5 +211,13 @@ def enrich(log, config, area_repo):
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Parses the ODB data Excel files into the database")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes parsing the observation sheets in parallel (default: sequential)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="parse again only the observation sheets that changed since the last parse")
+    parser.add_argument("--bulk-load", action="store_true",
+                        help="write without journal nor syncing to disk and create the indexes after loading the data")
+    args = parser.parse_args()
+    run(args.workers, args.incremental, args.bulk_load)
     print("Done! :)")
@@ -0,0 +1,130 @@
+import gzip
+import io
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+BROTLI = 'br'
+# Compressed encodings in order of preference, when a client accepts several of them with the same quality
+PREFERRED_ENCODINGS = (BROTLI, GZIP)
+# Levels of the responses compressed while a request waits for them, which compress JSON nearly as well as the
+# slowest ones in a fraction of the time
+GZIP_COMPRESSION_LEVEL = 6
+BROTLI_QUALITY = 5
+# Bytes below which a body is not worth compressing, it would fit in a single packet anyway
+MIN_COMPRESSED_SIZE = 1400
+
+
+def available_encodings():
+    """
+    Returns:
+        tuple of str: encodings bodies can be compressed into, brotli only when the brotli module is installed
+    """
+    return (IDENTITY, GZIP, BROTLI) if brotli is not None else (IDENTITY, GZIP)
+
+
+def compress(body, encoding, gzip_level=GZIP_COMPRESSION_LEVEL, brotli_quality=BROTLI_QUALITY):
+    """
+    Args:
+        body (bytes): uncompressed body
+        encoding (str): IDENTITY, GZIP or BROTLI
+        gzip_level (int, optional): gzip compression level
+        brotli_quality (int, optional): brotli quality
+
+    Returns:
+        bytes: the body in the encoding
+    """
+    if encoding == GZIP:
+        # Without a modification time in the header the compressed body only depends on the body
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=gzip_level, mtime=0) as gzip_file:
+            gzip_file.write(body)
+        return buffer.getvalue()
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=brotli_quality)
+    return body
+
+
+def decompress(body, encoding):
+    """
+    Returns:
+        bytes: the uncompressed body of a body in an encoding
+    """
+    if encoding == GZIP:
+        return gzip.decompress(body)
+    if encoding == BROTLI:
+        return brotli.decompress(body)
+    return body
+
+
+def choose_encoding(accept_encodings, encodings):
+    """
+    Chooses the encoding of a response among the ones it's available in
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): Accept-Encoding header of the request
+        encodings (tuple of str): encodings the response is available in
+
+    Returns:
+        str: the compressed encoding the client accepts with the highest quality (the first of PREFERRED_ENCODINGS
+            on ties), identity if it accepts none
+    """
+    best, best_quality = IDENTITY, 0
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding in encodings:
+            quality = accept_encodings.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+    return best
+
+
+def encoded_etag(etag, encoding):
+    """
+    Returns:
+        str: the ETag of the representation of a response in an encoding, every encoding needs its own strong ETag
+    """
+    return etag if encoding == IDENTITY else "%s-%s" % (etag, encoding)
+
+
+class CompressedResponse(Response):
+    """
+    Response that holds its body compressed in every available encoding instead of uncompressed, so a cached response
+    is compressed once, when it's computed, and not every time it's sent. encode gives the response to send to a client.
+
+    Only the compressed bodies are kept, the uncompressed one is decompressed from gzip for the few clients that don't
+    accept any compression.
+    """
+
+    def __init__(self, body, **kwargs):
+        """
+        Constructor for CompressedResponse
+
+        Args:
+            body (bytes): uncompressed body
+            **kwargs: any other Response argument (status, mimetype, headers...)
+        """
+        Response.__init__(self, **kwargs)
+        self.bodies = dict((encoding, compress(body, encoding)) for encoding in available_encodings()
+                           if encoding != IDENTITY)
+
+    def encode(self, accept_encodings):
+        """
+        Args:
+            accept_encodings (werkzeug.datastructures.Accept): Accept-Encoding header of the request
+
+        Returns:
+            Response: a new response with the body in the encoding the client accepts, varying by Accept-Encoding
+        """
+        encoding = choose_encoding(accept_encodings, tuple(self.bodies))
+        body = self.bodies[encoding] if encoding != IDENTITY else decompress(self.bodies[GZIP], GZIP)
+        response = Response(body, status=self.status, headers=self.headers.copy())
+        if encoding != IDENTITY:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,283 @@
+import statistics
+from collections import OrderedDict, deque
+
+from odb.domain.model.observation.index_summary import ALL_AREAS, build_area_scores, build_indicator_stats
+
+
+class DocumentBuilder(object):
+    """
+    Builds the data documents served by the API (the content of the 'data' member of its responses) as plain dicts
+    and lists ready to be dumped as JSON. Both the API and the static JSON exporter build them here, so the exported
+    files are the same as the responses of the API without having to serve it.
+    """
+
+    def __init__(self, area_repo, indicator_repo, observation_repo, summary_repo):
+        """
+        Constructor for DocumentBuilder
+
+        Args:
+            area_repo (AreaRepository): Area repository
+            indicator_repo (IndicatorRepository): Indicator repository
+            observation_repo (ObservationRepository): Observation repository
+            summary_repo (SummaryRepository): Summary repository
+        """
+        self._area_repo = area_repo
+        self._indicator_repo = indicator_repo
+        self._observation_repo = observation_repo
+        self._summary_repo = summary_repo
+
+    def years(self):
+        return [year.to_dict() for year in self._observation_repo.get_year_list()]
+
+    def countries(self, order=None):
+        return [country.to_dict() for country in self._area_repo.find_countries(order)]
+
+    def regions(self, order=None):
+        return [region.to_dict() for region in self._area_repo.find_regions(order)]
+
+    def indicators_flattened(self):
+        """
+        Returns:
+            list of dict: the indicators of the index tree, each one followed by its children
+        """
+        return [indicator.to_dict() for indicator in self._flatten_index_tree(self._indicator_repo.find_indicators())]
+
+    def indicators_meta(self):
+        """
+        Returns:
+            list of dict: the indicators out of the index tree (e.g. dataset_assesment)
+        """
+        indicators = self._indicator_repo.find_indicators()
+        tree_indicators = self._flatten_index_tree(indicators)
+        return [indicator.to_dict() for indicator in indicators if indicator not in tree_indicators]
+
+    @staticmethod
+    def _flatten_index_tree(indicators):
+        index_indicator = next(i for i in indicators if i.index is None)
+        q = deque([index_indicator])
+        final_indicators = []
+        while q:
+            i = q.popleft()
+            final_indicators.append(i)
+            q.extendleft(i.children)
+            i.children = []
+        return final_indicators
+
+    def years_with_indicator_data(self):
+        """
+        Returns:
+            dict: codes of the indicators with observations by year
+        """
+        data = {}
+        for (year, indicator) in self._observation_repo._get_years_with_indicator():
+            if year not in data:
+                data[year] = []
+            data[year].append(indicator)
+        return data
+
+    def index_observations(self, year):
+        """
+        Returns the scores of every country in the index indicators of a year, with their statistics over all the
+        areas and per region
+
+        Args:
+            year (str): year, year range or LATEST as accepted by the observation repository
+
+        Returns:
+            dict: year, scores by area and indicator and statistics by indicator and area
+        """
+        summary_year = self._materialized_year(year)
+        area_scores, indicator_stats = self._find_index_summary('INDICATOR', year, summary_year,
+                                                                summary_year is not None)
+
+        data = {'year': year, 'areas': OrderedDict(), 'stats': self._stats_by_indicator(indicator_stats)}
+        for row in area_scores:
+            if row['area'] not in data['areas']:
+                data['areas'][row['area']] = OrderedDict()
+            data['areas'][row['area']][row['indicator']] = {
+                'value': row['value'],
+                'rank': row['rank'],
+                'rank_change': row['rank_change']
+            }
+        return data
+
+    def index_evolution(self, year):
+        """
+        Returns the scores of every country with data in a year in the index, subindexes and components, with the
+        evolution of the index score over all the years and their statistics over all the years
+
+        Args:
+            year (str): year
+
+        Returns:
+            dict: year, scores by area and indicator and statistics by indicator and area
+        """
+        area_scores, indicator_stats = self._find_index_summary('COMPONENT', None, None,
+                                                                self._materialized_year(year) is not None)
+
+        data = {'year': year, 'areas': OrderedDict(), 'stats': self._stats_by_indicator(indicator_stats)}
+        for row in area_scores:
+            if row['area'] not in data['areas']:
+                data['areas'][row['area']] = OrderedDict()
+            if row['indicator'] not in data['areas'][row['area']]:
+                data['areas'][row['area']][row['indicator']] = OrderedDict()
+            area_indicator = data['areas'][row['area']][row['indicator']]
+
+            if row['year'] == int(year):
+                area_indicator['value'] = row['value']
+                if row['indicator_type'] == 'INDEX':
+                    area_indicator['rank'] = row['rank']
+                    area_indicator['rank_change'] = row['rank_change']
+
+            if row['indicator_type'] == 'INDEX':
+                if 'score_evolution' not in area_indicator:
+                    area_indicator['score_evolution'] = []
+                area_indicator['score_evolution'].append({'year': row['year'], 'value': row['value']})
+
+        # Clean areas without data that year
+        for area in list(data['areas'].keys()):
+            if 'value' not in data['areas'][area]['ODB']:
+                del data['areas'][area]
+        return data
+
+    def index_stats(self, year):
+        """
+        Returns the statistics of the index indicators of a year per region and over all the areas
+
+        Args:
+            year (str): year, year range or LATEST as accepted by the observation repository
+
+        Returns:
+            dict: year and statistics by area and indicator
+        """
+        summary_year = self._materialized_year(year)
+        _, indicator_stats = self._find_index_summary('INDICATOR', year, summary_year, summary_year is not None,
+                                                      with_area_scores=False)
+
+        data = {'year': year, 'stats': OrderedDict()}
+        for row in indicator_stats:
+            if row['area'] == ALL_AREAS:
+                continue
+            if row['area'] not in data['stats']:
+                data['stats'][row['area']] = OrderedDict()
+            data['stats'][row['area']][row['indicator']] = OrderedDict()
+            data['stats'][row['area']][row['indicator']]['mean'] = row['mean']
+            data['stats'][row['area']][row['indicator']]['median'] = row['median']
+
+        data['stats'][ALL_AREAS] = OrderedDict()
+        for row in indicator_stats:
+            if row['area'] == ALL_AREAS:
+                data['stats'][ALL_AREAS][row['indicator']] = OrderedDict()
+                data['stats'][ALL_AREAS][row['indicator']]['mean'] = row['mean']
+                data['stats'][ALL_AREAS][row['indicator']]['median'] = row['median']
+        return data
+
+    def country_observations(self, area_code):
+        """
+        Returns the observations of an area in the index indicators and datasets, with their statistics, per year
+
+        Args:
+            area_code (str): area code
+
+        Returns:
+            dict: area and observations, datasets and statistics by year
+        """
+        index_indicator = self._indicator_repo.find_indicators_index()[0]
+
+        data = {'area': area_code, 'years': OrderedDict()}
+
+        # The observations of all the years are found at once and split by year keeping their order
+        observations_by_year = {}
+        for obs in self._observation_repo.find_tree_observations(index_indicator.indicator, area_code, None,
+                                                                 'INDICATOR', False):
+            observations_by_year.setdefault(str(obs.year), []).append(obs)
+
+        for year in sorted([str(y.value) for y in self._observation_repo.get_year_list()]):
+            observations = observations_by_year.get(year)
+            if not observations: continue;
+            data['years'][year] = {'observations': OrderedDict(), 'stats': OrderedDict(), 'datasets': OrderedDict()}
+            for obs in sorted([obs for obs in observations if obs.dataset_indicator is None],
+                              key=lambda o: o.indicator.indicator):
+                data['years'][year]['observations'][obs.indicator.indicator] = {
+                    'value': obs.value,
+                    'rank': obs.rank,
+                    'rank_change': obs.rank_change
+                }
+
+            # Observations by indicator code, in their original order
+            observations_by_indicator = {}
+            for obs in observations:
+                observations_by_indicator.setdefault(obs.indicator.indicator, []).append(obs)
+
+            indicators_with_dataset = sorted(
+                set([obs.indicator.indicator for obs in observations if obs.dataset_indicator is not None]))
+            for indicator in indicators_with_dataset:
+                data['years'][year]['datasets'][indicator] = OrderedDict()
+                for obs in observations_by_indicator[indicator]:
+                    if obs.dataset_indicator is None:
+                        data['years'][year]['datasets'][obs.indicator.indicator]['VALUE'] = obs.value
+                    else:
+                        data['years'][year]['datasets'][obs.indicator.indicator][
+                            obs.dataset_indicator.indicator] = obs.value
+
+            for indicator_code in sorted(observations_by_indicator):
+                per_indicator_obs = [o.value for o in observations_by_indicator[indicator_code] if
+                                     o.value is not None and o.dataset_indicator is None]
+                data['years'][year]['stats'][indicator_code] = OrderedDict()
+                data['years'][year]['stats'][indicator_code]['mean'] = statistics.mean(
+                    per_indicator_obs) if per_indicator_obs else None
+                data['years'][year]['stats'][indicator_code]['median'] = statistics.median(
+                    per_indicator_obs) if per_indicator_obs else None
+        return data
+
+    @staticmethod
+    def _materialized_year(year):
+        """
+        Returns the year of the materialized summary that answers a request for year, None if year is not a plain
+        number (a range, a list, LATEST...) and the request has to be answered from the observations
+
+        Args:
+            year (str): year as given in the request
+
+        Returns:
+            int: year of the summary or None
+        """
+        return int(year) if year.isascii() and year.isdigit() else None
+
+    def _find_index_summary(self, level, year, summary_year, use_summary, with_area_scores=True):
+        """
+        Returns the area score and indicator stats rows of the index tree observations of a level and year. They are
+        read from the summary materialized by the parser when there is one, else they are built from the observations
+
+        Args:
+            level (str): tree level of the observations
+            year (str): year filter of the observations, None for all the years
+            summary_year (int): year of the materialized summary, None for the one of all the years
+            use_summary (bool): whether the request can be answered by the materialized summary
+            with_area_scores (bool): whether the area score rows are needed, None is returned in their place otherwise
+
+        Returns:
+            tuple: list of area score rows and list of indicator stats rows
+        """
+        index_indicator = self._indicator_repo.find_indicators_index()[0]
+        summary_id = self._summary_repo.find_summary_id(index_indicator.indicator, level, summary_year) \
+            if use_summary else None
+        if summary_id is not None:
+            area_scores = self._summary_repo.find_area_scores(summary_id) if with_area_scores else None
+            return area_scores, self._summary_repo.find_indicator_stats(summary_id)
+
+        observations = self._observation_repo.find_tree_observations(index_indicator.indicator, 'ALL', year, level)
+        area_scores = build_area_scores(observations, self._area_repo.find_countries(order="iso3")) \
+            if with_area_scores else None
+        return area_scores, build_indicator_stats(observations, self._area_repo.find_regions())
+
+    @staticmethod
+    def _stats_by_indicator(indicator_stats):
+        stats = OrderedDict()
+        for row in indicator_stats:
+            if row['indicator'] not in stats:
+                stats[row['indicator']] = OrderedDict()
+            stats[row['indicator']][row['area']] = OrderedDict()
+            stats[row['indicator']][row['area']]['mean'] = row['mean']
+            stats[row['indicator']][row['area']]['median'] = row['median']
+        return stats
@@ -0,0 +1,215 @@
+import inspect
+from json import dumps
+from json.encoder import encode_basestring
+from types import GeneratorType
+
+INFINITY = float('inf')
+# Elements of a streamed array encoded between two chunks
+STREAM_CHUNK_ITEMS = 100
+
+
+class FragmentJsonEncoder(object):
+    """
+    Encodes documents holding domain objects into the same JSON text as dumps(document, ensure_ascii=False) gives once
+    every object is replaced by its to_dict(), without building those dicts for every row.
+
+    Objects whose to_dict accepts shallow=True (observations and the visualisations made of them) are asked for a
+    shallow dict, which leaves the objects they reference (areas, indicators, observations) as they are. Any other
+    object is encoded once with dumps(obj.to_dict()) and its text is spliced in wherever the same object appears
+    again, so the area and indicator shared by thousands of observations are encoded a single time.
+
+    Generators are encoded as arrays. iter_encode yields the text in chunks while it consumes them, so a document whose
+    large arrays are generators is never held in memory whole, neither as objects nor as text.
+
+    An encoder remembers the objects it has encoded, so it must be used for one document only.
+    """
+
+    # Whether the to_dict method of every type seen accepts shallow
+    _shallow_types = {}
+
+    def __init__(self):
+        # Encoded text of the objects by id, along with the object so its id is not reused while encoding
+        self._fragments = {}
+
+    def encode(self, document):
+        """
+        Encodes a document
+
+        Args:
+            document: dict, list, tuple, generator, scalar or object with to_dict, nested in any way
+
+        Returns:
+            str: JSON text of the document
+        """
+        chunks = []
+        self._encode(document, chunks)
+        return ''.join(chunks)
+
+    def iter_encode(self, document, chunk_items=STREAM_CHUNK_ITEMS):
+        """
+        Encodes a document in chunks, consuming the generators it holds as the chunks are requested
+
+        Args:
+            document: dict, list, tuple, generator, scalar or object with to_dict, nested in any way
+            chunk_items (int, optional): elements of a generator encoded in every chunk
+
+        Returns:
+            iterator of str: JSON text of the document, in chunks
+        """
+        chunks = []
+        for _ in self._iter_encode(document, chunks, chunk_items):
+            yield ''.join(chunks)
+            del chunks[:]
+        if chunks:
+            yield ''.join(chunks)
+
+    def _iter_encode(self, value, chunks, chunk_items):
+        """
+        Encodes a value as _encode does, yielding whenever the chunks gathered so far must be flushed
+        """
+        if isinstance(value, GeneratorType):
+            # The elements themselves are encoded whole
+            chunks.append('[')
+            for i, item in enumerate(value):
+                if i:
+                    chunks.append(', ')
+                    if i % chunk_items == 0:
+                        yield
+                self._encode(item, chunks)
+            chunks.append(']')
+        elif isinstance(value, dict):
+            chunks.append('{')
+            for i, (key, item) in enumerate(value.items()):
+                if i:
+                    chunks.append(', ')
+                chunks.append(_encode_key(key))
+                chunks.append(': ')
+                yield from self._iter_encode(item, chunks, chunk_items)
+            chunks.append('}')
+        elif isinstance(value, (list, tuple)):
+            chunks.append('[')
+            for i, item in enumerate(value):
+                if i:
+                    chunks.append(', ')
+                yield from self._iter_encode(item, chunks, chunk_items)
+            chunks.append(']')
+        elif isinstance(value, (str, int, float)) or value is None or not self._has_shallow_to_dict(type(value)):
+            self._encode(value, chunks)
+        else:
+            yield from self._iter_encode(value.to_dict(shallow=True), chunks, chunk_items)
+
+    def _encode(self, value, chunks):
+        if isinstance(value, str):
+            chunks.append(encode_basestring(value))
+        elif value is None:
+            chunks.append('null')
+        elif value is True:
+            chunks.append('true')
+        elif value is False:
+            chunks.append('false')
+        elif isinstance(value, int):
+            chunks.append(int.__repr__(value))
+        elif isinstance(value, float):
+            chunks.append(_encode_float(value))
+        elif isinstance(value, dict):
+            self._encode_dict(value, chunks)
+        elif isinstance(value, (list, tuple, GeneratorType)):
+            self._encode_list(value, chunks)
+        elif self._has_shallow_to_dict(type(value)):
+            self._encode_dict(value.to_dict(shallow=True), chunks)
+        else:
+            chunks.append(self._fragment(value))
+
+    def _encode_dict(self, dictionary, chunks):
+        chunks.append('{')
+        first = True
+        for key, value in dictionary.items():
+            if not first:
+                chunks.append(', ')
+            first = False
+            chunks.append(_encode_key(key))
+            chunks.append(': ')
+            self._encode(value, chunks)
+        chunks.append('}')
+
+    def _encode_list(self, values, chunks):
+        chunks.append('[')
+        first = True
+        for value in values:
+            if not first:
+                chunks.append(', ')
+            first = False
+            self._encode(value, chunks)
+        chunks.append(']')
+
+    def _fragment(self, obj):
+        entry = self._fragments.get(id(obj))
+        if entry is None:
+            # Objects without to_dict make dumps raise the same TypeError as it would for the whole document
+            entry = (obj, dumps(obj.to_dict() if hasattr(obj, 'to_dict') else obj, ensure_ascii=False))
+            self._fragments[id(obj)] = entry
+        return entry[1]
+
+    @classmethod
+    def _has_shallow_to_dict(cls, _type):
+        shallow = cls._shallow_types.get(_type)
+        if shallow is None:
+            to_dict = getattr(_type, 'to_dict', None)
+            shallow = to_dict is not None and 'shallow' in inspect.signature(to_dict).parameters
+            cls._shallow_types[_type] = shallow
+        return shallow
+
+
+def _encode_float(value):
+    # As json.encoder does with allow_nan
+    if value != value:
+        return 'NaN'
+    if value == INFINITY:
+        return 'Infinity'
+    if value == -INFINITY:
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+def _encode_key(key):
+    # Keys are converted to strings as json.encoder does
+    if isinstance(key, str):
+        return encode_basestring(key)
+    if isinstance(key, float):
+        return encode_basestring(_encode_float(key))
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return encode_basestring(int.__repr__(key))
+    raise TypeError("keys must be str, int, float, bool or None, not %s" % (key.__class__.__name__,))
+
+
+def encode_json(document):
+    """
+    Encodes a document holding domain objects as dumps(document, ensure_ascii=False) would once every object is
+    replaced by its to_dict(), see FragmentJsonEncoder
+
+    Args:
+        document: dict, list, tuple, scalar or object with to_dict, nested in any way
+
+    Returns:
+        str: JSON text of the document
+    """
+    return FragmentJsonEncoder().encode(document)
+
+
+def iter_encode_json(document):
+    """
+    Encodes a document holding domain objects and generators in chunks, see FragmentJsonEncoder.iter_encode
+
+    Args:
+        document: dict, list, tuple, generator, scalar or object with to_dict, nested in any way
+
+    Returns:
+        iterator of str: JSON text of the document, in chunks
+    """
+    return FragmentJsonEncoder().iter_encode(document)
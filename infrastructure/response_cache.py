@@ -0,0 +1,230 @@
+import os
+import pickle
+import sqlite3
+import threading
+import zlib
+from time import time, sleep
+
+from werkzeug.contrib.cache import BaseCache
+
+from infrastructure.compression import CompressedResponse
+from infrastructure.sql_repos.utils import transaction
+
+# Bytes of compressed values kept before the least recently used entries are evicted (1 GiB)
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+# zlib level of the stored values, values are compressed while a request waits for them so the fastest level is used
+DEFAULT_COMPRESSION_LEVEL = 1
+# Seconds a process may take to fill an entry before the others stop waiting for it and compute it themselves
+DEFAULT_FILL_TIMEOUT = 60
+# Seconds between two checks of an entry that another process is filling
+FILL_POLL_INTERVAL = 0.05
+# Seconds the last access time of an entry may be behind before a hit updates it, so hits rarely need to write
+ACCESS_RESOLUTION = 1
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a sqlite database, shared by every process and thread that opens the same file (e.g. the workers
+    of the API on one host), so a response computed by any of them is served by all of them.
+
+    - Values are pickled and compressed with zlib, but for CompressedResponses, whose bodies are compressed already.
+    - When the compressed values exceed max_size bytes the least recently used entries are evicted.
+    - Stampedes are avoided with fill locks: the first get that misses an entry takes its lock and returns None, so its
+      caller computes the value and sets it, while other gets of the same entry wait for that value instead of
+      computing it too. A lock is released when its entry is set, by release_fills (e.g. when the request that took it
+      fails) or once fill_timeout seconds have passed.
+
+    Connections are opened per thread and per process, so the cache can be created before the workers are forked.
+    """
+
+    def __init__(self, database, max_size=DEFAULT_MAX_SIZE, default_timeout=300,
+                 compression_level=DEFAULT_COMPRESSION_LEVEL, fill_timeout=DEFAULT_FILL_TIMEOUT):
+        """
+        Constructor for SQLiteCache
+
+        Args:
+            database (str): path of the cache database, it's created if it doesn't exist
+            max_size (int, optional): bytes of compressed values to keep
+            default_timeout (int, optional): seconds entries live when set without timeout, 0 to never expire them
+            compression_level (int, optional): zlib compression level of the values
+            fill_timeout (int, optional): seconds other gets wait for an entry being filled
+        """
+        BaseCache.__init__(self, default_timeout)
+        self._database = os.path.abspath(database)
+        self._max_size = max_size
+        self._compression_level = compression_level
+        self._fill_timeout = fill_timeout
+        self._local = threading.local()
+
+    @property
+    def database(self):
+        return self._database
+
+    def get(self, key):
+        key = _normalize_key(key)
+        db = self._get_db()
+        while True:
+            value = self._read(db, key)
+            if value is not None or key in self._local.fills or self._acquire_fill(db, key):
+                return value
+            sleep(FILL_POLL_INTERVAL)
+
+    def set(self, key, value, timeout=None):
+        key = _normalize_key(key)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if not isinstance(value, CompressedResponse):
+            data = zlib.compress(data, self._compression_level)
+        db = self._get_db()
+        now = time()
+        with transaction(db):
+            if len(data) <= self._max_size:
+                db.execute("INSERT OR REPLACE INTO cache_entry (key, value, size, expires, accessed) "
+                           "VALUES (?, ?, ?, ?, ?)", (key, data, len(data), self._expires(timeout, now), now))
+                self._evict(db, key)
+            db.execute("DELETE FROM cache_fill WHERE key = ?", (key,))
+        self._local.fills.discard(key)
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        cursor = self._get_db().execute("DELETE FROM cache_entry WHERE key = ?", (_normalize_key(key),))
+        return cursor.rowcount > 0
+
+    def has(self, key):
+        row = self._get_db().execute("SELECT expires FROM cache_entry WHERE key = ?",
+                                     (_normalize_key(key),)).fetchone()
+        return row is not None and not _expired(row[0], time())
+
+    def clear(self):
+        db = self._get_db()
+        with transaction(db):
+            db.execute("DELETE FROM cache_entry")
+            db.execute("DELETE FROM cache_fill")
+        return True
+
+    def release_fills(self):
+        """
+        Releases the fill locks taken by the calling thread whose entries were not set, so other processes don't wait
+        for them
+        """
+        fills = getattr(self._local, 'fills', None)
+        if not fills:
+            return
+        db = self._get_db()
+        db.executemany("DELETE FROM cache_fill WHERE key = ?", [(key,) for key in fills])
+        fills.clear()
+
+    def size(self):
+        """
+        Returns:
+            int: bytes of compressed values stored
+        """
+        return self._get_db().execute("SELECT total(size) FROM cache_entry").fetchone()[0]
+
+    def _read(self, db, key):
+        """
+        Returns the value of an entry, marking it as used, or None if there is none or it has expired
+        """
+        row = db.execute("SELECT value, expires, accessed FROM cache_entry WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data, expires, accessed = row
+        now = time()
+        if _expired(expires, now):
+            db.execute("DELETE FROM cache_entry WHERE key = ? AND expires = ?", (key, expires))
+            return None
+        if now - accessed > ACCESS_RESOLUTION:
+            db.execute("UPDATE cache_entry SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            # Pickles start with the PROTO opcode (0x80), zlib streams never do
+            return pickle.loads(data if data[:1] == pickle.PROTO else zlib.decompress(data))
+        except (zlib.error, pickle.PickleError):
+            return None
+
+    def _acquire_fill(self, db, key):
+        """
+        Takes the fill lock of an entry if nobody holds it or it has timed out, and the entry has not been set since
+        it was read
+
+        Returns:
+            bool: True if the lock was taken
+        """
+        now = time()
+        with transaction(db):
+            row = db.execute("SELECT expires FROM cache_entry WHERE key = ?", (key,)).fetchone()
+            if row is not None and not _expired(row[0], now):
+                return False
+            db.execute("DELETE FROM cache_fill WHERE key = ? AND expires <= ?", (key, now))
+            acquired = db.execute("INSERT OR IGNORE INTO cache_fill (key, expires) VALUES (?, ?)",
+                                  (key, now + self._fill_timeout)).rowcount == 1
+        if acquired:
+            self._local.fills.add(key)
+        return acquired
+
+    def _evict(self, db, kept_key):
+        """
+        Deletes the least recently used entries, but kept_key, until the values fit in max_size
+        """
+        excess = db.execute("SELECT total(size) FROM cache_entry").fetchone()[0] - self._max_size
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in db.execute("SELECT key, size FROM cache_entry WHERE key != ? ORDER BY accessed",
+                                    (kept_key,)):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM cache_entry WHERE key = ?", evicted)
+
+    def _expires(self, timeout, now):
+        # BaseCache._normalize_timeout only exists from Werkzeug 0.12 on
+        if timeout is None:
+            timeout = self.default_timeout
+        return now + timeout if timeout > 0 else 0
+
+    def _get_db(self):
+        """
+        Returns the connection of the calling thread, opening a new one in forked processes
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.db = self._connect()
+            local.pid = os.getpid()
+            local.fills = set()
+        return local.db
+
+    def _connect(self):
+        db = sqlite3.connect(self._database, timeout=self._fill_timeout, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        with transaction(db):
+            db.execute("""CREATE TABLE IF NOT EXISTS cache_entry (
+                            key TEXT PRIMARY KEY,
+                            value BLOB NOT NULL,
+                            size INTEGER NOT NULL,
+                            expires REAL NOT NULL,
+                            accessed REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS cache_entry_accessed_index ON cache_entry (accessed)")
+            db.execute("CREATE TABLE IF NOT EXISTS cache_fill (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+        return db
+
+
+def _normalize_key(key):
+    return key.decode('utf-8') if isinstance(key, bytes) else key
+
+
+def _expired(expires, now):
+    return expires != 0 and expires <= now
+
+
+def sqlite_cache(app, config, args, kwargs):
+    """
+    Flask-Cache backend factory, set CACHE_TYPE to 'infrastructure.response_cache.sqlite_cache' and give the database
+    path in CACHE_ARGS or CACHE_OPTIONS (along with any other SQLiteCache argument)
+    """
+    return SQLiteCache(*args, **kwargs)
@@ -0,0 +1,233 @@
+import fcntl
+import os
+import sqlite3
+import threading
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from hashlib import sha256
+from urllib.parse import quote
+
+from infrastructure.compression import IDENTITY, GZIP, BROTLI, available_encodings, compress
+from infrastructure.sql_repos.utils import transaction
+
+# Extension of the file holding a body in each encoding
+ENCODING_EXTENSIONS = {IDENTITY: '.json', GZIP: '.json.gz', BROTLI: '.json.br'}
+# Bodies are compressed once at build time, so the slowest and smallest levels are used
+GZIP_COMPRESSION_LEVEL = 9
+BROTLI_QUALITY = 11
+# Seconds to wait for the build that is publishing a version
+DEFAULT_TIMEOUT = 60
+
+StoredResponse = namedtuple('StoredResponse', ['digest', 'encodings'])
+
+
+class ResponseStore(object):
+    """
+    Content-addressed store of pre-rendered response bodies, shared by every process of the host.
+
+    - Every body is stored in a directory of its own under its sha256 digest, uncompressed and compressed with gzip and
+      brotli (brotli only when the brotli module is installed), so identical bodies are stored once, whatever the
+      request or build version they are the response of.
+    - The manifest (a sqlite database in the directory) maps the build version and the request key (path and sorted
+      query string) to the digest and encodings of the body. The entries of a version are published in one
+      transaction, so a version is served either whole or not at all.
+
+    The files are written into a temporary name and renamed, so a reader never sees a partial body. Bodies are put and
+    published while holding a shared lock on the store (see writing), which prune takes exclusively, so it never
+    deletes the bodies of a render that is not published yet.
+
+    Readers (find) open the manifest read-only and never create anything: until a render publishes the first
+    responses there is no store and find returns None. Connections to the manifest are opened per thread and per
+    process, so the store can be created before the workers are forked.
+    """
+
+    def __init__(self, directory, timeout=DEFAULT_TIMEOUT):
+        """
+        Constructor for ResponseStore
+
+        Args:
+            directory (str): directory of the store, it's created by the first put or publish
+            timeout (int, optional): seconds to wait for the manifest while another process writes it
+        """
+        self._directory = os.path.abspath(directory)
+        self._timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def put(self, body):
+        """
+        Stores a body in every encoding, unless it's stored already
+
+        Args:
+            body (bytes): uncompressed body
+
+        Returns:
+            StoredResponse: digest and encodings of the stored body
+        """
+        digest = sha256(body).hexdigest()
+        encodings = available_encodings()
+        for encoding in encodings:
+            path = self.path(digest, encoding)
+            if not os.path.exists(path):
+                _write_atomically(path, compress(body, encoding, GZIP_COMPRESSION_LEVEL, BROTLI_QUALITY))
+        return StoredResponse(digest, encodings)
+
+    def path(self, digest, encoding=IDENTITY):
+        """
+        Returns:
+            str: path of the file with a body in an encoding
+        """
+        return os.path.join(self._directory, digest[:2], digest + ENCODING_EXTENSIONS[encoding])
+
+    @contextmanager
+    def writing(self):
+        """
+        Holds a shared lock on the store for a block that puts and publishes bodies, which prune waits for
+        """
+        with self._lock(fcntl.LOCK_SH):
+            yield
+
+    def publish(self, version, entries):
+        """
+        Publishes the responses of a build version, replacing the ones it had
+
+        Args:
+            version (str): build version of the database the responses were rendered from
+            entries: iterable of (str, StoredResponse) with the request key and the stored body of each response
+
+        Returns:
+            int: number of responses published
+        """
+        db = self._get_writer()
+        with transaction(db):
+            db.execute("DELETE FROM response WHERE version = ?", (version,))
+            count = db.executemany("INSERT INTO response (version, key, digest, encodings) VALUES (?, ?, ?, ?)",
+                                   ((version, key, stored.digest, ','.join(stored.encodings))
+                                    for key, stored in entries)).rowcount
+        return count
+
+    def find(self, version, key):
+        """
+        Returns:
+            StoredResponse: the stored response of a request for a build version, None if there is none
+        """
+        db = self._get_reader()
+        if db is None:
+            return None
+        try:
+            row = db.execute("SELECT digest, encodings FROM response WHERE version = ? AND key = ?",
+                             (version, key)).fetchone()
+        except sqlite3.OperationalError:
+            # The manifest is being created
+            return None
+        return StoredResponse(row[0], tuple(row[1].split(','))) if row else None
+
+    def versions(self):
+        """
+        Returns:
+            list of str: build versions with published responses
+        """
+        db = self._get_reader()
+        if db is None:
+            return []
+        return [row[0] for row in db.execute("SELECT DISTINCT version FROM response ORDER BY version")]
+
+    def prune(self, kept_versions):
+        """
+        Drops the responses of every build version but the kept ones and deletes the bodies no kept response uses,
+        along with the temporary files of interrupted renders. It waits for the renders in progress (see writing) to
+        finish. Servers still reading a dropped version fall back to computing its responses
+
+        Args:
+            kept_versions (list of str): build versions to keep
+
+        Returns:
+            int: number of bodies deleted
+        """
+        with self._lock(fcntl.LOCK_EX):
+            db = self._get_writer()
+            with transaction(db):
+                db.execute("DELETE FROM response WHERE version NOT IN (%s)" % (', '.join('?' * len(kept_versions)),),
+                           list(kept_versions))
+            used = set(row[0] for row in db.execute("SELECT DISTINCT digest FROM response"))
+            deleted = 0
+            for entry in os.scandir(self._directory):
+                if not entry.is_dir():
+                    continue
+                for file_entry in os.scandir(entry.path):
+                    # Nobody is writing, so temporary files are leftovers of interrupted renders
+                    digest = file_entry.name.split('.', 1)[0]
+                    if digest not in used or file_entry.name.endswith('.tmp'):
+                        os.remove(file_entry.path)
+                        deleted += file_entry.name.endswith(ENCODING_EXTENSIONS[IDENTITY])
+                if not os.listdir(entry.path):
+                    os.rmdir(entry.path)
+        return deleted
+
+    @contextmanager
+    def _lock(self, operation):
+        os.makedirs(self._directory, exist_ok=True)
+        with open(os.path.join(self._directory, "store.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _manifest(self):
+        return os.path.join(self._directory, "manifest.db")
+
+    def _get_local(self):
+        """
+        Returns the connections of the calling thread, dropping the ones inherited from another process
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.reader = None
+            local.writer = None
+            local.pid = os.getpid()
+        return local
+
+    def _get_reader(self):
+        """
+        Returns the read-only connection of the calling thread, None while there is no manifest
+        """
+        local = self._get_local()
+        if local.reader is None and os.path.exists(self._manifest()):
+            local.reader = sqlite3.connect("file:%s?mode=ro" % (quote(self._manifest()),), uri=True,
+                                           timeout=self._timeout)
+        return local.reader
+
+    def _get_writer(self):
+        """
+        Returns the connection of the calling thread to write the manifest, creating the store if needed
+        """
+        local = self._get_local()
+        if local.writer is None:
+            local.writer = self._connect()
+        return local.writer
+
+    def _connect(self):
+        os.makedirs(self._directory, exist_ok=True)
+        # The manifest keeps the rollback journal: unlike WAL, it can be read by read-only connections alone
+        db = sqlite3.connect(self._manifest(), timeout=self._timeout, isolation_level=None)
+        with transaction(db):
+            db.execute("""CREATE TABLE IF NOT EXISTS response (
+                            version TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            digest TEXT NOT NULL,
+                            encodings TEXT NOT NULL,
+                            PRIMARY KEY (version, key))""")
+        return db
+
+
+def _write_atomically(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+    with open(temporary_path, 'wb') as temporary_file:
+        temporary_file.write(data)
+    os.replace(temporary_path, path)
@@ -1,7 +1,9 @@
-from functools import lru_cache
+from copy import deepcopy
 
 from infrastructure.errors.errors import AreaRepositoryError
-from infrastructure.sql_repos.utils import create_insert_query, get_db, create_replace_query
+from infrastructure.sql_repos.entity_cache import DatabaseContext, cached_entity
+from infrastructure.sql_repos.utils import create_insert_query, get_db, create_replace_query, execute_many, \
+    is_bulk_load
 from odb.domain.model.area.area import Repository, Area
 from odb.domain.model.area.area_info import AreaInfo
 from odb.domain.model.area.area_short_info import AreaShortInfo
@@ -15,14 +17,19 @@ class AreaRepository(Repository):
     Concrete sqlite repository for Areas.
     """
 
-    def __init__(self, recreate_db, config):
+    def __init__(self, recreate_db, config=None, connection_pool=None):
         """
         Constructor for AreaRepository
 
         Args:
+            recreate_db (bool): Indicates if the database should be dropped on start
+            config (RawConfigParser): sqlite configuration, used when no connection pool is given
+            connection_pool (ReadOnlyConnectionPool, optional): pool to take a read-only connection from
         """
         self._config = config
-        self._db = self._initialize_db(recreate_db)
+        self._db = connection_pool.get_db() if connection_pool else self._initialize_db(recreate_db)
+        self._context = connection_pool.context if connection_pool else DatabaseContext.for_database(
+            config.get("CONNECTION", "SQLITE_DB"))
 
     def _initialize_db(self, recreate_db):
         db = get_db(self._config)
@@ -48,7 +55,6 @@ class AreaRepository(Repository):
                 );
                 """
             db.execute(sql)
-            db.execute("CREATE UNIQUE INDEX area_iso3_iso2_index ON area(iso3 COLLATE NOCASE, iso2 COLLATE NOCASE)")
             db.execute('DROP TABLE IF EXISTS area_info')
             sql = """
                 CREATE TABLE area_info
@@ -63,15 +69,40 @@ class AreaRepository(Repository):
                 );
                 """
             db.execute(sql)
+            if not is_bulk_load(self._config):
+                self._create_indexes(db)
             db.commit()
         return db
 
+    def create_indexes(self):
+        """
+        Creates the indexes of the area tables if they don't exist, they are created along with the tables unless the
+        repository is used for a bulk load
+        """
+        self._create_indexes(self._db)
+        self._db.commit()
+
+    @staticmethod
+    def _create_indexes(db):
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS area_iso3_iso2_index "
+                   "ON area(iso3 COLLATE NOCASE, iso2 COLLATE NOCASE)")
+
     def begin_transaction(self):
         self._db.execute("BEGIN TRANSACTION")
 
     def commit_transaction(self):
         self._db.commit()
 
+    def reset_cache(self):
+        """
+        Drops the entities cached for the database of this repository, to be called after writing to it
+        """
+        self._context.reset()
+
+    @property
+    def cache_stats(self):
+        return self._context.entity_cache.stats()
+
     def find_by_name(self, area_name):
         """
         Finds one area by its name
@@ -111,8 +142,12 @@ class AreaRepository(Repository):
         self.set_years_with_data(data)
         return AreaRowAdapter().dict_to_area(data)
 
-    @lru_cache(maxsize=None)
     def find_by_iso3(self, iso3_code):
+        # The cache keeps the row, every call builds a new Area so callers can change it without altering the cache
+        return AreaRowAdapter().dict_to_area(deepcopy(self._find_row_by_iso3(iso3_code)))
+
+    @cached_entity
+    def _find_row_by_iso3(self, iso3_code):
         query = "SELECT * FROM area WHERE (iso3 = :iso3_code)"
         iso3_code = iso3_code or ''
         r = self._db.execute(query, {'iso3_code': iso3_code}).fetchone()
@@ -123,7 +158,101 @@ class AreaRepository(Repository):
         self.set_region_countries(data)
         self.set_area_info(data)
         self.set_years_with_data(data)
-        return AreaRowAdapter().dict_to_area(data)
+        return data
+
+    def find_by_iso3_list(self, iso3_codes):
+        """
+        Finds several areas by their iso3 codes. The areas and everything they carry (countries of the regions, area
+        info and years with data) are loaded with a fixed number of queries instead of a few queries per area
+
+        Args:
+            iso3_codes (iterable of str): iso3 codes of the areas, case insensitive
+
+        Returns:
+            dict: Area for each one of the given codes, codes without area are left out
+        """
+        iso3_codes = set(code for code in iso3_codes if code)
+        if not iso3_codes:
+            return {}
+
+        area_rows = self._find_rows_in("SELECT * FROM area WHERE iso3 IN (%s)", iso3_codes)
+        self._set_relations(area_rows)
+
+        areas_by_code = dict((area['iso3'].upper(), AreaRowAdapter().dict_to_area(area)) for area in area_rows)
+        return dict((code, areas_by_code[code.upper()]) for code in iso3_codes if code.upper() in areas_by_code)
+
+    def _set_relations(self, area_rows, countries=True, years_with_data=True):
+        """
+        Batch version of set_region_countries, set_area_info and set_years_with_data for a list of area dicts
+
+        Args:
+            area_rows (list of dict): dicts with area row data
+            countries (bool): set the countries of the regions
+            years_with_data (bool): set the years with data of the areas
+        """
+        region_codes = [row['iso3'] for row in area_rows if row['area'] is None] if countries else []
+        country_rows = self._find_rows_in("SELECT * FROM area WHERE area IN (%s) ORDER BY name ASC",
+                                          region_codes) if region_codes else []
+        info_by_area = self._find_area_info_by_area(set(row['iso3'] for row in area_rows + country_rows))
+        years_by_area = self._find_years_with_data_by_area(
+            [row['iso3'] for row in (area_rows if years_with_data else []) + country_rows if row['area'] is not None])
+
+        countries_by_region = {}
+        for country in country_rows:
+            country['info'] = info_by_area.get(country['iso3'], [])
+            country['years_with_data'] = years_by_area.get(country['iso3'].upper(), [])
+            countries_by_region.setdefault(country['area'], []).append(country)
+
+        for area in area_rows:
+            if area['iso3'] in countries_by_region:
+                area['countries'] = countries_by_region[area['iso3']]
+            area['info'] = info_by_area.get(area['iso3'], [])
+            if years_with_data:
+                area['years_with_data'] = years_by_area.get(area['iso3'].upper(), [])
+
+    def _find_rows_in(self, query, values):
+        values = list(values)
+        return [dict(r) for r in self._db.execute(query % (', '.join('?' * len(values)),), values).fetchall()]
+
+    def _find_area_info_by_area(self, iso3_codes):
+        """
+        Batch version of find_area_info
+
+        Args:
+            iso3_codes (iterable of str): iso3 codes of the areas
+
+        Returns:
+            dict: list of area info dicts by iso3, sorted by year in descending order
+        """
+        info_by_area = {}
+        for info in self._find_rows_in("SELECT * FROM area_info WHERE area IN (%s) ORDER BY year DESC", iso3_codes):
+            info_by_area.setdefault(info['area'], []).append(info)
+        return info_by_area
+
+    def _find_years_with_data_by_area(self, iso3_codes):
+        """
+        Batch version of find_years_with_data. Years are listed in the order they appear when scanning the
+        observations by indicator, area and year, as find_years_with_data does
+
+        Args:
+            iso3_codes (iterable of str): iso3 codes of the countries
+
+        Returns:
+            dict: list of years by upper case iso3
+        """
+        years_by_area = {}
+        if not iso3_codes:
+            return years_by_area
+        # Within an indicator years show up in ascending order, so the first appearance of each year is given by the
+        # first indicator with data for it
+        query = "SELECT area, year, MIN(indicator) AS first_indicator FROM observation " \
+                "WHERE area COLLATE NOCASE IN (%s) GROUP BY area, year"
+        rows = self._find_rows_in(query, iso3_codes)
+        for row in sorted(rows, key=lambda r: (r['first_indicator'], r['year'])):
+            years = years_by_area.setdefault(row['area'].upper(), [])
+            if row['year'] not in years:
+                years.append(row['year'])
+        return years_by_area
 
     # FIXME: Review this method signature
     def find_countries_by_code_or_income(self, area_code_or_income):
@@ -216,12 +345,82 @@ class AreaRepository(Repository):
         if commit:
             self._db.commit()
 
+    def insert_regions(self, regions, commit=True):
+        """
+        Inserts several regions at once using executemany in chunks
+
+        Args:
+            regions: iterable of Region
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: number of regions inserted
+        """
+        count = execute_many(self._db, 'area', (self._area_row(RegionRowAdapter().region_to_dict(region))
+                                                for region in regions))
+        if commit:
+            self._db.commit()
+        return count
+
+    def insert_countries(self, countries, commit=True):
+        """
+        Inserts several countries at once using executemany in chunks
+
+        Args:
+            countries: iterable of Country
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: number of countries inserted
+        """
+        count = execute_many(self._db, 'area', (self._area_row(CountryRowAdapter().country_to_dict(country))
+                                                for country in countries))
+        if commit:
+            self._db.commit()
+        return count
+
+    def upsert_area_infos(self, area_infos, commit=True):
+        """
+        Inserts or replaces several area infos at once using executemany in chunks
+
+        Args:
+            area_infos: iterable of tuples (area or iso3, AreaInfo)
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: number of area infos upserted
+        """
+        count = execute_many(self._db, 'area_info', (
+            AreaInfoRowAdapter().info_to_dict(area_or_iso3.iso3 if isinstance(area_or_iso3, Area) else area_or_iso3,
+                                              area_info) for area_or_iso3, area_info in area_infos),
+                             query_builder=create_replace_query)
+        if commit:
+            self._db.commit()
+        return count
+
+    def delete_area_infos(self, indicator_code, commit=True):
+        """
+        Deletes the area infos of an indicator of every area
+
+        Args:
+            indicator_code (str): code of the area info indicator
+            commit (bool): commit the changes after the deletion
+        """
+        self._db.execute("DELETE FROM area_info WHERE indicator_code = :indicator_code",
+                         {'indicator_code': indicator_code})
+        if commit:
+            self._db.commit()
+
+    @staticmethod
+    def _area_row(data):
+        del data['years_with_data']
+        return data
+
     def update_search_data(self, iso3, search, commit=True):
         self._db.execute('UPDATE area SET search=:search WHERE iso3=:iso3', {'iso3': iso3, 'search': search})
         if commit:
             self._db.commit()
 
-    @lru_cache(maxsize=None)
     def find_area_info(self, iso3):
         """
         Finds the area infor for the country with the iso3 specified
@@ -229,13 +428,15 @@ class AreaRepository(Repository):
             iso3: iso3 code for the related area
 
         Returns:
-            list of AreaInfo: The list of AreaInfo objects
+            list of AreaInfo: The list of AreaInfo objects, new dicts on every call
 
         """
-        query = "SELECT * FROM area_info WHERE area = :iso3 ORDER BY year DESC"
-        rows = self._db.execute(query, {"iso3": iso3}).fetchall()
+        return [dict(r) for r in self._find_area_info_rows(iso3)]
 
-        return [dict(r) for r in rows]
+    @cached_entity
+    def _find_area_info_rows(self, iso3):
+        query = "SELECT * FROM area_info WHERE area = :iso3 ORDER BY year DESC"
+        return tuple(self._db.execute(query, {"iso3": iso3}).fetchall())
 
     def find_areas(self, order="name"):
         """
@@ -265,13 +466,8 @@ class AreaRepository(Repository):
         query = "SELECT * FROM area WHERE area IS NULL ORDER BY :order ASC"
         rows = self._db.execute(query, {'order': order}).fetchall()
 
-        regions = []
-
-        for region in [dict(r) for r in rows]:
-            self.set_region_countries(region)
-            self.set_area_info(region)
-
-            regions.append(region)
+        regions = [dict(r) for r in rows]
+        self._set_relations(regions, years_with_data=False)
 
         return RegionRowAdapter().transform_to_region_list(regions)
 
@@ -288,21 +484,20 @@ class AreaRepository(Repository):
         query = "SELECT * FROM area WHERE area IS NOT NULL ORDER BY :order ASC"
         rows = self._db.execute(query, {'order': order}).fetchall()
 
-        country_list = []
-
-        for country in [dict(r) for r in rows]:
-            self.set_area_info(country)
-            self.set_years_with_data(country)
-            country_list.append(country)
+        country_list = [dict(r) for r in rows]
+        self._set_relations(country_list, countries=False)
 
         return CountryRowAdapter().transform_to_country_list(country_list)
 
-    @lru_cache(maxsize=None)
     def find_years_with_data(self, iso3):
+        return list(self._find_years_with_data(iso3))
+
+    @cached_entity
+    def _find_years_with_data(self, iso3):
         query = "SELECT DISTINCT(observation.year) FROM area INNER JOIN observation ON area.iso3 = observation.area WHERE area.area IS NOT NULL AND AREA.iso3 = :iso3"
         rows = self._db.execute(query, {'iso3': iso3})
 
-        return [r['year'] for r in rows]
+        return tuple(r['year'] for r in rows)
 
     def set_years_with_data(self, area_dict):
         iso3 = area_dict["iso3"]
@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from infrastructure.sql_repos.entity_cache import DatabaseContext
+from infrastructure.sql_repos.utils import read_build_version
+
+# Bytes of the database file mapped into memory by every connection (256 MiB, more than the whole database)
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class ReadOnlyConnectionPool(object):
+    """
+    Hands out read-only sqlite connections, one per thread, that live as long as their thread instead of being opened
+    for every repository instance. It's meant for processes that only read the database, like the API.
+
+    Connections are opened with a mode=ro&immutable=1 URI, so sqlite skips locking and change detection. This means
+    the database file must not be modified in place while the pool is in use, it must be replaced instead (the parser
+    builds a new file and renames it over the old one). The pool checks the file on every get_db call and, when it
+    has been replaced, resets itself: every thread opens a new connection to the new file the next time it asks for
+    one, while the requests running on the old connections keep reading the old file until they finish. Old
+    connections are never closed by the pool while something may still use them, they are closed once the last
+    repository holding them is released.
+
+    A thread can pin its connection (see pin), so everything it reads until it unpins it comes from one single file,
+    even if the file is replaced meanwhile. The API pins a connection for every request.
+
+    Every connection reads the build version of the file it opened (see get_version), which tells the caches of
+    anything computed from the database when their entries are stale. The entity cache of the repositories is bound to
+    that build version (see context), so entities read from the old file are never mixed with the ones of the new file,
+    even if the file is replaced while a connection is being opened.
+    """
+
+    def __init__(self, config, mmap_size=DEFAULT_MMAP_SIZE):
+        """
+        Constructor for ReadOnlyConnectionPool
+
+        Args:
+            config (RawConfigParser): sqlite configuration with the database path in CONNECTION/SQLITE_DB
+            mmap_size (int): bytes of the database file to memory map, 0 to disable it
+        """
+        self._database = os.path.abspath(config.get("CONNECTION", "SQLITE_DB"))
+        self._mmap_size = mmap_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._opened_connections = 0
+        self._contexts = {}
+        self._file_identity = self._stat_database()
+
+    @property
+    def database(self):
+        return self._database
+
+    @property
+    def opened_connections(self):
+        return self._opened_connections
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def context(self):
+        """
+        Returns:
+            DatabaseContext: context of the build version read by the connection of the calling thread, get_db must
+                have been called first
+        """
+        return self._local.context
+
+    def get_db(self):
+        """
+        Returns the connection of the calling thread, opening it if the thread has none or the pool has been reset
+        since it was opened
+
+        Returns:
+            sqlite3.Connection: read-only connection with sqlite3.Row as row factory
+        """
+        local = self._local
+        if getattr(local, 'pinned', False):
+            return local.db
+        self._check_database_file()
+        db = getattr(local, 'db', None)
+        if db is None or local.generation != self._generation:
+            # The previous connection is left open, repositories created before the reset may still be reading it
+            local.generation = self._generation
+            db, version = self._connect_with_version()
+            local.db = db
+            local.version = version
+            local.context = self._get_context(version)
+        return db
+
+    def pin(self):
+        """
+        Pins the connection of the calling thread: until unpin is called, get_db, get_version and context return the
+        same connection, build version and context, even if the database file is replaced meanwhile
+
+        Returns:
+            sqlite3.Connection: the pinned connection
+        """
+        db = self.get_db()
+        self._local.pinned = True
+        return db
+
+    def unpin(self):
+        """
+        Unpins the connection of the calling thread. If the database file was replaced while it was pinned the pool
+        lets go of the connection, which is closed as soon as nothing uses it (e.g. once a streamed response that
+        reads it is sent)
+        """
+        local = self._local
+        local.pinned = False
+        if getattr(local, 'db', None) is not None and local.generation != self._generation:
+            local.db = None
+
+    def get_version(self):
+        """
+        Returns the build version of the database read by the connection of the calling thread, opening it if needed
+
+        Returns:
+            str: build version stamped by the parser, or one made from the identity of the file for databases built
+                before versions were stamped
+        """
+        self.get_db()
+        return self._local.version
+
+    def reset(self):
+        """
+        Discards the current connections and entity cache, each thread will open a new connection on its next get_db
+        call
+        """
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._generation += 1
+        self._contexts = {}
+
+    def _get_context(self, version):
+        """
+        Returns:
+            DatabaseContext: context of a build version, created the first time a connection reads it
+        """
+        with self._lock:
+            if version not in self._contexts:
+                self._contexts[version] = DatabaseContext(self._database)
+            return self._contexts[version]
+
+    def _check_database_file(self):
+        """
+        Resets the pool if the database file has been replaced since it was last checked
+        """
+        file_identity = self._stat_database()
+        if file_identity is None or file_identity == self._file_identity:
+            return
+        with self._lock:
+            if file_identity != self._file_identity:
+                self._file_identity = file_identity
+                self._reset()
+
+    def _stat_database(self):
+        """
+        Returns:
+            tuple: device, inode, modification time and size of the database file, None if it doesn't exist
+        """
+        try:
+            stat = os.stat(self._database)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _connect_with_version(self):
+        """
+        Opens a connection and reads the build version of the file it opened
+
+        Returns:
+            (sqlite3.Connection, str): the connection and its build version
+        """
+        while True:
+            file_identity = self._stat_database()
+            db = self._connect()
+            version = read_build_version(db)
+            if version is not None:
+                return db, version
+            # Databases built before versions were stamped are told apart by the identity of the file, which is only
+            # the one of the opened file if the file was not replaced while opening it
+            if self._stat_database() == file_identity:
+                return db, _file_version(file_identity)
+            db.close()
+
+    def _connect(self):
+        uri = "file:%s?mode=ro&immutable=1" % (quote(self._database),)
+        db = sqlite3.connect(uri, uri=True)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA mmap_size=%d" % (self._mmap_size,))
+        with self._lock:
+            self._opened_connections += 1
+        return db
+
+
+def _file_version(file_identity):
+    return "file-" + "-".join("%x" % (value,) for value in file_identity) if file_identity else "unknown"
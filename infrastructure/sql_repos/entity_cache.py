@@ -0,0 +1,133 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+# Maximum number of entries kept by each entity cache before evicting the least recently used ones
+DEFAULT_MAXSIZE = 2048
+
+
+class EntityCache(object):
+    """
+    Thread-safe, size bounded LRU cache for the entities returned by the repository finders. Exceptions raised while
+    loading an entry are not cached, as with functools.lru_cache.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, loader):
+        """
+        Returns the entry stored under key, loading and storing it if there is none
+
+        Args:
+            key (hashable): key of the entry
+            loader (func): function without arguments returning the value to store on a miss
+
+        Returns:
+            the cached or just loaded value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, current size and maximum size of the cache
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                    'size': len(self._entries), 'maxsize': self._maxsize}
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+
+class DatabaseContext(object):
+    """
+    State shared by every repository working on the same database file, no matter how many repository instances are
+    created (the API creates new ones on every request). For now it holds the entity cache.
+    """
+
+    _contexts = {}
+    _contexts_lock = threading.Lock()
+
+    def __init__(self, database, maxsize=DEFAULT_MAXSIZE):
+        self._database = database
+        self._entity_cache = EntityCache(maxsize)
+
+    @classmethod
+    def for_database(cls, database):
+        """
+        Returns the context of a database, creating it the first time
+
+        Args:
+            database (str): path to the database file
+
+        Returns:
+            DatabaseContext: the context shared by all the repositories of the database
+        """
+        database = os.path.abspath(database)
+        with cls._contexts_lock:
+            if database not in cls._contexts:
+                cls._contexts[database] = cls(database)
+            return cls._contexts[database]
+
+    @property
+    def database(self):
+        return self._database
+
+    @property
+    def entity_cache(self):
+        return self._entity_cache
+
+    def reset(self):
+        """
+        Drops every cached entity, must be called after writing to the database
+        """
+        self._entity_cache.clear()
+
+
+def cached_entity(method):
+    """
+    Decorator for repository finders that caches their results in the entity cache of the repository database
+    context (self._context), keyed by the method and its arguments.
+
+    The results are shared by every repository, request and thread of the process, so the decorated finders return
+    rows (or tuples of rows) and the public finders build new entities from them on every call.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__,) + args + tuple(sorted(kwargs.items()))
+        return self._context.entity_cache.get(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
@@ -1,24 +1,37 @@
-from functools import lru_cache
-
 from infrastructure.errors.errors import IndicatorRepositoryError
-from infrastructure.sql_repos.utils import create_insert_query, get_db
-from odb.domain.model.indicator.indicator import Repository, Indicator
+from infrastructure.sql_repos.entity_cache import DatabaseContext
+from infrastructure.sql_repos.indicator_tree import IndicatorTree
+from infrastructure.sql_repos.utils import create_insert_query, get_db, execute_many, is_bulk_load
+from odb.domain.model.indicator.indicator import Repository, Indicator, IndicatorReadModel
 from odb.domain.model.indicator.indicator import create_indicator
 
+# Levels of the indicator tree, from the root down. The level of an indicator is the one of its first empty ancestor
+# column (see ANCESTOR_COLUMNS), a tree filter of a level selects the indicators of that level and the ones above
+TREE_LEVELS = ('INDEX', 'SUBINDEX', 'COMPONENT', 'INDICATOR')
+# Columns of the indicator table holding the codes of the ancestors of an indicator, from the root down
+ANCESTOR_COLUMNS = ('index_code', 'subindex', 'component')
+
 
 class IndicatorRepository(Repository):
     """
     Concrete sqlite repository for Indicators.
     """
 
-    def __init__(self, recreate_db, config):
+    def __init__(self, recreate_db, config=None, connection_pool=None):
         """
         Constructor for IndicatorRepository
 
         Args:
+            recreate_db (bool): Indicates if the database should be dropped on start
+            config (RawConfigParser): sqlite configuration, used when no connection pool is given
+            connection_pool (ReadOnlyConnectionPool, optional): pool to take a read-only connection from
         """
         self._config = config
-        self._db = self._initialize_db(recreate_db)
+        self._db = connection_pool.get_db() if connection_pool else self._initialize_db(recreate_db)
+        # Repositories reading from a pool only serve queries, so they return read models instead of entities
+        self._read_model = connection_pool is not None
+        self._context = connection_pool.context if connection_pool else DatabaseContext.for_database(
+            config.get("CONNECTION", "SQLITE_DB"))
 
     def _initialize_db(self, recreate_db):
         db = get_db(self._config)
@@ -51,45 +64,135 @@ class IndicatorRepository(Repository):
                 );
                 '''
             db.execute(sql)
-            db.execute("CREATE UNIQUE INDEX indicator_indicator_index ON indicator (indicator COLLATE NOCASE)")
+            db.execute('DROP TABLE IF EXISTS indicator_ancestor')
+            self._create_ancestor_table(db)
+            if not is_bulk_load(self._config):
+                self._create_indexes(db)
+            db.commit()
+        elif db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'indicator_ancestor'") \
+                .fetchone() is None:
+            # Databases built before the ancestor table existed get it from their indicators
+            self._create_ancestor_table(db)
+            self._create_indexes(db)
+            rows = [dict(r) for r in db.execute("SELECT * FROM indicator ORDER BY id").fetchall()]
+            execute_many(db, 'indicator_ancestor', (ancestor for row in rows for ancestor in _ancestor_rows(row)))
             db.commit()
         return db
 
+    @staticmethod
+    def _create_ancestor_table(db):
+        # Closure of the indicator tree: a row for every indicator and each one of its ancestors (itself included,
+        # with depth 0), keyed by ancestor and tree level of the indicator so the observations of a subtree down to
+        # a level are found with an index range
+        sql = '''
+            CREATE TABLE IF NOT EXISTS indicator_ancestor
+            (
+                ancestor TEXT,
+                level INTEGER,
+                indicator TEXT,
+                depth INTEGER,
+                PRIMARY KEY (ancestor, level, indicator)
+            ) WITHOUT ROWID;
+            '''
+        db.execute(sql)
+
+    def create_indexes(self):
+        """
+        Creates the indexes of the indicator table if they don't exist, they are created along with the table unless
+        the repository is used for a bulk load
+        """
+        self._create_indexes(self._db)
+        self._db.commit()
+
+    @staticmethod
+    def _create_indexes(db):
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS indicator_indicator_index "
+                   "ON indicator (indicator COLLATE NOCASE)")
+        db.execute("CREATE INDEX IF NOT EXISTS indicator_ancestor_indicator_index "
+                   "ON indicator_ancestor (indicator, depth)")
+
     def begin_transaction(self):
         self._db.execute("BEGIN TRANSACTION")
 
     def commit_transaction(self):
         self._db.commit()
 
+    def reset_cache(self):
+        """
+        Drops the entities cached for the database of this repository, to be called after writing to it
+        """
+        self._context.reset()
+
+    @property
+    def cache_stats(self):
+        return self._context.entity_cache.stats()
+
     def insert_indicator(self, indicator, commit=True):
         data = IndicatorRowAdapter().indicator_to_dict(indicator)
         query = create_insert_query('indicator', data)
         self._db.execute(query, data)
+        execute_many(self._db, 'indicator_ancestor', _ancestor_rows(data))
         if commit:
             self._db.commit()
 
-    @lru_cache(maxsize=None)
+    def insert_indicators(self, indicators, commit=True):
+        """
+        Inserts several indicators at once using executemany in chunks
+
+        Args:
+            indicators: iterable of Indicator
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: number of indicators inserted
+        """
+        adapter = IndicatorRowAdapter()
+        rows = [adapter.indicator_to_dict(indicator) for indicator in indicators]
+        count = execute_many(self._db, 'indicator', rows)
+        execute_many(self._db, 'indicator_ancestor', (ancestor for row in rows for ancestor in _ancestor_rows(row)))
+        if commit:
+            self._db.commit()
+        return count
+
+    def find_indicator_tree(self):
+        """
+        Returns the indicator tree of the database, loaded with one single query the first time it's needed and kept
+        in the entity cache until the cache is reset (i.e. the indicators change or a new database file is opened)
+
+        Returns:
+            IndicatorTree: every indicator of the database
+        """
+        return self._context.entity_cache.get(('IndicatorTree',), self._load_indicator_tree)
+
+    def _load_indicator_tree(self):
+        rows = [dict(r) for r in self._db.execute("SELECT * FROM indicator ORDER BY id").fetchall()]
+        return IndicatorTree(rows, IndicatorRowAdapter.dict_to_indicator_read_model if self._read_model
+                             else IndicatorRowAdapter.dict_to_indicator)
+
     def find_indicator_by_code(self, indicator_code, _type=None):
-        query = "SELECT * FROM indicator WHERE indicator LIKE :indicator"
+        # Not cached: the tree builds a new Indicator on every call, so callers can change it without altering the cache
         if not indicator_code:
             raise IndicatorRepositoryError("Indicator name must not be empty")
-        data = {'indicator': indicator_code.upper()}
-        if _type:
-            query += " AND type LIKE :_type"
-            data['_type'] = _type
 
-        r = self._db.execute(query, data).fetchone()
-        if r is None and _type is None:
+        indicator = self.find_indicator_tree().find_by_code(indicator_code.upper(), _type)
+        if indicator is None and _type is None:
             raise IndicatorRepositoryError("No indicator with code %s found" % (indicator_code,))
-        elif r is None and _type is not None:
+        elif indicator is None and _type is not None:
             raise IndicatorRepositoryError(
                 "No indicator with code %s and type %s found" % (indicator_code, _type))
+        return indicator
 
-        data = dict(r)
-        children = self.find_indicator_children(data)
-        data["children"] = children
+    def find_indicators_by_codes(self, indicator_codes):
+        """
+        Finds several indicators by their codes, children included. Codes are matched as find_indicator_by_code does
 
-        return IndicatorRowAdapter().dict_to_indicator(data)
+        Args:
+            indicator_codes (iterable of str): indicator codes, case insensitive
+
+        Returns:
+            dict: Indicator for each one of the given codes, codes without indicator are left out
+        """
+        return self.find_indicator_tree().find_by_codes(indicator_codes)
 
     def find_component_by_short_name(self, short_name, subindex):
         query = "SELECT * FROM indicator WHERE short_name LIKE :short_name AND subindex LIKE :subindex"
@@ -152,26 +255,7 @@ class IndicatorRepository(Repository):
         Returns:
             list of Indicator: The children of the indicator
         """
-        # We could get everything in one query, but it is easier to read this way
-        if indicator_dict['type'].upper() == 'INDEX':
-            query = "SELECT * FROM indicator WHERE (type = 'SUBINDEX' AND index_code=:index_code)"
-            indicators = self._db.execute(query, {'index_code': indicator_dict['indicator']}).fetchall()
-        elif indicator_dict['type'].upper() == 'SUBINDEX':
-            query = "SELECT * FROM indicator WHERE (type = 'COMPONENT' AND subindex=:subindex)"
-            indicators = self._db.execute(query, {'subindex': indicator_dict['indicator']}).fetchall()
-        elif indicator_dict['type'].upper() == 'COMPONENT':
-            query = "SELECT * FROM indicator WHERE ((type = 'PRIMARY' OR type = 'SECONDARY') AND component = :component)"
-            indicators = self._db.execute(query, {'component': indicator_dict['indicator']}).fetchall()
-        else:
-            return []
-
-        processed_indicators = []
-        for indicator in [dict(i) for i in indicators]:
-            children = self.find_indicator_children(indicator)
-            indicator["children"] = children
-            processed_indicators.append(IndicatorRowAdapter.dict_to_indicator(indicator))
-
-        return processed_indicators
+        return self.find_indicator_tree().find_children(indicator_dict['type'], indicator_dict['indicator'])
 
     def find_indicators_sub_indexes(self):
         return self.find_indicators_by_level("SUBINDEX")
@@ -209,27 +293,45 @@ class IndicatorRepository(Repository):
         Returns:
             list of Indicator: Indicators that fit with the given filters
         """
-
         if parent is not None:
-            # We filter by matching the parent_type to the column, in the future we may want to change this if there is
-            # not a clear mapping or we are using relations (e.g. foreign keys)
-            parent_column = "index_code" if parent.type == "INDEX" else parent.type
-            where_clause = "WHERE (type = :type AND %s = :parent_code)" % (parent_column,)
-            query = "SELECT * FROM indicator %s" % (where_clause,)
-            rows = self._db.execute(query, {'type': level, 'parent_code': parent.indicator}).fetchall()
-        else:
-            where_clause = "WHERE (type = :type)"
-            query = "SELECT * FROM indicator %s" % (where_clause,)
-            rows = self._db.execute(query, {'type': level}).fetchall()
+            return self.find_indicator_tree().find_by_level(level, parent.type, parent.indicator)
+        return self.find_indicator_tree().find_by_level(level)
+
+
+def tree_level(indicator_dict):
+    """
+    Returns the level of an indicator in the tree, the one of its first empty ancestor column
+
+    Args:
+        indicator_dict (dict): indicator row
+
+    Returns:
+        int: position of the level in TREE_LEVELS
+    """
+    return next((position for position, column in enumerate(ANCESTOR_COLUMNS) if indicator_dict[column] is None),
+                len(ANCESTOR_COLUMNS))
+
 
-        processed_indicators = []
+def _ancestor_rows(indicator_dict):
+    """
+    Returns the indicator_ancestor rows of an indicator: itself and the codes in its ancestor columns, the closest
+    ones first
 
-        for indicator in [dict(r) for r in rows]:
-            children = self.find_indicator_children(indicator)
-            indicator["children"] = children
-            processed_indicators.append(indicator)
+    Args:
+        indicator_dict (dict): indicator row
 
-        return IndicatorRowAdapter().transform_to_indicator_list(processed_indicators)
+    Returns:
+        list of dict: rows with ancestor, level, indicator and depth
+    """
+    level = tree_level(indicator_dict)
+    code = indicator_dict['indicator']
+    ancestors = [code] + [indicator_dict[column] for column in reversed(ANCESTOR_COLUMNS)
+                          if indicator_dict[column] is not None]
+    rows = []
+    for depth, ancestor in enumerate(ancestors):
+        if ancestor not in ancestors[:depth]:
+            rows.append({'ancestor': ancestor, 'level': level, 'indicator': code, 'depth': depth})
+    return rows
 
 
 class IndicatorRowAdapter(object):
@@ -272,6 +374,21 @@ class IndicatorRowAdapter(object):
         data.pop('index_code')
         return create_indicator(**data)
 
+    @staticmethod
+    def dict_to_indicator_read_model(indicator_dict):
+        """
+        Transforms one single indicator into a read model
+
+        Args:
+            indicator_dict (dict): Indicator dictionary coming from a sqlite row with children already filled
+
+        Returns:
+            IndicatorReadModel: IndicatorReadModel object with the data in indicator_dict
+        """
+        data = dict(indicator_dict)
+        data['index'] = data.pop('index_code')
+        return IndicatorReadModel(**data)
+
     @staticmethod
     def transform_to_indicator_list(indicator_dict_list):
         """
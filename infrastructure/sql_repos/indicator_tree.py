@@ -0,0 +1,153 @@
+import re
+
+# Column holding the code of the parent of the indicators of every type
+PARENT_COLUMNS = {'SUBINDEX': 'index_code', 'COMPONENT': 'subindex', 'PRIMARY': 'component', 'SECONDARY': 'component'}
+# Type of the children of the indicators of every type
+CHILD_TYPES = {'INDEX': ('SUBINDEX',), 'SUBINDEX': ('COMPONENT',), 'COMPONENT': ('PRIMARY', 'SECONDARY')}
+
+
+class IndicatorTree(object):
+    """
+    The whole indicator table loaded in memory, with the rows indexed by code, by type and by parent, so the indicator
+    finders don't need a query per level of the tree. It's built from one single SELECT and answers as the SQL queries
+    it replaces: rows come in table (id) order and codes are matched as LIKE does on the NOCASE indicator column.
+
+    The tree keeps rows, not Indicators: every finder builds new Indicators with their children, so callers can change
+    them without altering the tree.
+    """
+
+    def __init__(self, rows, build_indicator):
+        """
+        Constructor for IndicatorTree
+
+        Args:
+            rows (list of dict): every row of the indicator table in id order
+            build_indicator (func): function turning a row dict with its 'children' filled into an Indicator
+        """
+        self._rows = rows
+        self._build_indicator = build_indicator
+        # LIKE is resolved through the NOCASE index (so the first match is the first one in that order) unless the
+        # pattern starts with a wildcard, in which case the table is scanned in id order
+        self._like_ordered_rows = sorted((row for row in rows if row['indicator'] is not None),
+                                         key=lambda row: _nocase(row['indicator']))
+        self._rows_by_code = {}
+        for row in reversed(self._like_ordered_rows):
+            self._rows_by_code[_nocase(row['indicator'])] = row
+        self._rows_by_type = {}
+        self._rows_by_parent = {}
+        for row in rows:
+            self._rows_by_type.setdefault(row['type'], []).append(row)
+            if row['type'] in PARENT_COLUMNS:
+                parent_code = row[PARENT_COLUMNS[row['type']]]
+                self._rows_by_parent.setdefault((row['type'], parent_code), []).append(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def find_by_code(self, indicator_code, _type=None):
+        """
+        Finds an indicator as "indicator LIKE :indicator_code [AND type LIKE :_type]" does
+
+        Args:
+            indicator_code (str): indicator code, it may have LIKE wildcards
+            _type (str, optional): indicator type, it may have LIKE wildcards
+
+        Returns:
+            Indicator: the indicator with its children, None if there is none
+        """
+        type_pattern = _like_to_regex(_type) if _type else None
+        for row in self._find_rows_by_code(indicator_code):
+            if type_pattern is None or (row['type'] is not None and type_pattern.match(row['type'])):
+                return self._build(row)
+        return None
+
+    def find_by_codes(self, indicator_codes):
+        """
+        Finds several indicators by their codes, as find_by_code does
+
+        Args:
+            indicator_codes (iterable of str): indicator codes
+
+        Returns:
+            dict: Indicator for each one of the given codes, codes without indicator are left out
+        """
+        indicators = {}
+        for code in set(code for code in indicator_codes if code):
+            row = next(self._find_rows_by_code(code), None)
+            if row is not None:
+                indicators[code] = self._build(row)
+        return indicators
+
+    def find_by_level(self, level, parent_type=None, parent_code=None):
+        """
+        Finds the indicators of a type, optionally restricted to the children of a parent
+
+        Args:
+            level (str): type of the indicators, compared case sensitively as the type column is
+            parent_type (str, optional): type of the parent
+            parent_code (str, optional): code of the parent, compared case sensitively as the parent columns are
+
+        Returns:
+            list of Indicator: indicators with their children in id order
+        """
+        rows = self._rows_by_type.get(level, [])
+        if parent_type is not None:
+            parent_column = 'index_code' if parent_type == 'INDEX' else parent_type.lower()
+            rows = [row for row in rows if row.get(parent_column) == parent_code]
+        return [self._build(row) for row in rows]
+
+    def find_children(self, indicator_type, indicator_code):
+        """
+        Finds the children of an indicator
+
+        Args:
+            indicator_type (str): type of the indicator, case insensitive
+            indicator_code (str): code of the indicator
+
+        Returns:
+            list of Indicator: children with their own children in id order
+        """
+        return [self._build(row) for row in self._find_children_rows(indicator_type, indicator_code)]
+
+    def _find_children_rows(self, indicator_type, indicator_code):
+        child_types = CHILD_TYPES.get(indicator_type.upper(), ())
+        if len(child_types) == 1:
+            return self._rows_by_parent.get((child_types[0], indicator_code), [])
+        # Children of several types come in id order, as they are read from the table
+        return sorted((row for child_type in child_types
+                       for row in self._rows_by_parent.get((child_type, indicator_code), [])),
+                      key=lambda row: row['id'])
+
+    def _find_rows_by_code(self, indicator_code):
+        """
+        Returns the rows matching a LIKE pattern on the indicator column in the order sqlite finds them
+        """
+        if '%' in indicator_code or '_' in indicator_code:
+            pattern = _like_to_regex(indicator_code.upper())
+            candidates = self._rows if indicator_code[0] in '%_' else self._like_ordered_rows
+            return (row for row in candidates if row['indicator'] is not None and pattern.match(row['indicator']))
+        row = self._rows_by_code.get(_nocase(indicator_code))
+        return iter([row] if row is not None else [])
+
+    def _build(self, row):
+        data = dict(row)
+        data['children'] = [self._build(child) for child in self._find_children_rows(row['type'], row['indicator'])]
+        return self._build_indicator(data)
+
+
+def _nocase(text):
+    """
+    Folds a string as the NOCASE collation of sqlite does (ASCII characters only)
+    """
+    return text.translate(_NOCASE_TABLE)
+
+
+_NOCASE_TABLE = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def _like_to_regex(like_pattern):
+    """
+    Translates a sqlite LIKE pattern (without ESCAPE clause) into an equivalent compiled regular expression
+    """
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in like_pattern)
+    return re.compile(regex + r'\Z', re.IGNORECASE | re.ASCII | re.DOTALL)
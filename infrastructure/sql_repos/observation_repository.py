@@ -1,22 +1,26 @@
 from sqlite3 import IntegrityError
 
-from infrastructure.errors.errors import IndicatorRepositoryError, ObservationRepositoryError
+from infrastructure.errors.errors import IndicatorRepositoryError, ObservationRepositoryError, AreaRepositoryError
 from infrastructure.sql_repos.area_repository import AreaRepository
-from infrastructure.sql_repos.indicator_repository import IndicatorRepository
-from infrastructure.sql_repos.utils import get_db, create_insert_query, is_integer
+from infrastructure.sql_repos.entity_cache import DatabaseContext
+from infrastructure.sql_repos.indicator_repository import IndicatorRepository, TREE_LEVELS
+from infrastructure.sql_repos.utils import get_db, create_insert_query, is_integer, execute_many, is_bulk_load
 from odb.domain.model.observation.grouped_by_area_visualisation import GroupedByAreaVisualisation
-from odb.domain.model.observation.observation import Repository, create_observation
-from odb.domain.model.observation.statistics import Statistics
+from odb.domain.model.observation.observation import Repository, create_observation, ObservationReadModel
+from odb.domain.model.observation.statistics import Statistics, StreamStatistics
 from odb.domain.model.observation.visualisation import Visualisation
 from odb.domain.model.observation.year import Year
 
+# Observation rows fetched at a time when observations are streamed
+STREAM_BATCH_SIZE = 500
+
 
 class ObservationRepository(Repository):
     """
     Concrete mongodb repository for Observations.
     """
 
-    def __init__(self, recreate_db, area_repo, indicator_repo, config):
+    def __init__(self, recreate_db, area_repo, indicator_repo, config=None, connection_pool=None):
         """
         Constructor for ObservationRepository
 
@@ -24,10 +28,16 @@ class ObservationRepository(Repository):
             recreate_db (bool): Indicates if the database should be dropped on start
             area_repo (AreaRepository): Area repository
             indicator_repo (IndicatorRepository): Indicator repository
+            config (RawConfigParser): sqlite configuration, used when no connection pool is given
+            connection_pool (ReadOnlyConnectionPool, optional): pool to take a read-only connection from
         """
 
         self._config = config
-        self._db = self._initialize_db(recreate_db)
+        self._db = connection_pool.get_db() if connection_pool else self._initialize_db(recreate_db)
+        # Repositories reading from a pool only serve queries, so they return read models instead of entities
+        self._read_model = connection_pool is not None
+        self._context = connection_pool.context if connection_pool else DatabaseContext.for_database(
+            config.get("CONNECTION", "SQLITE_DB"))
         # Maybe the repos could be used in a higher level context to set areas and indicators of observations
         self._area_repo = area_repo
         self._indicator_repo = indicator_repo
@@ -47,20 +57,70 @@ class ObservationRepository(Repository):
                     year INTEGER,
                     indicator TEXT,
                     dataset_indicator TEXT,
-                    uri TEXT,
-                    CONSTRAINT observation_indicator_area_year_uniq UNIQUE (indicator, area, year, dataset_indicator)
+                    uri TEXT
                 );
                 '''
             db.execute(sql)
+            if not is_bulk_load(self._config):
+                self._create_indexes(db)
+            db.execute('DROP TABLE IF EXISTS sheet')
+            # Parsed sheets with the hash of their content and the ids of the observations parsed from them (they are
+            # inserted with consecutive ids), so an incremental parse can replace the observations of changed sheets
+            sql = '''
+                CREATE TABLE sheet
+                (
+                    kind TEXT,
+                    name TEXT,
+                    hash TEXT,
+                    first_observation INTEGER,
+                    last_observation INTEGER,
+                    PRIMARY KEY (kind, name)
+                ) WITHOUT ROWID;
+                '''
+            db.execute(sql)
             db.commit()
         return db
 
+    def create_indexes(self):
+        """
+        Creates the indexes of the observation table if they don't exist, they are created along with the table unless
+        the repository is used for a bulk load. As one of them is unique, the creation fails if there are duplicated
+        observations
+
+        Raises:
+            ObservationRepositoryError: if there are several observations of the same indicator, area and year
+        """
+        try:
+            self._create_indexes(self._db)
+        except IntegrityError as e:
+            raise ObservationRepositoryError("Unique constraint failed for observations (%s)" % (e,))
+        self._db.commit()
+
+    @staticmethod
+    def _create_indexes(db):
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS observation_indicator_area_year_uniq "
+                   "ON observation (indicator, area, year, dataset_indicator)")
+        # Covers the rank_change computation and the lookups by indicator and area. The columns keep the order of the
+        # unique index so both return rows in the same order
+        db.execute("CREATE INDEX IF NOT EXISTS observation_indicator_area_year_rank_index "
+                   "ON observation (indicator, area, year, dataset_indicator, rank)")
+
     def begin_transaction(self):
         self._db.execute("BEGIN TRANSACTION")
 
     def commit_transaction(self):
         self._db.commit()
 
+    def reset_cache(self):
+        """
+        Drops the entities cached for the database of this repository, to be called after writing to it
+        """
+        self._context.reset()
+
+    @property
+    def cache_stats(self):
+        return self._context.entity_cache.stats()
+
     def insert_observation(self, observation, commit=True):
         data = ObservationRowAdapter().observation_to_dict(observation)
         query = create_insert_query('observation', data)
@@ -71,16 +131,143 @@ class ObservationRepository(Repository):
         if commit:
             self._db.commit()
 
-    def update_rank_change(self):
-        query = """
-            UPDATE observation SET rank_change = CASE
-                  WHEN (SELECT 1 FROM observation o2 WHERE o2.year = observation.year - 1 AND o2.area = observation.area AND o2.indicator = observation.indicator)
-                      THEN (SELECT o2.rank - observation.rank FROM observation o2 WHERE o2.year = observation.year - 1 AND o2.area = observation.area AND o2.indicator = observation.indicator)
-                      ELSE NULL
-                      END;
+    def insert_observations(self, observations, commit=True):
+        """
+        Inserts several observations at once using executemany in chunks
+
+        Args:
+            observations: iterable of Observation
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: number of observations inserted
+        """
+        adapter = ObservationRowAdapter()
+        try:
+            count = execute_many(self._db, 'observation',
+                                 (adapter.observation_to_dict(observation) for observation in observations))
+        except IntegrityError as e:
+            raise ObservationRepositoryError("Unique constraint failed for observations (%s)" % (e,))
+        if commit:
+            self._db.commit()
+        return count
+
+    def find_last_observation_id(self):
+        """
+        Returns:
+            int: the greatest observation id, 0 if there are no observations. Observations inserted next get the
+                following ids
+        """
+        return self._db.execute("SELECT MAX(id) FROM observation").fetchone()[0] or 0
+
+    def find_sheet_hashes(self, kind):
+        """
+        Returns the content hashes of the parsed sheets of a kind
+
+        Args:
+            kind (str): kind of the sheets (e.g. RAW_OBSERVATIONS)
+
+        Returns:
+            dict: hash of every sheet by name, empty if the database has no sheets at all
+        """
+        query = "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sheet'"
+        if self._db.execute(query).fetchone() is None:
+            return {}
+
+        rows = self._db.execute("SELECT name, hash FROM sheet WHERE kind = :kind", {'kind': kind}).fetchall()
+        return dict((row['name'], row['hash']) for row in rows)
+
+    def insert_sheet(self, kind, name, content_hash, first_observation=None, last_observation=None, commit=True):
+        """
+        Stores a parsed sheet, replacing the previous one with the same kind and name
+
+        Args:
+            kind (str): kind of the sheet (e.g. RAW_OBSERVATIONS)
+            name (str): name of the sheet
+            content_hash (str): hash of the content of the sheet
+            first_observation (int, optional): id of the first observation parsed from the sheet
+            last_observation (int, optional): id of the last observation parsed from the sheet
+            commit (bool): commit the changes after the insertion
+        """
+        self._db.execute("INSERT OR REPLACE INTO sheet (kind, name, hash, first_observation, last_observation) "
+                         "VALUES (:kind, :name, :hash, :first_observation, :last_observation)",
+                         {'kind': kind, 'name': name, 'hash': content_hash, 'first_observation': first_observation,
+                          'last_observation': last_observation})
+        if commit:
+            self._db.commit()
+
+    def delete_sheet(self, kind, name, commit=True):
+        """
+        Deletes a parsed sheet and the observations parsed from it
+
+        Args:
+            kind (str): kind of the sheet (e.g. RAW_OBSERVATIONS)
+            name (str): name of the sheet
+            commit (bool): commit the changes after the deletion
+
+        Returns:
+            list of int: years of the deleted observations
+        """
+        data = {'kind': kind, 'name': name}
+        observation_range = "id BETWEEN (SELECT first_observation FROM sheet WHERE kind = :kind AND name = :name) " \
+                            "AND (SELECT last_observation FROM sheet WHERE kind = :kind AND name = :name)"
+        rows = self._db.execute("SELECT DISTINCT year FROM observation WHERE " + observation_range, data).fetchall()
+        self._db.execute("DELETE FROM observation WHERE " + observation_range, data)
+        self._db.execute("DELETE FROM sheet WHERE kind = :kind AND name = :name", data)
+        if commit:
+            self._db.commit()
+        return [row['year'] for row in rows]
+
+    def update_rank_change(self, years=None):
         """
+        Sets the rank change of every observation as the difference between the rank of the same indicator and area in
+        the previous year and its own rank (NULL if there is no previous observation).
+
+        The previous ranks are first collected into a temporary table keyed by (indicator, area, year) and then looked
+        up for every observation, so every row costs a single indexed lookup. When several observations share indicator,
+        area and year the one without dataset indicator wins, as it's the one carrying the rank.
 
-        self._db.execute(query)
+        Args:
+            years (iterable of int, optional): years of the observations to update, all of them if None
+        """
+        data = dict(('year%d' % (i,), year) for i, year in enumerate(sorted(years or [])))
+        if years is not None and not data:
+            return
+        # The previous ranks of the years to update are the ranks of the years before them
+        year_placeholders = ', '.join(':' + key for key in sorted(data))
+        previous_years_filter = "WHERE year + 1 IN (%s)" % (year_placeholders,) if data else ""
+        years_filter = " AND year IN (%s)" % (year_placeholders,) if data else ""
+        self._db.execute("DROP TABLE IF EXISTS temp.previous_rank")
+        self._db.execute("""
+            CREATE TEMP TABLE previous_rank
+            (
+                indicator TEXT,
+                area TEXT,
+                year INTEGER,
+                rank INTEGER,
+                PRIMARY KEY (indicator, area, year)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute("""
+            INSERT OR IGNORE INTO previous_rank (indicator, area, year, rank)
+            SELECT indicator, area, year + 1, rank FROM observation %s
+            ORDER BY indicator, area, year, dataset_indicator, id
+        """ % (previous_years_filter,), data)
+        # Only rows with both ranks get a value, so the rest are just cleared instead of rewriting the whole table
+        self._db.execute("UPDATE observation SET rank_change = NULL WHERE rank_change IS NOT NULL" + years_filter, data)
+        # A correlated subquery instead of UPDATE ... FROM, which needs SQLite 3.33, still one primary key lookup per row
+        self._db.execute("""
+            UPDATE observation SET rank_change = (
+                SELECT p.rank FROM previous_rank p
+                WHERE p.indicator = observation.indicator AND p.area = observation.area AND p.year = observation.year
+            ) - rank
+            WHERE rank IS NOT NULL AND EXISTS (
+                SELECT 1 FROM previous_rank p
+                WHERE p.indicator = observation.indicator AND p.area = observation.area AND p.year = observation.year
+                    AND p.rank IS NOT NULL
+            )
+        """)
+        self._db.execute("DROP TABLE temp.previous_rank")
         self._db.commit()
 
     def get_year_list(self):
@@ -102,7 +289,8 @@ class ObservationRepository(Repository):
 
     def find_tree_observations(self, indicator_code, area_code=None, year=None, level='COMPONENT', filter_dataset=True):
         if indicator_code is not None:
-            self._indicator_repo.find_indicator_by_code(indicator_code)
+            # The tree is filtered by the code as stored, which is the one the ancestor table holds
+            indicator_code = self._indicator_repo.find_indicator_by_code(indicator_code).indicator
         if area_code is not None and area_code != "ALL":
             self._area_repo.find_by_code(area_code)
 
@@ -118,21 +306,9 @@ class ObservationRepository(Repository):
         query = "SELECT * FROM observation WHERE " + query_filter if query_filter else "SELECT * FROM observation"
         rows = self._db.execute(query, data).fetchall()
 
-        processed_observation_list = []
-        for observation in [dict(r) for r in rows]:
-            area = self._area_repo.find_by_iso3(observation['area'])
-            # Filter out orphan observations
-            try:
-                indicator = self._indicator_repo.find_indicator_by_code(observation['indicator'])
-            except IndicatorRepositoryError:
-                continue
-            observation['area'] = area
-            observation['indicator'] = indicator
-            observation['dataset_indicator'] = self._indicator_repo.find_indicator_by_code(
-                observation['dataset_indicator']) if observation['dataset_indicator'] else None
-            processed_observation_list.append(observation)
+        processed_observation_list = self._hydrate_observation_rows(rows)
 
-        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list)
+        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list, self._read_model)
 
     # FIXME: Review area_type subquery
     # FIXME: Filter out or not dataset observations when asked for an indicator?
@@ -148,6 +324,62 @@ class ObservationRepository(Repository):
         Returns:
             list of Observation: Observation that satisfy the given filters
         """
+        query, data = self._build_observations_query(indicator_code, area_code, year, filter_dataset)
+        rows = self._db.execute(query, data).fetchall()
+
+        processed_observation_list = self._hydrate_observation_rows(rows)
+
+        # FIXME: The original sorted everything by ranking, do we want it too?
+        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list, self._read_model)
+
+    def iter_observations(self, indicator_code=None, area_code=None, year=None, filter_dataset=True,
+                          batch_size=STREAM_BATCH_SIZE):
+        """
+        Returns the same observations as find_observations, but read from the database in batches as they are
+        iterated instead of all at once, so only one batch is kept in memory
+
+        The filters are checked and the query is run before returning, so unknown indicators or areas raise here and
+        not while iterating
+
+        Args:
+            indicator_code (str, optional): The indicator code (indicator attribute in Indicator)
+            area_code (str, optional): The area code for the observation (or ALL for all areas)
+            year (str, optional): The year when observation was observed
+            filter_dataset (bool, optional): leave out the dataset observations
+            batch_size (int, optional): number of rows fetched at a time
+
+        Returns:
+            iterator of Observation: Observations that satisfy the given filters
+        """
+        query, data = self._build_observations_query(indicator_code, area_code, year, filter_dataset)
+        cursor = self._db.execute(query, data)
+        return self._iter_observation_rows(cursor, batch_size)
+
+    def _iter_observation_rows(self, cursor, batch_size):
+        # The areas and indicators are shared by the batches, so each one is loaded (and encoded) only once
+        areas, indicators = {}, {}
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for observation in ObservationRowAdapter.transform_to_observation_list(
+                        self._hydrate_observation_rows(rows, areas=areas, indicators=indicators), self._read_model):
+                    yield observation
+        finally:
+            cursor.close()
+
+    def _build_observations_query(self, indicator_code, area_code, year, filter_dataset):
+        """
+        Returns the query selecting the observations that satisfy the given filters, see find_observations
+
+        Returns:
+            (str, dict): The query and its parameters
+
+        Raises:
+            IndicatorRepositoryError: if there is no indicator with the given code
+            AreaRepositoryError: if there is no area with the given code
+        """
         # NOTE: Original a4ai project raised error if no indicator or area were found
         if indicator_code is not None:
             self._indicator_repo.find_indicator_by_code(indicator_code)
@@ -167,54 +399,82 @@ class ObservationRepository(Repository):
         query_filter = " AND ".join(
             filter(None, [dataset_query_filter, indicator_query_filter, area_query_filter, year_query_filter]))
         query = "SELECT * FROM observation WHERE " + query_filter if query_filter else "SELECT * FROM observation"
-        rows = self._db.execute(query, data).fetchall()
-
-        processed_observation_list = []
-        for observation in [dict(r) for r in rows]:
-            area = self._area_repo.find_by_iso3(observation['area'])
-            # Filter out orphan observations
-            try:
-                indicator = self._indicator_repo.find_indicator_by_code(observation['indicator'])
-            except IndicatorRepositoryError:
-                continue
-            observation['area'] = area
-            observation['indicator'] = indicator
-            observation['dataset_indicator'] = self._indicator_repo.find_indicator_by_code(
-                observation['dataset_indicator']) if observation['dataset_indicator'] else None
-            processed_observation_list.append(observation)
-
-        # FIXME: The original sorted everything by ranking, do we want it too?
-        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list)
+        return query, data
 
     def find_dataset_observations(self, indicator_code, area_code, year):
         indicator = self._indicator_repo.find_indicator_by_code(indicator_code)
         query = "SELECT * FROM observation WHERE year=:year AND indicator=:indicator AND area=:area AND dataset_indicator IS NOT NULL"
         data = {'indicator': indicator_code, 'year': year, 'area': area_code}
-        rows = self._db.execute(query, data)
+        rows = self._db.execute(query, data).fetchall()
+
+        processed_observation_list = self._hydrate_observation_rows(rows, indicator=indicator)
+
+        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list, self._read_model)
+
+    def _hydrate_observation_rows(self, rows, indicator=None, areas=None, indicators=None):
+        """
+        Replaces the area and indicator codes of the observation rows with their domain objects. All the areas and
+        indicators referenced by the rows are loaded at once instead of being looked up row by row
+
+        Args:
+            rows (list of sqlite3.Row): observation rows
+            indicator (Indicator, optional): indicator to set on every row instead of the one referenced by it
+            areas (dict, optional): Area by iso3 code already loaded, the ones loaded for the rows are added to it
+            indicators (dict, optional): Indicator by code already loaded, the ones loaded for the rows are added to it
+
+        Returns:
+            list of dict: observation dicts ready to be transformed into observations, orphan observations (those
+                whose indicator does not exist) are left out
+
+        Raises:
+            AreaRepositoryError: if an observation references an unknown area
+            IndicatorRepositoryError: if an observation references an unknown dataset indicator
+        """
+        observations = [dict(r) for r in rows]
+        areas = {} if areas is None else areas
+        indicators = {} if indicators is None else indicators
+        areas.update(self._area_repo.find_by_iso3_list(
+            set(observation['area'] for observation in observations).difference(areas)))
+        indicator_codes = set(observation['dataset_indicator'] for observation in observations)
+        if indicator is None:
+            indicator_codes.update(observation['indicator'] for observation in observations)
+        indicators.update(self._indicator_repo.find_indicators_by_codes(indicator_codes.difference(indicators)))
 
         processed_observation_list = []
-        for observation in [dict(r) for r in rows]:
-            area = self._area_repo.find_by_iso3(observation['area'])
+        for observation in observations:
+            area = areas.get(observation['area'])
+            if area is None:
+                raise AreaRepositoryError("No area with code %s" % (observation['area'],))
+            # Filter out orphan observations
+            observation_indicator = indicator or indicators.get(observation['indicator'])
+            if observation_indicator is None:
+                continue
+            dataset_indicator_code = observation['dataset_indicator']
+            if dataset_indicator_code and dataset_indicator_code not in indicators:
+                raise IndicatorRepositoryError("No indicator with code %s found" % (dataset_indicator_code,))
             observation['area'] = area
-            observation['indicator'] = indicator
-            observation['dataset_indicator'] = self._indicator_repo.find_indicator_by_code(
-                observation['dataset_indicator'])
+            observation['indicator'] = observation_indicator
+            observation['dataset_indicator'] = indicators[dataset_indicator_code] if dataset_indicator_code else None
             processed_observation_list.append(observation)
 
-        return ObservationRowAdapter.transform_to_observation_list(processed_observation_list)
+        return processed_observation_list
 
     def _build_level_query_filter(self, level):
-        if level is None:
+        """
+        Returns a sql filter predicate selecting the observations of the indicator :indicator and its descendants
+        down to a tree level, through the indicator_ancestor closure table
+
+        Args:
+            level (str): INDEX, SUBINDEX, COMPONENT or INDICATOR, case insensitive
+
+        Returns:
+            str: The filter query predicate for sql queries, None if no level is given
+        """
+        if level is None or level.upper() not in TREE_LEVELS:
             return None
 
-        if level.upper() == 'INDEX':
-            return "(indicator IN (SELECT indicator FROM indicator WHERE index_code IS NULL AND indicator:indicator))"
-        elif level.upper() == 'SUBINDEX':
-            return "(indicator IN (SELECT indicator FROM indicator WHERE subindex IS NULL AND (index_code=:indicator OR indicator=:indicator)))"
-        elif level.upper() == 'COMPONENT':
-            return "(indicator IN (SELECT indicator FROM indicator WHERE component IS NULL AND (subindex=:indicator OR index_code=:indicator OR indicator=:indicator)))"
-        elif level.upper() == 'INDICATOR':
-            return "(indicator IN (SELECT indicator FROM indicator WHERE component=:indicator OR subindex=:indicator OR index_code=:indicator OR indicator=:indicator))"
+        return "(indicator IN (SELECT indicator FROM indicator_ancestor WHERE ancestor = :indicator AND level <= %d))" \
+            % (TREE_LEVELS.index(level.upper()),)
 
     def _build_year_query_filter(self, year):
         """
@@ -272,10 +532,52 @@ class ObservationRepository(Repository):
             Visualisation: Observations visualisation that satisfy the filters
         """
         observations = self.find_observations(indicator_code=indicator_code, area_code=area_code, year=year)
-        observations_all_areas = self.find_observations(indicator_code=indicator_code, area_code='ALL', year=year)
+        observations_all_areas = self._find_observations_all_areas(observations, indicator_code, area_code, year)
 
         return VisualisationDocumentAdapter().transform_to_visualisation(observations, observations_all_areas)
 
+    def iter_observations_visualisation(self, indicator_code=None, area_code=None, year=None):
+        """
+        Returns the same visualisation as find_observations_visualisation, but with its observations read from the
+        database as they are iterated, see iter_observations. Its statistics are gathered from the values of the
+        observations while they are iterated, so they can only be read once the observations have been consumed
+
+        Args:
+            indicator_code (str, optional): The indicator code (indicator attribute in Indicator)
+            area_code (str, optional): The area code for the observation
+            year (str, optional): The year when observation was observed
+        Returns:
+            Visualisation: Observations visualisation that satisfy the filters, with an iterator of observations
+        """
+        statistics = StreamStatistics()
+        observations = statistics.collect(self.iter_observations(indicator_code, area_code, year))
+        if area_code is None or area_code == 'ALL':
+            statistics_all_areas = statistics
+        else:
+            statistics_all_areas = StreamStatistics()
+            for _ in statistics_all_areas.collect(self.iter_observations(indicator_code, 'ALL', year)):
+                pass
+
+        return Visualisation(observations, statistics=statistics, statistics_all_areas=statistics_all_areas)
+
+    def _find_observations_all_areas(self, observations, indicator_code, area_code, year):
+        """
+        Returns the observations of all the areas for the same filters as the given observations, which already are
+        them when they were not filtered by area
+
+        Args:
+            observations (list of Observation): observations found for indicator_code, area_code and year
+            indicator_code (str): The indicator code (indicator attribute in Indicator)
+            area_code (str): The area code of the given observations
+            year (str): The year of the given observations
+
+        Returns:
+            list of Observation: observations for indicator_code and year of all the areas
+        """
+        if area_code is None or area_code == 'ALL':
+            return observations
+        return self.find_observations(indicator_code=indicator_code, area_code='ALL', year=year)
+
     def find_observations_grouped_by_area_visualisation(self, indicator_code=None, area_code=None, year=None):
         """
         Returns grouped by area visualisation for observations that satisfy the given filters
@@ -289,7 +591,7 @@ class ObservationRepository(Repository):
         """
         area_code_splitted = area_code.split(',') if area_code is not None else None
         observations = self.find_observations(indicator_code=indicator_code, area_code=area_code, year=year)
-        observations_all_areas = self.find_observations(indicator_code=indicator_code, area_code='ALL', year=year)
+        observations_all_areas = self._find_observations_all_areas(observations, indicator_code, area_code, year)
         if area_code_splitted is None or len(area_code_splitted) == 0 or area_code == 'ALL':
             areas = self._area_repo.find_countries(order="iso3")
             area_code_splitted = [area.iso3 for area in areas]
@@ -338,16 +640,13 @@ class ObservationRowAdapter(object):
         Returns:
             dict: Dictionary with keys and values mapped to the sqlite table
         """
-        # Strip unwanted values
-        data = dict(
-            (key, value) for key, value in list(observation.to_dict().items()) if
-            key not in ('indicator', 'dataset_indicator', 'year', 'area'))
-        # Replace keys
-        data['indicator'] = observation.indicator.indicator if observation.indicator else None
-        data['dataset_indicator'] = observation.dataset_indicator.indicator if observation.dataset_indicator else None
-        data['year'] = observation.year.value
-        data['area'] = observation.area.iso3
-        return data
+        # Built from the attributes instead of to_dict() so the indicator and area trees are not serialized just to
+        # be replaced by their codes
+        return {'value': observation.value, 'id': observation.id, 'rank': observation.rank,
+                'rank_change': observation.rank_change, 'uri': observation.uri,
+                'indicator': observation.indicator.indicator if observation.indicator else None,
+                'dataset_indicator': observation.dataset_indicator.indicator if observation.dataset_indicator else None,
+                'year': observation.year.value, 'area': observation.area.iso3}
 
     @staticmethod
     def dict_to_observation(observation_dict):
@@ -364,16 +663,19 @@ class ObservationRowAdapter(object):
         return create_observation(**data)
 
     @staticmethod
-    def transform_to_observation_list(observation_dict_list):
+    def transform_to_observation_list(observation_dict_list, read_model=False):
         """
         Transforms a list of observations
 
         Args:
             observation_dict_list (list): Observation dict list
+            read_model (bool): return ObservationReadModel objects instead of Observation entities
 
         Returns:
             list of Observation: A list of observations with the data in observation_dict_list
         """
+        if read_model:
+            return [ObservationReadModel(**observation_dict) for observation_dict in observation_dict_list]
         return [ObservationRowAdapter.dict_to_observation(observation_dict) for observation_dict in
                 observation_dict_list]
 
@@ -0,0 +1,200 @@
+from infrastructure.sql_repos.utils import get_db, execute_many
+
+
+class SummaryRepository(object):
+    """
+    Concrete sqlite repository for the materialized summaries of the index tree observations. A summary is identified
+    by the index indicator, the tree level of its observations and their year (None when it covers all the years) and
+    holds the per-area score rows and the per-indicator statistics (over all areas and per region) built by
+    odb.domain.model.observation.index_summary, stored with their position so they are read back in the same order.
+    """
+
+    def __init__(self, recreate_db, config=None, connection_pool=None):
+        """
+        Constructor for SummaryRepository
+
+        Args:
+            recreate_db (bool): Indicates if the database should be dropped on start
+            config (RawConfigParser): sqlite configuration, used when no connection pool is given
+            connection_pool (ReadOnlyConnectionPool, optional): pool to take a read-only connection from
+        """
+        self._config = config
+        self._db = connection_pool.get_db() if connection_pool else self._initialize_db(recreate_db)
+
+    def _initialize_db(self, recreate_db):
+        db = get_db(self._config)
+        if recreate_db:
+            db.execute('DROP TABLE IF EXISTS summary_area_score')
+            db.execute('DROP TABLE IF EXISTS summary_indicator_stats')
+            db.execute('DROP TABLE IF EXISTS summary')
+            sql = '''
+                CREATE TABLE summary
+                (
+                    id INTEGER PRIMARY KEY,
+                    indicator TEXT,
+                    level TEXT,
+                    year INTEGER,
+                    CONSTRAINT summary_indicator_level_year_uniq UNIQUE (indicator, level, year)
+                );
+                '''
+            db.execute(sql)
+            sql = '''
+                CREATE TABLE summary_area_score
+                (
+                    summary INTEGER,
+                    position INTEGER,
+                    area TEXT,
+                    indicator TEXT,
+                    indicator_type TEXT,
+                    year INTEGER,
+                    value REAL,
+                    rank INTEGER,
+                    rank_change INTEGER,
+                    PRIMARY KEY (summary, position)
+                ) WITHOUT ROWID;
+                '''
+            db.execute(sql)
+            sql = '''
+                CREATE TABLE summary_indicator_stats
+                (
+                    summary INTEGER,
+                    position INTEGER,
+                    indicator TEXT,
+                    area TEXT,
+                    mean REAL,
+                    median REAL,
+                    min REAL,
+                    max REAL,
+                    PRIMARY KEY (summary, position)
+                ) WITHOUT ROWID;
+                '''
+            db.execute(sql)
+            db.commit()
+        return db
+
+    def begin_transaction(self):
+        self._db.execute("BEGIN TRANSACTION")
+
+    def commit_transaction(self):
+        self._db.commit()
+
+    def insert_summary(self, indicator_code, level, year, area_scores, indicator_stats, commit=True):
+        """
+        Stores a summary with its rows, replacing the previous one with the same indicator, level and year
+
+        Args:
+            indicator_code (str): code of the index indicator
+            level (str): tree level of the summarized observations
+            year (int): year of the summarized observations, None if they cover all the years
+            area_scores (list of dict): rows returned by build_area_scores
+            indicator_stats (list of dict): rows returned by build_indicator_stats
+            commit (bool): commit the changes after the insertion
+
+        Returns:
+            int: id of the summary
+        """
+        previous_summary_id = self.find_summary_id(indicator_code, level, year)
+        if previous_summary_id is not None:
+            self._delete_summary(previous_summary_id)
+
+        cursor = self._db.execute("INSERT INTO summary (indicator, level, year) VALUES (:indicator, :level, :year)",
+                                  {'indicator': indicator_code, 'level': level, 'year': year})
+        summary_id = cursor.lastrowid
+        execute_many(self._db, 'summary_area_score', (dict(row, summary=summary_id, position=position)
+                                                      for position, row in enumerate(area_scores)))
+        execute_many(self._db, 'summary_indicator_stats', (dict(row, summary=summary_id, position=position)
+                                                           for position, row in enumerate(indicator_stats)))
+        if commit:
+            self._db.commit()
+        return summary_id
+
+    def delete_summary(self, indicator_code, level, year, commit=True):
+        """
+        Deletes a summary with its rows, if there is one
+
+        Args:
+            indicator_code (str): code of the index indicator
+            level (str): tree level of the summarized observations
+            year (int): year of the summarized observations, None if they cover all the years
+            commit (bool): commit the changes after the deletion
+        """
+        summary_id = self.find_summary_id(indicator_code, level, year)
+        if summary_id is not None:
+            self._delete_summary(summary_id)
+        if commit:
+            self._db.commit()
+
+    def _delete_summary(self, summary_id):
+        data = {'summary': summary_id}
+        self._db.execute("DELETE FROM summary_area_score WHERE summary = :summary", data)
+        self._db.execute("DELETE FROM summary_indicator_stats WHERE summary = :summary", data)
+        self._db.execute("DELETE FROM summary WHERE id = :summary", data)
+
+    def find_summary_id(self, indicator_code, level, year=None):
+        """
+        Returns the id of a summary
+
+        Args:
+            indicator_code (str): code of the index indicator
+            level (str): tree level of the summarized observations
+            year (int, optional): year of the summarized observations, None for the summary of all the years
+
+        Returns:
+            int: id of the summary, None if it has not been built (or the database has no summaries at all)
+        """
+        query = "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'summary'"
+        if self._db.execute(query).fetchone() is None:
+            return None
+
+        query = "SELECT id FROM summary WHERE indicator = :indicator AND level = :level AND year IS :year"
+        row = self._db.execute(query, {'indicator': indicator_code, 'level': level, 'year': year}).fetchone()
+        return row['id'] if row is not None else None
+
+    def find_area_scores(self, summary_id):
+        """
+        Returns the per-area score rows of a summary in the order they were built
+
+        Args:
+            summary_id (int): id of the summary
+
+        Returns:
+            list of sqlite3.Row: rows with area, indicator, indicator_type, year, value, rank and rank_change
+        """
+        query = "SELECT area, indicator, indicator_type, year, value, rank, rank_change FROM summary_area_score " \
+                "WHERE summary = :summary ORDER BY position"
+        return self._db.execute(query, {'summary': summary_id}).fetchall()
+
+    def find_indicator_stats(self, summary_id):
+        """
+        Returns the per-indicator statistics rows of a summary in the order they were built
+
+        Args:
+            summary_id (int): id of the summary
+
+        Returns:
+            list of sqlite3.Row: rows with indicator, area, mean, median, min and max
+        """
+        query = "SELECT indicator, area, mean, median, min, max FROM summary_indicator_stats " \
+                "WHERE summary = :summary ORDER BY position"
+        return self._db.execute(query, {'summary': summary_id}).fetchall()
+
+
+if __name__ == "__main__":
+    import configparser
+
+    sqlite_config = configparser.RawConfigParser()
+    sqlite_config.add_section("CONNECTION")
+    sqlite_config.set("CONNECTION", 'SQLITE_DB', '../../odb2015.db')
+    repo = SummaryRepository(False, sqlite_config)
+
+    summary_id = repo.find_summary_id('ODB', 'COMPONENT')
+    assert summary_id is not None
+    area_scores = repo.find_area_scores(summary_id)
+    assert len(area_scores) > 0
+    print([dict(row) for row in area_scores[:10]])
+
+    indicator_stats = repo.find_indicator_stats(summary_id)
+    assert len(indicator_stats) > 0 and indicator_stats[0]['area'] == ':::'
+    print([dict(row) for row in indicator_stats[:10]])
+
+    print('OK!')
@@ -1,4 +1,22 @@
+import os
 import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+# Number of rows sent to the database on each executemany call of the bulk inserts
+BULK_INSERT_CHUNK_SIZE = 5000
+
+# Settings of the connections of a bulk load (see get_db). The database is built into a file of its own that is thrown
+# away if the load fails, so it doesn't need the rollback journal nor to wait for the disk on every commit
+BULK_LOAD_PRAGMAS = ["PRAGMA journal_mode=OFF", "PRAGMA synchronous=OFF", "PRAGMA cache_size=-262144",
+                     "PRAGMA temp_store=MEMORY"]
+
+# Adapters and converters are process-wide, so they are registered once instead of on every connection
+sqlite3.register_adapter(bool, int)
+sqlite3.register_converter("BOOLEAN", lambda v: bool(int(v)))
 
 
 def create_insert_query(table, data):
@@ -15,15 +33,175 @@ def create_replace_query(table, data):
     return query
 
 
+@lru_cache(maxsize=None)
+def _cached_query(query_builder, table, columns):
+    return query_builder(table, dict.fromkeys(columns))
+
+
+def iterate_in_chunks(iterable, chunk_size):
+    """
+    Splits an iterable into lists of at most chunk_size elements.
+
+    Args:
+        iterable: any iterable
+        chunk_size (int): maximum length of every chunk
+
+    Returns:
+        generator of list: the chunks in the order of the iterable
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def execute_many(db, table, data_iterable, query_builder=create_insert_query, chunk_size=BULK_INSERT_CHUNK_SIZE):
+    """
+    Runs a bulk insert of dictionaries sharing the same keys. The statement is built once from the keys of the first
+    dictionary (and reused for later calls with the same columns) and the rows are sent with executemany in chunks.
+
+    Args:
+        db (sqlite3.Connection): database connection
+        table (str): table name
+        data_iterable: iterable of dicts with the values to insert
+        query_builder (func): create_insert_query or create_replace_query
+        chunk_size (int): number of rows per executemany call
+
+    Returns:
+        int: number of rows inserted
+    """
+    count = 0
+    for chunk in iterate_in_chunks(data_iterable, chunk_size):
+        query = _cached_query(query_builder, table, tuple(chunk[0].keys()))
+        db.executemany(query, chunk)
+        count += len(chunk)
+    return count
+
+
 def get_db(config):
     db = sqlite3.connect(config.get("CONNECTION", "SQLITE_DB"))
     db.row_factory = sqlite3.Row
-    sqlite3.register_adapter(bool, int)
-    sqlite3.register_converter("BOOLEAN", lambda v: bool(int(v)))
+    if is_bulk_load(config):
+        for pragma in BULK_LOAD_PRAGMAS:
+            db.execute(pragma)
 
     return db
 
 
+def is_bulk_load(config):
+    """
+    Tells whether the connections of a sqlite configuration are used for a bulk load, set by CONNECTION/BULK_LOAD.
+    Bulk load connections skip journaling and syncing and the repositories created with them leave their indexes to
+    be created by create_indexes once the data is loaded
+
+    Args:
+        config (RawConfigParser): sqlite configuration
+
+    Returns:
+        bool: whether the configuration is for a bulk load
+    """
+    return config.getboolean("CONNECTION", "BULK_LOAD", fallback=False)
+
+
+def copy_database(source, target):
+    """
+    Copies a database into a new file with the sqlite backup API, so the copy is consistent even if the source is
+    being read
+
+    Args:
+        source (str): path of the database to copy
+        target (str): path of the copy, it's replaced if it exists
+    """
+    remove_database(target)
+    with sqlite3.connect(source) as source_db, sqlite3.connect(target) as target_db:
+        source_db.backup(target_db)
+    source_db.close()
+    target_db.close()
+
+
+def publish_database(source, target):
+    """
+    Stamps a database built apart with a new build version, optimizes it and atomically renames it over the one in
+    use. Readers of the old file (e.g. the API connection pool) keep reading it until they open the new one.
+
+    Args:
+        source (str): path of the built database, it must be in the same file system as target
+        target (str): path of the database in use
+
+    Returns:
+        str: build version of the published database
+    """
+    db = sqlite3.connect(source, isolation_level=None)
+    version = stamp_build_version(db)
+    db.execute("ANALYZE")
+    db.execute("VACUUM")
+    db.close()
+    os.replace(source, target)
+    return version
+
+
+def stamp_build_version(db):
+    """
+    Stores a new build version in a database, replacing the one it had. The version identifies the data of a build,
+    so everything computed from the database (e.g. the API responses) can be cached until it changes
+
+    Args:
+        db (sqlite3.Connection): connection to the database, in autocommit mode
+
+    Returns:
+        str: the new build version, the UTC time of the build followed by a random suffix
+    """
+    version = "%s-%s" % (datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"), uuid.uuid4().hex[:12])
+    db.execute("CREATE TABLE IF NOT EXISTS build_version (version TEXT NOT NULL)")
+    db.execute("DELETE FROM build_version")
+    db.execute("INSERT INTO build_version (version) VALUES (?)", (version,))
+    return version
+
+
+def read_build_version(db):
+    """
+    Returns the build version of a database, see stamp_build_version
+
+    Args:
+        db (sqlite3.Connection): connection to the database
+
+    Returns:
+        str: build version of the database, None if it was built before versions were stamped
+    """
+    try:
+        row = db.execute("SELECT version FROM build_version").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+@contextmanager
+def transaction(db):
+    """
+    Runs the statements of a block in one write transaction on an autocommit connection
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+def remove_database(database):
+    """
+    Removes a database file and its rollback journal, if they exist
+
+    Args:
+        database (str): path of the database
+    """
+    for path in (database, database + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
 def is_integer(s):
     try:
         int(s)
@@ -389,6 +389,76 @@ def create_indicator(id=None, index=None, indicator=None, name=None, component=N
     return indicator
 
 
+# =======================================================================================
+# Indicator read model
+# =======================================================================================
+class IndicatorReadModel(object):
+    """
+    Read-only counterpart of Indicator for the query side (the API and the JSON exporter): the same attributes and
+    to_dict in a __slots__ object built straight from its values, without creation events, versions or properties.
+
+    Attributes:
+        see Indicator
+    """
+
+    __slots__ = ('id', 'index', 'indicator', 'name', 'parent', 'provider_url', 'description', 'uri', 'component',
+                 'subindex', 'type', 'children', 'provider_name', 'short_name', 'source_name', 'source_url',
+                 'source_data', 'units', 'format_notes', 'license', 'range', 'tags', 'weight')
+
+    def __init__(self, id=None, index=None, indicator=None, name=None, component=None, source_name=None,
+                 source_url=None, source_data=None, range=None, units=None, format_notes=None, license=None,
+                 short_name=None, provider_url=None, description=None, uri=None, parent=None, provider_name=None,
+                 subindex=None, type=None, tags=None, weight=None, children=None):
+        """
+        Constructor for IndicatorReadModel, it takes the same arguments as create_indicator
+        """
+        self.id = id
+        self.index = index
+        self.indicator = indicator
+        self.name = name
+        self.parent = parent
+        self.provider_url = provider_url
+        self.description = description
+        self.uri = uri
+        self.component = component
+        self.subindex = subindex
+        self.type = type
+        self.children = [] if children is None else children
+        self.provider_name = provider_name
+        self.short_name = short_name
+        self.source_name = source_name
+        self.source_url = source_url
+        self.source_data = source_data
+        self.units = units
+        self.format_notes = format_notes
+        self.license = license
+        self.range = range
+        self.tags = tags
+        self.weight = weight
+
+    def __eq__(self, other):
+        return self.indicator == other.indicator
+
+    def to_dict(self):
+        """
+        Converts self object to dictionary, as Indicator.to_dict does
+
+        Returns:
+            dict: Dictionary representation of self object
+        """
+        return {
+            'index': self.index, 'indicator': self.indicator, 'name': self.name, 'parent': self.parent,
+            'provider_url': self.provider_url, 'description': self.description, 'uri': self.uri,
+            'component': self.component, 'subindex': self.subindex, 'id': self.id, 'type': self.type,
+            'children': [child.to_dict() for child in self.children], 'provider_name': self.provider_name,
+            'short_name': self.short_name, 'source_name': self.source_name, 'source_url': self.source_url,
+            'source_data': self.source_data, 'units': self.units, 'format_notes': self.format_notes,
+            'license': self.license, 'range': self.range, 'tags': self.tags, 'weight': self.weight}
+
+    def add_child(self, indicator):
+        self.children.append(indicator)
+
+
 # =======================================================================================
 # Mutators
 # =======================================================================================
@@ -33,16 +33,36 @@ class GroupedByAreaVisualisation(object):
         """
         return [obs for obs in self._observations if obs.area.iso3 == area_code]
 
-    def to_dict(self):
+    def to_dict(self, shallow=False):
         """
         Converts self object to dictionary
 
+        Args:
+            shallow (bool, optional): leave the observations as objects instead of converting them, for the JSON
+                encoder to encode them
+
         Returns:
             dict: Dictionary representation of self object
         """
         d = {
             'statistics_all_areas': self._statistics_all_areas.to_dict()
         }
-        for area_code in self._area_codes:
-            d[area_code] = Visualisation(observations=self.observation_by_area(area_code)).to_dict_without_all_areas()
+        observations_by_area = self._group_observations_by_area()
+        area_observations = [observations_by_area.get(area_code, []) for area_code in self._area_codes]
+        area_statistics = Statistics.for_groups(area_observations)
+        for area_code, observations, statistics in zip(self._area_codes, area_observations, area_statistics):
+            visualisation = Visualisation(observations=observations, statistics=statistics)
+            d[area_code] = visualisation.to_dict_without_all_areas(shallow)
         return d
+
+    def _group_observations_by_area(self):
+        """
+        Groups the observations by area iso3 code in a single pass, keeping their order
+
+        Returns:
+            dict: list of Observation by area iso3 code
+        """
+        observations_by_area = {}
+        for obs in self._observations:
+            observations_by_area.setdefault(obs.area.iso3, []).append(obs)
+        return observations_by_area
@@ -0,0 +1,82 @@
+import statistics
+from operator import attrgetter
+
+# Area code used for the statistics over all the areas
+ALL_AREAS = ':::'
+
+
+def build_area_scores(observations, countries):
+    """
+    Builds the per-area score rows of the index endpoints, in the order they are rendered: countries sorted by iso3
+    and, for each country, its observations sorted by indicator code (keeping the order of the given observations for
+    the same indicator).
+
+    Args:
+        observations (list of Observation): tree observations of the index
+        countries (list of Country): countries to build the rows for
+
+    Returns:
+        list of dict: rows with area, indicator, indicator_type, year, value, rank and rank_change
+    """
+    observations_by_area = {}
+    for observation in observations:
+        observations_by_area.setdefault(observation.area.iso3, []).append(observation)
+
+    area_scores = []
+    for country in sorted(countries, key=attrgetter('iso3')):
+        for observation in sorted(observations_by_area.get(country.iso3, []), key=lambda o: o.indicator.indicator):
+            area_scores.append({
+                'area': country.iso3,
+                'indicator': observation.indicator.indicator,
+                'indicator_type': observation.indicator.type,
+                'year': observation.year,
+                'value': observation.value,
+                'rank': observation.rank,
+                'rank_change': observation.rank_change
+            })
+    return area_scores
+
+
+def build_indicator_stats(observations, regions):
+    """
+    Builds the per-indicator statistics rows of the index endpoints: for every indicator code, in sorted order, the
+    statistics over all the areas (ALL_AREAS) followed by the ones of each region, in the given order. Observations
+    without value are ignored.
+
+    Args:
+        observations (list of Observation): tree observations of the index
+        regions (list of Region): regions, with their countries, to build the rows for
+
+    Returns:
+        list of dict: rows with indicator, area, mean, median, min and max
+
+    Raises:
+        statistics.StatisticsError: if an indicator has no values for any of the regions
+    """
+    values_by_indicator = {}
+    for observation in observations:
+        values_by_area = values_by_indicator.setdefault(observation.indicator.indicator, {})
+        if observation.value is not None:
+            values_by_area.setdefault(observation.area.iso3, []).append(observation.value)
+
+    indicator_stats = []
+    for indicator_code in sorted(values_by_indicator):
+        values_by_area = values_by_indicator[indicator_code]
+        all_values = [value for values in values_by_area.values() for value in values]
+        indicator_stats.append(_stats_row(indicator_code, ALL_AREAS, all_values))
+        for region in regions:
+            region_values = [value for iso3 in set(country.iso3 for country in region.countries)
+                             for value in values_by_area.get(iso3, [])]
+            indicator_stats.append(_stats_row(indicator_code, region.iso3, region_values))
+    return indicator_stats
+
+
+def _stats_row(indicator_code, area_code, values):
+    return {
+        'indicator': indicator_code,
+        'area': area_code,
+        'mean': statistics.mean(values),
+        'median': statistics.median(values),
+        'min': min(values),
+        'max': max(values)
+    }
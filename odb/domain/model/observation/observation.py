@@ -71,16 +71,23 @@ class Observation(Entity):
         self._rank = event.rank
         self._rank_change = event.rank_change
 
-    def to_dict(self):
+    def to_dict(self, shallow=False):
         """
         Converts self object to dictionary
 
+        Args:
+            shallow (bool, optional): leave the indicator and the area as objects instead of converting them, for the
+                JSON encoder to encode them just once
+
         Returns:
             dict: Dictionary representation of self object
         """
         # There could be data without an indicator associated
-        indicator_dict = self.indicator.to_dict() if self.indicator else None
-        return {'indicator': indicator_dict, 'area': self.area.to_dict(), 'value': self.value, 'year': self.year,
+        if shallow:
+            indicator_dict, area_dict = self.indicator if self.indicator else None, self.area
+        else:
+            indicator_dict, area_dict = self.indicator.to_dict() if self.indicator else None, self.area.to_dict()
+        return {'indicator': indicator_dict, 'area': area_dict, 'value': self.value, 'year': self.year,
                 'id': self.id, 'rank': self.rank, 'rank_change': self.rank_change, 'uri': self.uri,
                 'dataset_indicator': self.dataset_indicator}
 
@@ -262,6 +269,55 @@ def create_observation(indicator=None, area=None, value=None, year=1970, id=None
     return obs
 
 
+# =======================================================================================
+# Observation read model
+# =======================================================================================
+class ObservationReadModel(object):
+    """
+    Read-only counterpart of Observation for the query side (the API and the JSON exporter), which builds tens of
+    thousands of observations per request: the same attributes and to_dict in a __slots__ object built straight from
+    its values, without creation events, versions or properties.
+
+    Attributes:
+        see Observation
+    """
+
+    __slots__ = ('indicator', 'dataset_indicator', 'area', 'uri', 'value', 'year', 'id', 'rank', 'rank_change')
+
+    def __init__(self, indicator=None, area=None, value=None, year=1970, id=None, rank=None, rank_change=None,
+                 uri=None, dataset_indicator=None):
+        """
+        Constructor for ObservationReadModel, it takes the same arguments as create_observation
+        """
+        self.indicator = indicator
+        self.dataset_indicator = dataset_indicator
+        self.area = area
+        self.uri = uri
+        self.value = value
+        self.year = year
+        self.id = id
+        self.rank = rank
+        self.rank_change = rank_change
+
+    def to_dict(self, shallow=False):
+        """
+        Converts self object to dictionary, as Observation.to_dict does
+
+        Args:
+            shallow (bool, optional): leave the indicator and the area as objects instead of converting them
+
+        Returns:
+            dict: Dictionary representation of self object
+        """
+        if shallow:
+            indicator_dict, area_dict = self.indicator if self.indicator else None, self.area
+        else:
+            indicator_dict, area_dict = self.indicator.to_dict() if self.indicator else None, self.area.to_dict()
+        return {'indicator': indicator_dict, 'area': area_dict, 'value': self.value, 'year': self.year,
+                'id': self.id, 'rank': self.rank, 'rank_change': self.rank_change, 'uri': self.uri,
+                'dataset_indicator': self.dataset_indicator}
+
+
 # =======================================================================================
 # Mutators
 # =======================================================================================
@@ -1,4 +1,4 @@
-from functools import reduce
+from odb.domain.model.observation.statistics_engine import aggregate, aggregate_groups
 
 
 class Statistics(object):
@@ -18,24 +18,40 @@ class Statistics(object):
     DEVELOPING = "Developing"
     EMERGING = "Emerging"
 
-    def __init__(self, observations):
+    def __init__(self, observations, aggregates=None):
         """
         Constructor for Statistics, in order to calculate the statistics a set of observations is needed
 
         Args:
             observations (list of Observation): list of Observations to calculate the statistics
+            aggregates (dict, optional): average, median, max and min already computed for the observations, they
+                are computed the first time they are needed otherwise
         """
         self._observations = observations
+        self._aggregates = aggregates
+
+    @classmethod
+    def for_groups(cls, observation_groups):
+        """
+        Creates the statistics of several groups of observations computing all of them at once
+
+        Args:
+            observation_groups (list of list of Observation): groups of observations
+
+        Returns:
+            list of Statistics: statistics of every group, in the order of observation_groups
+        """
+        values = [cls._known_values(observations) for observations in observation_groups]
+        return [cls(observations, aggregates)
+                for observations, aggregates in zip(observation_groups, aggregate_groups(values))]
 
     @property
     def average(self):
-        values = self._observations_values()
-        return self._average(values)
+        return self._get_aggregates()['average']
 
     @property
     def median(self):
-        values = self._observations_values()
-        return self._median(values)
+        return self._get_aggregates()['median']
 
     # FIXME: Review
     # @property
@@ -56,11 +72,22 @@ class Statistics(object):
 
     @property
     def max(self):
-        return max(self._observations_values()) if len(self._observations_values()) > 0 else 0
+        return self._get_aggregates()['max']
 
     @property
     def min(self):
-        return min(self._observations_values()) if len(self._observations_values()) > 0 else 0
+        return self._get_aggregates()['min']
+
+    def _get_aggregates(self):
+        """
+        Computes the average, median, max and min of the observations values the first time they are needed
+
+        Returns:
+            dict: average, median, max and min of the observations values
+        """
+        if self._aggregates is None:
+            self._aggregates = aggregate(self._observations_values())
+        return self._aggregates
 
     @staticmethod
     def _average(values):
@@ -72,11 +99,10 @@ class Statistics(object):
         Returns:
             float: Average of the given values
         """
-        if len(values) == 0:
-            return 0
-        return reduce(lambda sum, value: sum + value, values, 0) / float(len(values))
+        return aggregate(values)['average']
 
-    def _median(self, values):
+    @staticmethod
+    def _median(values):
         """
         Calculates the median of a set of values
 
@@ -86,14 +112,7 @@ class Statistics(object):
         Returns:
             float: Median of the given values
         """
-        values.sort()
-        half = len(values) // 2
-        if len(values) == 0:
-            return 0
-        if len(values) % 2 == 0:
-            return self._average([values[half - 1], values[half]])
-        else:
-            return values[half]
+        return aggregate(values)['median']
 
     def _get_observations_without_unknown_values(self):
         """
@@ -117,8 +136,21 @@ class Statistics(object):
         Returns:
             list of float: Values of the observations in self
         """
-        observations = self._get_observations_without_unknown_values()
-        return [obs.value for obs in observations]
+        return self._known_values(self._observations)
+
+    @staticmethod
+    def _known_values(observations):
+        """
+        Extracts the values of the observations, discarding the blank ones as
+        _get_observations_without_unknown_values does
+
+        Args:
+            observations (list of Observation): observations to extract the values from
+
+        Returns:
+            list of float: known values of the observations
+        """
+        return [obs.value for obs in observations if obs.value != "" and obs.value]
 
     def _filter_observations_values_by_area_type(self, area_type):
         """
@@ -147,3 +179,35 @@ class Statistics(object):
             'max': self.max,
             'min': self.min
         }
+
+
+class StreamStatistics(Statistics):
+    """
+    Statistics of observations that are not kept in memory: their values are gathered while the observations are
+    iterated through collect, and the statistics can only be read once they have all been iterated
+    """
+
+    def __init__(self):
+        """
+        Constructor for StreamStatistics, the statistics are the ones of no observations until some are collected
+        """
+        super(StreamStatistics, self).__init__([])
+        self._values = []
+
+    def collect(self, observations):
+        """
+        Iterates some observations gathering their known values
+
+        Args:
+            observations (iterable of Observation): observations to calculate the statistics of
+
+        Returns:
+            iterator of Observation: the given observations, as they are iterated
+        """
+        for obs in observations:
+            if obs.value != "" and obs.value:  # avoids unknown values
+                self._values.append(obs.value)
+            yield obs
+
+    def _observations_values(self):
+        return self._values
@@ -0,0 +1,81 @@
+import numpy as np
+
+# Aggregates of a group without values
+EMPTY_AGGREGATES = {'average': 0, 'median': 0, 'max': 0, 'min': 0}
+
+
+def aggregate(values):
+    """
+    Computes the average, median, max and min of a list of values
+
+    Args:
+        values (list of float): values to aggregate
+
+    Returns:
+        dict: average, median, max and min of the values, all of them 0 if there are no values
+    """
+    return aggregate_groups([values])[0]
+
+
+def aggregate_groups(groups):
+    """
+    Computes the average, median, max and min of several groups of values at once, with array operations over all the
+    groups instead of a loop over them. The values of all the groups are copied into a single NumPy array that is
+    sorted just once, by group and value, to take the medians, maxima and minima of every group, and into a matrix
+    with a column per group (padded with negative zeros) whose cumulative sum down the columns gives the sums of every group.
+
+    The results are the same, bit by bit, as the ones of the plain Python implementation: averages are sequential
+    sums (a cumulative sum, not NumPy's pairwise summation) divided by the number of values, the median of an even
+    number of values is the average of the middle ones, and medians of odd groups, maxima and minima are the values
+    themselves as given.
+
+    Args:
+        groups (list of list of float): groups of values to aggregate
+
+    Returns:
+        list of dict: average, median, max and min of every group, in the order of groups
+    """
+    flat_values = [value for values in groups for value in values]
+    if not flat_values:
+        return [dict(EMPTY_AGGREGATES) for _ in groups]
+
+    array = np.asarray(flat_values, dtype=np.float64)
+    given_values = np.empty(len(flat_values), dtype=object)
+    given_values[:] = flat_values
+    lengths = np.fromiter((len(values) for values in groups), dtype=np.intp, count=len(groups))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    group_ids = np.repeat(np.arange(len(groups)), lengths)
+    # Stable sort by group and then by value, so every group keeps its own slice [start, end) of the array
+    order = np.lexsort((array, group_ids))
+    sorted_array = array[order]
+    sorted_values = given_values[order]
+
+    # Adding -0.0 leaves any sum as it is (adding 0.0 would turn a sum of -0.0 into 0.0), so it pads the shorter groups
+    padded = np.full((lengths.max(), len(groups)), -0.0, dtype=np.float64)
+    padded[np.arange(array.size) - np.repeat(starts, lengths), group_ids] = array
+    sums = np.cumsum(padded, axis=0)[-1]
+
+    # Empty groups point at a valid position, their aggregates are replaced below
+    last = array.size - 1
+    halves = lengths // 2
+    lows = np.minimum(starts + halves - 1, last)
+    highs = np.minimum(starts + halves, last)
+    even_medians = (sorted_array[np.maximum(lows, 0)] + sorted_array[highs]) / 2.0
+    odd_medians = sorted_values[highs]
+    maxima = sorted_values[np.clip(ends - 1, 0, last)]
+    minima = sorted_values[np.minimum(starts, last)]
+    averages = sums / np.maximum(lengths, 1)
+
+    aggregates = []
+    for group in range(len(groups)):
+        if lengths[group] == 0:
+            aggregates.append(dict(EMPTY_AGGREGATES))
+            continue
+        aggregates.append({
+            'average': float(averages[group]),
+            'median': float(even_medians[group]) if lengths[group] % 2 == 0 else odd_medians[group],
+            'max': maxima[group],
+            'min': minima[group]
+        })
+    return aggregates
@@ -10,19 +10,28 @@ class Visualisation(object):
         statistics (Statistics): Statistics for the visualization
     """
 
-    def __init__(self, observations, observations_all_areas=None):
+    def __init__(self, observations, observations_all_areas=None, statistics=None, statistics_all_areas=None):
         """
         Constructor for Visualization
 
         Args:
             observations (list of Observation): Observations to store and calculate statistics
             observations_all_areas (list of Observations, optional): All observations without area filters
+            statistics (Statistics, optional): Statistics already computed for observations
+            statistics_all_areas (Statistics, optional): Statistics already computed for all the observations without
+                area filters
         """
 
         self._observations = observations
-        self._statistics = Statistics(observations)
+        self._statistics = statistics if statistics is not None else Statistics(observations)
         self._observations_all_areas = observations_all_areas if observations_all_areas else []
-        self._statistics_all_areas = Statistics(observations_all_areas)
+        # The statistics of the same list of observations are computed just once
+        if statistics_all_areas is not None:
+            self._statistics_all_areas = statistics_all_areas
+        elif observations_all_areas is observations:
+            self._statistics_all_areas = self._statistics
+        else:
+            self._statistics_all_areas = Statistics(observations_all_areas)
 
     @property
     def observations(self):
@@ -36,24 +45,34 @@ class Visualisation(object):
     def statistics_all_areas(self):
         return self._statistics_all_areas
 
-    def to_dict(self):
+    def to_dict(self, shallow=False):
         """
         Converts self object to dictionary
 
+        Args:
+            shallow (bool, optional): leave the observations and the statistics as objects instead of converting
+                them, for the JSON encoder to encode them (the statistics once the observations are encoded, which
+                lets the observations be an iterator)
+
         Returns:
             dict: Dictionary representation of self object
         """
-        d = self.to_dict_without_all_areas()
-        d['statistics_all_areas'] = self.statistics_all_areas.to_dict()
+        d = self.to_dict_without_all_areas(shallow)
+        d['statistics_all_areas'] = self.statistics_all_areas if shallow else self.statistics_all_areas.to_dict()
         return d
 
-    def to_dict_without_all_areas(self):
+    def to_dict_without_all_areas(self, shallow=False):
         """
         Converts self object to dictionary without statistics for all countries
 
+        Args:
+            shallow (bool, optional): leave the observations and the statistics as objects instead of converting them
+
         Returns:
             dict: Dictionary representation of self object
         """
+        if shallow:
+            return {'observations': self.observations, 'statistics': self.statistics}
         return {
             'observations': [obs.to_dict() for obs in self.observations],
             'statistics': self.statistics.to_dict(),